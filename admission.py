@@ -0,0 +1,124 @@
+"""
+Admission control for chat requests: a token bucket per API key and a cap
+on the chat requests in flight.
+
+Both checks are made before any work is queued, in memory, so an overload
+turns into immediate rejections rather than a queue that makes every
+admitted request slower. The cap bounds how long an admitted request can
+wait behind others; the buckets stop one client from taking all of it.
+They hold per process, so several worker processes each admit up to the
+full rate.
+"""
+
+import math
+import threading
+import time
+from typing import Dict, Optional
+
+
+class Rejected(Exception):
+    """Raised when a request is not admitted; retry_after is a hint in whole seconds"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RateLimited(Rejected):
+    """Raised when the API key has used up its token bucket"""
+
+
+class Overloaded(Rejected):
+    """Raised when max_in_flight requests are already being answered"""
+
+
+class TokenBucket:
+    """rate tokens per second, holding at most burst"""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, cost: float, now: float) -> float:
+        """Take cost tokens; returns 0, or the seconds until they would be available"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+
+class AdmissionControl:
+    """
+    Admits chat requests while fewer than max_in_flight are running and the
+    caller's API key has tokens left; a rate of 0 turns the buckets off
+    """
+
+    def __init__(self, max_in_flight: int, rate: float = 0.0, burst: Optional[float] = None):
+        if max_in_flight < 1:
+            raise ValueError("max_in_flight must be at least 1")
+        if rate < 0:
+            raise ValueError("rate must not be negative")
+        self.max_in_flight = max_in_flight
+        self.rate = rate
+        self.burst = max(1.0, burst if burst is not None else rate)
+        self.in_flight = 0
+        self.admitted = 0
+        self.rate_limited = 0
+        self.overloaded = 0
+        self._buckets: Dict[str, TokenBucket] = {}
+        # The API only calls in from the event loop, but the lock is cheap next to a request
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, cost: float = 1):
+        """Take a slot and cost tokens for key, or raise Overloaded or RateLimited"""
+        with self._lock:
+            # A request turned away for load keeps its tokens
+            if self.in_flight >= self.max_in_flight:
+                self.overloaded += 1
+                raise Overloaded(f"{self.in_flight} requests already in flight", 1)
+            self._take(key, cost)
+            self.in_flight += 1
+            self.admitted += 1
+
+    def charge(self, key: str, cost: float):
+        """
+        Take cost more tokens for an admitted request, such as the other
+        messages of a batch, or raise RateLimited. Never more than a full
+        bucket is taken, so a large batch can always get through eventually
+        """
+        with self._lock:
+            self._take(key, cost)
+
+    def _take(self, key: str, cost: float):
+        if not self.rate or cost <= 0:
+            return
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst, now)
+        wait = bucket.take(min(cost, self.burst), now)
+        if wait:
+            self.rate_limited += 1
+            raise RateLimited(f"Rate limit of {self.rate:g} requests per second exceeded", math.ceil(wait))
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            'max_in_flight': self.max_in_flight,
+            'rate': self.rate,
+            'burst': self.burst,
+            'in_flight': self.in_flight,
+            'admitted': self.admitted,
+            'rate_limited': self.rate_limited,
+            'overloaded': self.overloaded,
+            'keys': len(self._buckets),
+        }
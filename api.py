@@ -1,11 +1,33 @@
 # api.py
-from fastapi import FastAPI, HTTPException, Depends, Header, Request
+from fastapi import FastAPI, HTTPException, Depends, Header, Cookie, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional
-from game_chatbot import GameChatbot
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from contextlib import asynccontextmanager
+from admission import AdmissionControl, RateLimited, Rejected
+from catalog_reload import CatalogManager, VersionConflict
+from chat_executor import ChatExecutor, QueueFull
+from game_chatbot import GameChatbot, default_catalog
+from metrics import REGISTRY
+from profile_store import ProfileStore, default_profile
+from request_profiler import RequestProfiler
+from session_store import SessionStore
+from shared_catalog import SharedCatalog
+import asyncio
+import base64
+import functools
+import hashlib
+import json
 import logging
+import os
+import random
+import re
+import secrets
+import tempfile
+import threading
 import time
+import uuid
 
 # --------------------------
 # Logging Configuration
@@ -17,23 +39,141 @@ logger = logging.getLogger(__name__)
 # API Key Configuration
 # --------------------------
 API_KEY = "mysecretapikey123"  # Change to a secure value
+# Further comma-separated keys, e.g. one per client, each with its own rate limit
+API_KEYS = {API_KEY, *filter(None, os.environ.get("GAME_API_KEYS", "").split(","))}
 
 def get_api_key(x_api_key: str = Header(...)):
     """Validate API key."""
-    if x_api_key != API_KEY:
+    if x_api_key not in API_KEYS:
         logger.warning("Unauthorized access attempt with API key: %s", x_api_key)
         raise HTTPException(status_code=401, detail="Invalid API Key")
     return x_api_key
 
+# Catalog administration takes this separate token in an X-Admin-Token
+# header, since client API keys must not change the catalog. Unset, the
+# admin endpoints answer 403
+ADMIN_TOKEN = os.environ.get("GAME_ADMIN_TOKEN")
+
+def get_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Validate the admin token."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints need GAME_ADMIN_TOKEN")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        logger.warning("Unauthorized admin access attempt")
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+    return x_admin_token
+
+# --------------------------
+# Catalog Configuration
+# --------------------------
+# Path to a snapshot written by `python catalog_snapshot.py OUTPUT`. Every
+# worker maps the same file read-only instead of building its own catalog.
+CATALOG_SNAPSHOT = os.environ.get("GAME_CATALOG_SNAPSHOT")
+# Versioned JSON catalog written by `python catalog_reload.py OUTPUT`; when set,
+# POST /admin/catalog/reload swaps in a newer version without a restart
+CATALOG_FILE = os.environ.get("GAME_CATALOG_FILE")
+
+# --------------------------
+# Session Configuration
+# --------------------------
+SESSION_HEADER = "X-Session-ID"
+SESSION_COOKIE = "session_id"
+SESSION_MAX = int(os.environ.get("GAME_SESSION_MAX", "10000"))
+SESSION_TTL = float(os.environ.get("GAME_SESSION_TTL", "1800"))  # idle seconds
+SESSION_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,128}")
+HISTORY_SIZE = int(os.environ.get("GAME_HISTORY_SIZE", "100"))  # messages kept per session
+HISTORY_SPILL = os.environ.get("GAME_HISTORY_SPILL")  # optional JSON-lines file for older messages
+BATCH_MAX = int(os.environ.get("GAME_BATCH_MAX", "100"))  # messages per /chat/batch request
+STREAM_FLUSH_BYTES = 65536  # SSE events are written together up to this size
+PROFILE_DB = os.environ.get("GAME_PROFILE_DB")  # optional SQLite file keeping user profiles across restarts
+
+# --------------------------
+# Executor Configuration
+# --------------------------
+EXECUTOR_KIND = os.environ.get("GAME_EXECUTOR", "thread")  # thread or process
+EXECUTOR_WORKERS = int(os.environ.get("GAME_EXECUTOR_WORKERS", "0")) or None
+EXECUTOR_QUEUE = int(os.environ.get("GAME_EXECUTOR_QUEUE", "256"))  # requests queued or running
+
+# --------------------------
+# Admission Configuration
+# --------------------------
+# Chat requests answered at once across all keys; beyond that they get 503
+# right away. Defaults to twice the executor's workers
+CHAT_CONCURRENCY = int(os.environ.get("GAME_CHAT_CONCURRENCY", "0"))
+# Both limits hold per worker process: behind session_router.py with N
+# workers, a key whose sessions hash to all of them gets up to N times the rate
+RATE_LIMIT = float(os.environ.get("GAME_RATE_LIMIT", "0"))  # chat requests per second per API key; 0 = unlimited
+RATE_BURST = float(os.environ.get("GAME_RATE_BURST", "0")) or None  # defaults to one second's worth
+
+# --------------------------
+# Profiling Configuration
+# --------------------------
+# /chat requests carrying X-Profile-Token with this value are profiled
+PROFILE_TOKEN = os.environ.get("GAME_PROFILE_TOKEN")
+PROFILE_HEADER = "X-Profile-ID"  # id of the report written for a profiled request
+PROFILE_SAMPLE_RATE = float(os.environ.get("GAME_PROFILE_SAMPLE_RATE", "0"))  # fraction of /chat requests profiled
+PROFILE_DIR = os.environ.get("GAME_PROFILE_DIR", os.path.join(tempfile.gettempdir(), "game-chatbot-profiles"))
+PROFILE_MAX_REPORTS = int(os.environ.get("GAME_PROFILE_MAX_REPORTS", "50"))  # newest reports kept on disk
+
+# --------------------------
+# Browse Configuration
+# --------------------------
+PAGE_SIZE = 20  # games per /games page unless the client asks for a limit
+PAGE_MAX = int(os.environ.get("GAME_PAGE_MAX", "100"))
+CURSOR_DIGEST = 16  # hex digits of the catalog digest a cursor carries
+
+def get_session_id(
+    x_session_id: Optional[str] = Header(None),
+    session_cookie: Optional[str] = Cookie(None, alias=SESSION_COOKIE),
+):
+    """Session id from the header or cookie, or a new one for first-time clients."""
+    for candidate in (x_session_id, session_cookie):
+        if candidate and SESSION_ID_PATTERN.fullmatch(candidate):
+            return candidate
+    return uuid.uuid4().hex
+
 # --------------------------
 # Initialize FastAPI and Chatbot
 # --------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Serve /health and /ready right away and build the catalog meanwhile
+    asyncio.get_running_loop().run_in_executor(None, warm_up)
+    yield
+    # Flush conversation spill files before the worker exits
+    sessions.clear()
+    executor.shutdown()
+    if profiles is not None:
+        profiles.close()
+
 app = FastAPI(
     title="Game Chatbot REST API",
     description="An API to interact with the Game Chatbot",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+)
+# Built by warm_up() after startup, or by the first request that needs it
+catalog_manager: Optional[CatalogManager] = None
+catalog_error: Optional[Exception] = None
+catalog_warm_seconds: Optional[float] = None
+catalog_lock = threading.Lock()
+# Each session gets its own lightweight chatbot over the one live catalog
+sessions = SessionStore(
+    lambda: GameChatbot(catalog_manager, history_size=HISTORY_SIZE, history_spill_path=HISTORY_SPILL),
+    max_sessions=SESSION_MAX,
+    ttl_seconds=SESSION_TTL,
+    sizer=GameChatbot.state_size,
+    on_evict=lambda chatbot: chatbot.conversation_history.flush(),
 )
-chatbot = GameChatbot()
+# Profiles are keyed by session id and written behind the chat path
+profiles = ProfileStore(PROFILE_DB) if PROFILE_DB else None
+# Profiling stays off, at no cost to requests, unless a token or sample rate is set
+profiler = (RequestProfiler(PROFILE_DIR, PROFILE_MAX_REPORTS, PROFILE_SAMPLE_RATE)
+            if PROFILE_TOKEN or PROFILE_SAMPLE_RATE > 0 else None)
+executor = ChatExecutor(EXECUTOR_KIND, EXECUTOR_WORKERS, EXECUTOR_QUEUE, snapshot=CATALOG_SNAPSHOT,
+                        catalog_file=CATALOG_FILE)
+# Checked before any chat work is queued, so overload is turned away in microseconds
+admission = AdmissionControl(CHAT_CONCURRENCY or 2 * executor.workers, RATE_LIMIT, RATE_BURST)
 
 # --------------------------
 # Enable CORS (Optional)
@@ -54,17 +194,74 @@ class ChatRequest(BaseModel):
 class ChatResponse(BaseModel):
     response: str
 
+class BatchChatRequest(BaseModel):
+    messages: List[str] = Field(..., min_length=1, max_length=BATCH_MAX)
+
+class BatchChatResponse(BaseModel):
+    responses: List[str]
+
+class CatalogDeltaRequest(BaseModel):
+    changes: List[Dict[str, Any]] = Field(..., min_length=1)
+    version: Optional[int] = None  # defaults to the live version plus one
+    base_version: Optional[int] = None  # rejected with 409 unless it is the live version
+
 # --------------------------
-# Middleware for Logging Request Time
+# Middleware for Request Metrics
 # --------------------------
+REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time to answer HTTP requests, by route and status", ("method", "route", "status"))
+
 @app.middleware("http")
 async def log_request_time(request: Request, call_next):
-    start_time = time.time()
+    start_time = time.perf_counter()
     response = await call_next(request)
-    process_time = time.time() - start_time
-    logger.info("%s %s completed in %.3f sec", request.method, request.url.path, process_time)
+    process_time = time.perf_counter() - start_time
+    # Streamed responses count until their headers are sent. Routes are
+    # labelled by template rather than raw path, so unknown URLs share one series
+    route = getattr(request.scope.get("route"), "path", "unmatched")
+    REQUEST_SECONDS.observe(process_time, request.method, route, str(response.status_code))
+    logger.debug("%s %s completed in %.3f sec", request.method, request.url.path, process_time)
     return response
 
+# --------------------------
+# Admission Control
+# --------------------------
+CHAT_PATHS = frozenset(("/chat", "/chat/stream", "/chat/batch"))
+REJECTIONS = REGISTRY.counter("chat_rejections", "Chat requests turned away before any work, by reason", ("reason",))
+
+class AdmissionMiddleware:
+    """
+    Admits chat requests before any other middleware, routing or body parsing
+    runs, so turning one away costs next to nothing, and holds the slot until
+    the response, streamed or not, has been sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in CHAT_PATHS:
+            return await self.app(scope, receive, send)
+        api_key = next((value.decode("latin-1") for name, value in scope["headers"] if name == b"x-api-key"), None)
+        if api_key not in API_KEYS:
+            return await self.app(scope, receive, send)  # answered with 401 by get_api_key
+        try:
+            admission.acquire(api_key)
+        except Rejected as error:
+            limited = isinstance(error, RateLimited)
+            REJECTIONS.inc("rate_limited" if limited else "overloaded")
+            rejection = JSONResponse({"detail": str(error) if limited else "Server busy, try again shortly"},
+                                     status_code=429 if limited else 503,
+                                     headers={"Retry-After": str(error.retry_after)})
+            return await rejection(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release()
+
+# Added last, so it runs first
+app.add_middleware(AdmissionMiddleware)
+
 # --------------------------
 # API Endpoints
 # --------------------------
@@ -75,12 +272,360 @@ async def root():
 
 @app.get("/health")
 async def health():
-    """Health check endpoint."""
-    return {"status": "ok"}
+    """Liveness: the process answers, whether or not the catalog is built yet."""
+    return {"status": "ok", "catalog": catalog_state()}
+
+@app.get("/ready")
+async def ready():
+    """Readiness: 200 once the catalog and its indexes are built, 503 while warming up."""
+    state = catalog_state()
+    if state != "ready":
+        detail = {"status": state}
+        if catalog_error is not None:
+            detail["error"] = str(catalog_error)
+        return JSONResponse(detail, status_code=503, headers={"Retry-After": "1"})
+    return {"status": state, "games": len(catalog_manager.current.catalog), "warm_seconds": catalog_warm_seconds}
 
-@app.post("/chat", response_model=ChatResponse, dependencies=[Depends(get_api_key)])
-async def chat(request: ChatRequest):
+def load_catalog_manager() -> CatalogManager:
+    """Build the live catalog from GAME_CATALOG_FILE, GAME_CATALOG_SNAPSHOT or the bundled games."""
+    if CATALOG_FILE:
+        return CatalogManager.from_file(CATALOG_FILE)
+    return CatalogManager(SharedCatalog.load(CATALOG_SNAPSHOT) if CATALOG_SNAPSHOT else default_catalog())
+
+def ensure_catalog() -> CatalogManager:
+    """The live catalog manager, built here if warm-up has not finished it; blocks while it builds."""
+    global catalog_manager, catalog_error, catalog_warm_seconds
+    if catalog_manager is None:
+        with catalog_lock:
+            if catalog_manager is None:
+                start = time.perf_counter()
+                try:
+                    manager = load_catalog_manager()
+                except Exception as error:
+                    catalog_error = error
+                    raise
+                catalog_manager, catalog_error = manager, None
+                catalog_warm_seconds = round(time.perf_counter() - start, 3)
+    return catalog_manager
+
+def warm_up():
+    try:
+        ensure_catalog()
+        logger.info("Catalog ready: %d games in %.2f sec", len(catalog_manager.current.catalog), catalog_warm_seconds)
+    except Exception:
+        logger.exception("Building the catalog failed; requests will retry")
+        return
+    # The slowest index comes last, so readiness does not wait for it; a
+    # "similar" question meanwhile waits for this build instead of starting its own
+    start = time.perf_counter()
+    catalog_manager.current.similar
+    logger.info("Similar-games table ready in %.2f sec", time.perf_counter() - start)
+
+def catalog_state() -> str:
+    if catalog_manager is not None:
+        return "ready"
+    return "failed" if catalog_error is not None else "warming"
+
+async def live_catalog() -> CatalogManager:
+    """Dependency of endpoints that need the catalog: waits off the event loop until it is built."""
+    if catalog_manager is not None:
+        return catalog_manager
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, ensure_catalog)
+    except (OSError, ValueError) as error:
+        raise HTTPException(status_code=503, detail=f"Catalog unavailable: {error}", headers={"Retry-After": "5"})
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Request and chat handler latency histograms and fallback counters, in Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+async def session_chatbot(session_id: str) -> GameChatbot:
+    """The session's chatbot, with its stored profile attached on first use."""
+    chatbot = sessions.get(session_id)
+    if profiles is not None and chatbot.on_preferences_changed is None:
+        # A profile missing from the cache is read from SQLite, so off the event loop
+        profile = await asyncio.get_running_loop().run_in_executor(None, profiles.get, session_id)
+        # Another request of the session may have attached it meanwhile
+        if chatbot.on_preferences_changed is None:
+            chatbot.user_preferences = profile
+            chatbot.on_preferences_changed = functools.partial(profiles.put, session_id)
+    return chatbot
+
+def server_busy() -> HTTPException:
+    REJECTIONS.inc("queue_full")
+    return HTTPException(status_code=503, detail="Server busy, try again shortly", headers={"Retry-After": "1"})
+
+@app.post("/chat", response_model=ChatResponse, dependencies=[Depends(get_api_key), Depends(live_catalog)])
+async def chat(request: ChatRequest, response: Response, session_id: str = Depends(get_session_id),
+               x_profile_token: Optional[str] = Header(None)):
     """Send message to Game Chatbot and get response."""
     user_input = request.message
-    bot_response = await chatbot.generate_response_async(user_input) if hasattr(chatbot, "generate_response_async") else chatbot.generate_response(user_input)
+    chatbot = await session_chatbot(session_id)
+    response.headers[SESSION_HEADER] = session_id
+    response.set_cookie(SESSION_COOKIE, session_id, max_age=int(SESSION_TTL), httponly=True)
+    try:
+        reason = profile_reason(x_profile_token) if profiler is not None else None
+        if reason is None:
+            bot_response = await chatbot.generate_response_async(user_input, executor)
+        else:
+            bot_response, report_id = await profiled_response(chatbot, user_input, reason)
+            if report_id is not None:
+                response.headers[PROFILE_HEADER] = report_id
+    except QueueFull:
+        raise server_busy()
     return ChatResponse(response=bot_response)
+
+def profile_reason(token: Optional[str]) -> Optional[str]:
+    """Why this request should be profiled, or None if it should not."""
+    if token is not None and PROFILE_TOKEN and secrets.compare_digest(token, PROFILE_TOKEN):
+        return "requested"
+    if profiler.sample_rate and random.random() < profiler.sample_rate:
+        return "sampled"
+    return None
+
+def get_profile_reader(x_profile_token: Optional[str] = Header(None), x_admin_token: Optional[str] = Header(None)):
+    """Profile reports describe other clients' requests, so reading them takes the profiling or admin token."""
+    for token, expected in ((x_profile_token, PROFILE_TOKEN), (x_admin_token, ADMIN_TOKEN)):
+        if token is not None and expected and secrets.compare_digest(token.encode(), expected.encode()):
+            return token
+    raise HTTPException(status_code=401, detail="Profile reports need X-Profile-Token or X-Admin-Token")
+
+async def profiled_response(chatbot: GameChatbot, user_input: str, reason: str):
+    """Answer under the profiler; returns the response and the report id."""
+    call = functools.partial(profiler.profile, chatbot.generate_response, user_input,
+                             reason=reason, message_chars=len(user_input))
+    if executor.kind == "thread":
+        return await executor.run(call)
+    # Process workers cannot run the session's chatbot, so profile it on a thread here
+    return await asyncio.get_running_loop().run_in_executor(None, call)
+
+def sse_events(chunks: Iterator[str]) -> Iterator[str]:
+    """Frame response chunks as Server-Sent Events, ending with a done event."""
+    # One event per chunk, but events are written in batches: the first as
+    # soon as the header and first game are ready, then every
+    # STREAM_FLUSH_BYTES, since each write costs a threadpool round trip
+    batch, size, flushed = [], 0, False
+    for chunk in chunks:
+        event = f"data: {json.dumps({'text': chunk})}\n\n"
+        batch.append(event)
+        size += len(event)
+        if size >= STREAM_FLUSH_BYTES or (not flushed and len(batch) >= 2):
+            yield "".join(batch)
+            batch, size, flushed = [], 0, True
+    batch.append("event: done\ndata: {}\n\n")
+    yield "".join(batch)
+
+@app.post("/chat/stream", dependencies=[Depends(get_api_key), Depends(live_catalog)])
+async def chat_stream(request: ChatRequest, session_id: str = Depends(get_session_id)):
+    """Stream the response as Server-Sent Events, one game block per event."""
+    chatbot = await session_chatbot(session_id)
+    # The sync generator is advanced in the threadpool, so rendering never blocks the loop
+    response = StreamingResponse(
+        sse_events(chatbot.stream_response(request.message)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no", SESSION_HEADER: session_id},
+    )
+    response.set_cookie(SESSION_COOKIE, session_id, max_age=int(SESSION_TTL), httponly=True)
+    return response
+
+@app.post("/chat/batch", response_model=BatchChatResponse, dependencies=[Depends(live_catalog)])
+async def chat_batch(request: BatchChatRequest, response: Response, api_key: str = Depends(get_api_key),
+                     session_id: str = Depends(get_session_id)):
+    """Send several messages at once; they are answered in order within one session."""
+    # Admission took a token for the request; the other messages cost one each
+    try:
+        admission.charge(api_key, len(request.messages) - 1)
+    except RateLimited as error:
+        REJECTIONS.inc("rate_limited")
+        raise HTTPException(status_code=429, detail=str(error), headers={"Retry-After": str(error.retry_after)})
+    chatbot = await session_chatbot(session_id)
+    response.headers[SESSION_HEADER] = session_id
+    response.set_cookie(SESSION_COOKIE, session_id, max_age=int(SESSION_TTL), httponly=True)
+    try:
+        responses = await executor.generate_batch(chatbot, request.messages)
+    except QueueFull:
+        raise server_busy()
+    return BatchChatResponse(responses=responses)
+
+@app.get("/profile", dependencies=[Depends(get_api_key)])
+async def profile(response: Response, session_id: str = Depends(get_session_id)):
+    """Favourite genres, platforms and playtime learned for this session; empty for unknown ones."""
+    response.headers[SESSION_HEADER] = session_id
+    # Only read: looking a profile up must not start a session
+    chatbot = sessions.peek(session_id)
+    if chatbot is not None:
+        return chatbot.user_preferences
+    if profiles is None:
+        return default_profile()
+    return await asyncio.get_running_loop().run_in_executor(None, profiles.get, session_id)
+
+@app.get("/profiles/stats", dependencies=[Depends(get_api_key)])
+async def profile_stats():
+    """Pending and written profile counts, or null when profiles are not persisted."""
+    return profiles.stats() if profiles is not None else None
+
+@app.get("/cache/stats", dependencies=[Depends(get_api_key), Depends(live_catalog)])
+async def cache_stats():
+    """Hit and miss counters of the rendered-response cache."""
+    return catalog_manager.current.renderer.stats()
+
+@app.get("/matcher/stats", dependencies=[Depends(get_api_key), Depends(live_catalog)])
+async def matcher_stats():
+    """Hit and miss counters of the message analysis cache."""
+    return catalog_manager.current.matcher.stats()
+
+@app.get("/executor/stats", dependencies=[Depends(get_api_key)])
+async def executor_stats():
+    """Pool size and pending, completed and rejected request counts."""
+    return executor.stats()
+
+@app.get("/admission/stats", dependencies=[Depends(get_api_key)])
+async def admission_stats():
+    """Chat requests in flight, the caps, and admitted and rejected counts."""
+    return admission.stats()
+
+@app.get("/sessions/stats", dependencies=[Depends(get_api_key)])
+async def session_stats():
+    """Session count, eviction counters and approximate session memory."""
+    return sessions.stats()
+
+@app.get("/admin/profiles", dependencies=[Depends(get_profile_reader)])
+async def profile_reports():
+    """Profiling settings and the stored request profiles, newest first."""
+    if profiler is None:
+        return {"enabled": False, "reports": []}
+    reports = await asyncio.get_running_loop().run_in_executor(None, profiler.reports)
+    return {"enabled": True, **profiler.stats(), "reports": reports}
+
+@app.get("/admin/profiles/{report_id}", dependencies=[Depends(get_profile_reader)])
+async def profile_report(report_id: str):
+    """One request profile: its slowest functions and top allocation sites."""
+    report = profiler.report(report_id) if profiler is not None else None
+    if report is None:
+        raise HTTPException(status_code=404, detail="No such profile")
+    return report
+
+@app.get("/admin/profiles/{report_id}/pstats", dependencies=[Depends(get_profile_reader)])
+async def profile_pstats(report_id: str):
+    """The raw cProfile stats of a request profile, for pstats or snakeviz."""
+    path = profiler.path(report_id, ".prof") if profiler is not None else None
+    if path is None or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="No such profile")
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{report_id}.prof")
+
+@app.get("/games", dependencies=[Depends(get_api_key), Depends(live_catalog)])
+async def games(
+    genre: Optional[List[str]] = Query(None),
+    platform: Optional[List[str]] = Query(None),
+    playtime: Optional[str] = None,
+    min_rating: Optional[float] = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=PAGE_MAX),
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+):
+    """Browse the catalog by genre, platform, playtime and rating, best rated first, a page at a time."""
+    # Read the version before the bundle: a swap in between labels the new page
+    # with the old version, which the next request corrects, never the reverse
+    version = catalog_manager.version
+    shared = catalog_manager.current
+    # Tags and cursors name the content rather than the version, which starts
+    # at 0 again whenever a process loads a catalog
+    if shared.digest_built:
+        digest = shared.digest
+    else:
+        digest = await asyncio.get_running_loop().run_in_executor(None, lambda: shared.digest)
+    genres = sorted(set(genre)) if genre else None
+    platforms = sorted(set(platform)) if platform else None
+    query = (genres, platforms, playtime, min_rating, limit, cursor)
+    etag = '"%s"' % hashlib.blake2b(f"{digest}:{query!r}".encode(), digest_size=8).hexdigest()
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    try:
+        after = decode_cursor(cursor, digest) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    except LookupError:
+        raise HTTPException(status_code=409, detail="The catalog changed since this cursor was issued; "
+                                                    "start again from the first page")
+    page, next_cursor = catalog_page(shared, genres, platforms, playtime, min_rating, limit, after)
+    return JSONResponse({"version": version, "games": page, "next_cursor": next_cursor}, headers=headers)
+
+def catalog_page(shared: SharedCatalog, genres: Optional[List[str]], platforms: Optional[List[str]],
+                 playtime: Optional[str], min_rating: Optional[float], limit: int,
+                 after: Optional[Tuple[float, int]]) -> Tuple[List[Dict], Optional[str]]:
+    """Up to limit matching games after the cursor position, and the cursor of the next page."""
+    catalog = shared.catalog
+    game_ids = []
+    for game_id in shared.index.search(genres, platforms, playtime, after):
+        # Games come best rated first, so the first one below min_rating ends the listing
+        if min_rating is not None and catalog.ratings[game_id] < min_rating:
+            break
+        if len(game_ids) == limit:
+            last = game_ids[-1]
+            return ([catalog[game_id].to_dict() for game_id in game_ids],
+                    encode_cursor(shared.digest, catalog.ratings[last], last))
+        game_ids.append(game_id)
+    return [catalog[game_id].to_dict() for game_id in game_ids], None
+
+def encode_cursor(digest: str, rating: float, game_id: int) -> str:
+    """
+    Opaque cursor for the position after this game in the rating order of
+    the catalog with this digest. Removing a game renumbers another, so a
+    cursor is only valid for the exact catalog content it was issued for.
+    """
+    return base64.urlsafe_b64encode(f"{digest[:CURSOR_DIGEST]}:{rating!r}:{game_id}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, digest: str) -> Tuple[float, int]:
+    """
+    The (rating, game id) a cursor from encode_cursor points behind;
+    ValueError if it is malformed, LookupError if it was issued for another
+    catalog content than digest.
+    """
+    cursor_digest, rating, game_id = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().split(":")
+    if int(game_id) < 0:
+        raise ValueError(f"Invalid game id {game_id}")
+    if cursor_digest != digest[:CURSOR_DIGEST]:
+        raise LookupError("Cursor is for another catalog")
+    return float(rating), int(game_id)
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Whether an If-None-Match header names etag; weak tags compare equal to strong ones."""
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+def check_catalog_updatable():
+    """Process workers each hold their own catalog, which a swap here would not reach."""
+    if executor.kind == "process":
+        raise HTTPException(status_code=409, detail="Catalog updates need GAME_EXECUTOR=thread")
+
+@app.get("/admin/catalog", dependencies=[Depends(get_admin_token), Depends(live_catalog)])
+async def catalog_status():
+    """Live catalog version, size and reload counters."""
+    return catalog_manager.stats()
+
+@app.post("/admin/catalog/reload", dependencies=[Depends(get_admin_token), Depends(live_catalog)])
+async def catalog_reload():
+    """Rebuild the catalog from GAME_CATALOG_FILE in the background and swap it in if newer."""
+    if catalog_manager.path is None:
+        raise HTTPException(status_code=409, detail="No GAME_CATALOG_FILE configured")
+    check_catalog_updatable()
+    try:
+        swapped = await asyncio.get_running_loop().run_in_executor(None, catalog_manager.reload)
+    except (OSError, ValueError) as error:
+        raise HTTPException(status_code=400, detail=f"Reload failed: {error}")
+    return {"swapped": swapped, **catalog_manager.stats()}
+
+@app.post("/admin/catalog/delta", dependencies=[Depends(get_admin_token), Depends(live_catalog)])
+async def catalog_delta(request: CatalogDeltaRequest):
+    """Add, update or remove games without rebuilding the catalog indexes."""
+    check_catalog_updatable()
+    apply = functools.partial(catalog_manager.apply, request.changes, request.version, request.base_version)
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, apply)
+    except VersionConflict as error:
+        raise HTTPException(status_code=409, detail=str(error))
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    return catalog_manager.stats()
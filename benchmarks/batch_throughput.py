@@ -0,0 +1,68 @@
+"""
+Messages per second answered one request at a time versus in batches.
+
+Measures both the in-process methods (generate_response in a loop versus
+generate_responses) and the HTTP endpoints (/chat versus /chat/batch)
+through an in-process ASGI test client, over a mixed message workload.
+
+Usage: python -m benchmarks.batch_throughput [MESSAGES]
+"""
+
+import random
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+import api
+from game_chatbot import GameChatbot
+
+WORKLOAD = [
+    "Hello!", "Recommend me action games", "Tell me about The Witcher 3", "I want PC games",
+    "Give me puzzle games", "Share a gaming tip", "Tell me a gaming fact", "Review Portal 2",
+    "recommend short games for xbox", "tell me about hades", "review celeste", "switch games",
+    "recommend adventure games", "what is forza", "this is cool", "recommend long strategy games on playstation",
+]
+BATCH_SIZES = (1, 10, 50, 100)
+
+
+def workload(count: int):
+    rng = random.Random(42)
+    return [rng.choice(WORKLOAD) for _ in range(count)]
+
+
+def rate(count: int, seconds: float) -> str:
+    return f"{count / seconds:>10,.0f}"
+
+
+def main(count: int = 2000):
+    messages = workload(count)
+    headers = {"X-API-Key": api.API_KEY, "X-Session-ID": "benchmark"}
+    client = TestClient(api.app)
+
+    print(f"{'mode':<20} {'batch':>6} {'msg/s':>10}")
+    bot = GameChatbot(api.ensure_catalog().current)
+    start = time.perf_counter()
+    for message in messages:
+        bot.generate_response(message)
+    print(f"{'generate_response':<20} {1:>6} {rate(count, time.perf_counter() - start)}")
+    for size in BATCH_SIZES[1:]:
+        bot = GameChatbot(api.ensure_catalog().current)
+        start = time.perf_counter()
+        for offset in range(0, count, size):
+            bot.generate_responses(messages[offset:offset + size])
+        print(f"{'generate_responses':<20} {size:>6} {rate(count, time.perf_counter() - start)}")
+
+    start = time.perf_counter()
+    for message in messages:
+        client.post("/chat", json={"message": message}, headers=headers)
+    print(f"{'POST /chat':<20} {1:>6} {rate(count, time.perf_counter() - start)}")
+    for size in BATCH_SIZES:
+        start = time.perf_counter()
+        for offset in range(0, count, size):
+            client.post("/chat/batch", json={"messages": messages[offset:offset + size]}, headers=headers)
+        print(f"{'POST /chat/batch':<20} {size:>6} {rate(count, time.perf_counter() - start)}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
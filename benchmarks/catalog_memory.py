@@ -0,0 +1,58 @@
+"""
+Compare the memory footprint of the dict-of-lists game database with the
+columnar GameCatalog.
+
+Usage: python -m benchmarks.catalog_memory [COUNT ...]
+"""
+
+import gc
+import sys
+import tracemalloc
+from typing import Callable, Dict
+
+from benchmarks.synthetic import GENRES, iter_synthetic_games
+from game_catalog import GameCatalog
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+
+
+def build_dict_layout(count: int) -> Dict:
+    games_db: Dict = {genre: [] for genre in GENRES}
+    for genre, game in iter_synthetic_games(count):
+        games_db[genre].append(game)
+    return games_db
+
+
+def build_columnar_layout(count: int) -> GameCatalog:
+    catalog = GameCatalog()
+    for genre in GENRES:
+        catalog.genres.intern(genre)
+    for genre, game in iter_synthetic_games(count):
+        catalog.add_game(genre, game)
+    return catalog
+
+
+def measure(builder: Callable, count: int) -> int:
+    """Return the bytes still allocated by the structure builder() returns"""
+    gc.collect()
+    tracemalloc.start()
+    result = builder(count)
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+def main(sizes=DEFAULT_SIZES):
+    print(f"{'titles':>10} {'dict layout':>14} {'columnar':>14} {'per title':>18} {'ratio':>7}")
+    for count in sizes:
+        dict_bytes = measure(build_dict_layout, count)
+        columnar_bytes = measure(build_columnar_layout, count)
+        per_title = f"{dict_bytes / count:.0f} -> {columnar_bytes / count:.0f} B"
+        print(f"{count:>10,} {dict_bytes / 2**20:>11.1f} MiB {columnar_bytes / 2**20:>11.1f} MiB "
+              f"{per_title:>18} {dict_bytes / columnar_bytes:>6.2f}x")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
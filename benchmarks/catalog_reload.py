@@ -0,0 +1,87 @@
+"""
+Catalog updates: full rebuild versus a one-game delta, and chat latency
+while a full reload runs in the background.
+
+Usage: python -m benchmarks.catalog_reload [COUNT ...]
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.synthetic import iter_synthetic_games, synthetic_games_db
+from catalog_reload import CatalogManager, apply_changes, write_catalog_file
+from game_chatbot import GameChatbot
+
+DEFAULT_SIZES = (20_000, 100_000)
+MESSAGES = ["Tell me about Radiant Kingdom 12", "Recommend a short puzzle game for Switch", "Hello!"]
+
+
+def milliseconds(function, repeats: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def percentile(samples, fraction: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def chat_latencies(bot: GameChatbot, until: threading.Event):
+    latencies = []
+    while not until.is_set():
+        for message in MESSAGES:
+            start = time.perf_counter()
+            bot.generate_response(message)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main(sizes=DEFAULT_SIZES):
+    print(f"{'titles':>8} {'rebuild ms':>11} {'add ms':>7} {'update ms':>10} {'remove ms':>10} "
+          f"{'chat p99 ms idle':>17} {'during reload':>14}")
+    for count in sizes:
+        games_db = synthetic_games_db(count)
+        genre, game = next(iter_synthetic_games(1, seed=99))
+        name = games_db[genre][0]['name']
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'catalog.json')
+            write_catalog_file(path, games_db, 1)
+            manager = CatalogManager.from_file(path)
+            shared = manager.current
+
+            start = time.perf_counter()
+            write_catalog_file(path, games_db, 2)
+            manager.reload()
+            rebuild = (time.perf_counter() - start) * 1000
+
+            add = milliseconds(lambda: apply_changes(shared, [{'op': 'add', 'genre': genre, 'game': game}]))
+            update = milliseconds(lambda: apply_changes(shared, [
+                {'op': 'update', 'name': name, 'genre': genre, 'game': dict(game, name=name)}]))
+            remove = milliseconds(lambda: apply_changes(shared, [{'op': 'remove', 'name': name}]))
+
+            bot = GameChatbot(manager)
+            stop = threading.Event()
+            timer = threading.Timer(2.0, stop.set)
+            timer.start()
+            idle = chat_latencies(bot, stop)
+
+            stop.clear()
+            write_catalog_file(path, games_db, 3)
+            reloader = threading.Thread(target=lambda: (manager.reload(), stop.set()))
+            reloader.start()
+            during = chat_latencies(bot, stop)
+            reloader.join()
+
+        print(f"{count:>8,} {rebuild:>11.0f} {add:>7.1f} {update:>10.1f} {remove:>10.1f} "
+              f"{percentile(idle, 0.99) * 1000:>17.2f} {percentile(during, 0.99) * 1000:>14.2f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
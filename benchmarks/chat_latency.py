@@ -0,0 +1,73 @@
+"""
+/chat latency percentiles under concurrent load.
+
+CLIENTS concurrent clients each send REQUESTS messages through an
+in-process ASGI client. One message in SLOW_EVERY is a genre listing with
+the render cache bypassed, so it scans and renders the whole genre every
+time, which is slow on a large catalog. The other messages are cheap, and
+their latency shows how much a slow request holds up everyone else. Point
+GAME_CATALOG_SNAPSHOT at a large snapshot to make the slow requests slow.
+With GAME_EXECUTOR=process the bypass only applies in this process, so the
+worker processes serve slow requests from their caches.
+
+Usage: python benchmarks/chat_latency.py [CLIENTS] [REQUESTS] [SLOW_EVERY]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+
+import api
+from response_renderer import render_genre
+
+FAST_MESSAGES = ["Hello!", "Review Portal 2", "Recommend me action games", "I want PC games",
+                 "Share a gaming tip", "tell me about hades"]
+SLOW_EVERY = 200
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def client_loop(client: httpx.AsyncClient, number: int, clients: int, requests: int, slow_every: int,
+                      fast: list, slow: list):
+    headers = {"X-API-Key": api.API_KEY, "X-Session-ID": f"load-{number}"}
+    genre = api.ensure_catalog().current.catalog.genres.value(0)
+    for request in range(requests):
+        # Spread slow requests evenly over the run rather than bunching them
+        is_slow = (request * clients + number) % slow_every == 0
+        if is_slow:
+            message = f"Give me {genre} games"
+        else:
+            message = FAST_MESSAGES[request % len(FAST_MESSAGES)]
+        start = time.perf_counter()
+        response = await client.post("/chat", json={"message": message}, headers=headers)
+        elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code == 200:
+            (slow if is_slow else fast).append(elapsed)
+
+
+async def main(clients: int = 32, requests: int = 50, slow_every: int = SLOW_EVERY):
+    fast, slow = [], []
+    catalog = api.ensure_catalog().current.catalog
+    api.ensure_catalog().current.renderer.genre = lambda genre: render_genre(genre, catalog.games_in_genre(genre))
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client, n, clients, requests, slow_every, fast, slow) for n in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    print(f"catalog: {len(api.ensure_catalog().current.catalog):,} titles, {clients} clients, "
+          f"{len(fast) + len(slow)} requests in {elapsed:.2f}s")
+    for name, values in (('fast', fast), ('slow', slow), ('all', fast + slow)):
+        if values:
+            print(f"{name:<5} n={len(values):<5} p50 {statistics.median(values):8.2f} ms   "
+                  f"p99 {percentile(values, 0.99):8.2f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(*(int(arg) for arg in sys.argv[1:4])))
@@ -0,0 +1,125 @@
+"""
+Cold start of the API and the cost of the container health probe.
+
+Starts uvicorn with a catalog and polls it until it answers /health and
+until it answers a /chat message, timing both from the moment the process
+was spawned. Then runs the Dockerfile's health probe a few times and
+reports its wall time, CPU time and memory.
+
+Usage: python -m benchmarks.cold_start [COUNT]   (COUNT synthetic titles; 0 = bundled catalog)
+"""
+
+import json
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.synthetic import synthetic_games_db
+from catalog_reload import write_catalog_file
+from shared_catalog import SharedCatalog
+
+PORT = 8765
+URL = f"http://127.0.0.1:{PORT}"
+API_KEY = "mysecretapikey123"
+PROBES = 10
+
+
+def wait_for(request: urllib.request.Request, started: float, limit: float = 600.0) -> float:
+    """Seconds from started until request first succeeds"""
+    while time.perf_counter() - started < limit:
+        try:
+            with urllib.request.urlopen(request, timeout=5):
+                return time.perf_counter() - started
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.005)
+    raise TimeoutError(f"{request.full_url} did not answer within {limit}s")
+
+
+def time_to_first_request(env: dict):
+    started = time.perf_counter()
+    server = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'api:app', '--port', str(PORT), '--log-level',
+                               'warning'], env={**os.environ, **env}, stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL)
+    try:
+        health = wait_for(urllib.request.Request(f"{URL}/health"), started)
+        chat = wait_for(urllib.request.Request(
+            f"{URL}/chat", data=json.dumps({"message": "Hello!"}).encode(),
+            headers={"X-API-Key": API_KEY, "Content-Type": "application/json"}), started)
+    finally:
+        server.terminate()
+        server.wait()
+    return health, chat
+
+
+# Spawns the probes from a bare interpreter: a child's peak memory counts
+# what it inherited at fork, which from this process would be a whole catalog
+PROBE_RUNNER = """
+import json, os, subprocess, sys, time
+walls, cpu, memory, failures = [], 0.0, 0, 0
+for _ in range(int(sys.argv[1])):
+    start = time.perf_counter()
+    probe = subprocess.Popen(sys.argv[2:], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, usage = os.wait4(probe.pid, 0)
+    failures += status != 0
+    walls.append(time.perf_counter() - start)
+    cpu += usage.ru_utime + usage.ru_stime
+    memory = max(memory, usage.ru_maxrss)
+print(json.dumps([min(walls), cpu / len(walls), memory, failures]))
+"""
+
+
+def probe_cost(command, env: dict):
+    """Best wall ms, mean CPU ms, peak memory KB and failures of command over PROBES runs"""
+    output = subprocess.run([sys.executable, '-S', '-c', PROBE_RUNNER, str(PROBES), *command],
+                            env={**os.environ, **env}, capture_output=True, check=True, text=True).stdout
+    wall, cpu, memory, failures = json.loads(output)
+    return wall * 1000, cpu * 1000, memory, failures
+
+
+def dockerfile_probe():
+    """The command of the Dockerfile's HEALTHCHECK"""
+    with open(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Dockerfile')) as handle:
+        lines = handle.read().split('HEALTHCHECK', 1)[1].replace('\\\n', ' ')
+    command = lines.split(' CMD ', 1)[1].split('\n', 1)[0]
+    return shlex.split(command.split('||')[0])
+
+
+def main(count: int = 0):
+    with tempfile.TemporaryDirectory() as directory:
+        setups = [('bundled catalog', {})]
+        if count:
+            games_db = synthetic_games_db(count)
+            catalog_file = os.path.join(directory, 'catalog.json')
+            snapshot = os.path.join(directory, 'catalog.snap')
+            write_catalog_file(catalog_file, games_db, 1)
+            SharedCatalog.from_games_db(games_db).save(snapshot)
+            setups += [(f'{count:,}-title file', {'GAME_CATALOG_FILE': catalog_file}),
+                       (f'{count:,}-title snapshot', {'GAME_CATALOG_SNAPSHOT': snapshot})]
+
+        print(f"{'catalog':<24} {'/health s':>10} {'first /chat s':>14}")
+        for name, env in setups:
+            health, chat = time_to_first_request(env)
+            print(f"{name:<24} {health:>10.2f} {chat:>14.2f}")
+
+    command = dockerfile_probe()
+    server = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'api:app', '--port', str(PORT), '--log-level',
+                               'warning'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for(urllib.request.Request(f"{URL}/health"), time.perf_counter())
+        wait_for(urllib.request.Request(f"{URL}/ready"), time.perf_counter())
+        wall, cpu, memory, failures = probe_cost(command, {'GAME_HEALTH_URL': f"{URL}/ready"})
+    finally:
+        server.terminate()
+        server.wait()
+    print(f"\nhealth probe {' '.join(command)}")
+    print(f"  wall {wall:.0f} ms, CPU {cpu:.0f} ms, peak memory of probes {memory / 1024:.0f} MB, "
+          f"{failures} of {PROBES} failed")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,101 @@
+"""
+Microbenchmark: the compiled IntentMatcher against the substring scans it
+replaced in GameChatbot.detect_intent and extract_game_preferences.
+
+Usage: python -m benchmarks.intent_matching
+"""
+
+import timeit
+from typing import Dict
+
+from intent_matcher import IntentMatcher
+
+GENRES = ['action', 'adventure', 'strategy', 'puzzle', 'racing', 'indie']
+
+SHORT_INPUTS = [
+    "Hello!",
+    "Recommend me action games",
+    "Tell me about The Witcher 3",
+    "I want short puzzle games for PC",
+    "Goodbye",
+]
+LONG_INPUTS = [
+    ("So I have been playing a lot lately and I finished most of the big releases this year, "
+     "mostly on my console but sometimes on a laptop, and I was wondering whether you could "
+     "recommend something long and story driven, ideally an adventure or strategy title ") * 4,
+    ("My friends keep arguing about which racing series is better and honestly I do not have "
+     "an opinion yet because I never had the time to sit down with either of them properly ") * 4,
+]
+
+
+def legacy_detect_intent(user_input: str) -> str:
+    """detect_intent as it was before the compiled matcher"""
+    user_input = user_input.lower()
+    if any(word in user_input for word in ['recommend', 'suggestion', 'should i play', 'what game', 'good games']):
+        return 'recommendation'
+    elif any(word in user_input for word in ['tell me about', 'what is', 'information about', 'details']):
+        return 'game_info'
+    elif any(word in user_input for word in ['platform', 'console', 'pc', 'playstation', 'xbox', 'switch']):
+        return 'platform_preference'
+    elif any(word in user_input for word in ['action', 'adventure', 'strategy', 'puzzle', 'racing', 'indie', 'genre']):
+        return 'genre_preference'
+    elif any(word in user_input for word in ['tip', 'advice', 'help', 'how to', 'guide']):
+        return 'tips'
+    elif any(word in user_input for word in ['fact', 'interesting', 'did you know', 'trivia']):
+        return 'facts'
+    elif any(word in user_input for word in ['review', 'opinion', 'rating', 'worth playing']):
+        return 'review'
+    elif any(word in user_input for word in ['hello', 'hi', 'hey', 'greetings']):
+        return 'greeting'
+    elif any(word in user_input for word in ['bye', 'goodbye', 'exit', 'quit']):
+        return 'goodbye'
+    return 'general_chat'
+
+
+def legacy_extract_preferences(user_input: str) -> Dict:
+    """extract_game_preferences as it was before the compiled matcher"""
+    preferences = {}
+    user_input = user_input.lower()
+    genres = [genre for genre in GENRES if genre in user_input]
+    if genres:
+        preferences['genres'] = genres
+    platform_keywords = {
+        'pc': 'PC', 'computer': 'PC',
+        'playstation': 'PlayStation', 'ps4': 'PlayStation', 'ps5': 'PlayStation',
+        'xbox': 'Xbox', 'switch': 'Switch', 'nintendo': 'Switch'
+    }
+    platforms = [platform for keyword, platform in platform_keywords.items() if keyword in user_input]
+    if platforms:
+        preferences['platforms'] = platforms
+    if any(word in user_input for word in ['short', 'quick', 'brief']):
+        preferences['playtime'] = 'short'
+    elif any(word in user_input for word in ['long', 'lengthy', 'extended']):
+        preferences['playtime'] = 'long'
+    elif any(word in user_input for word in ['medium', 'moderate']):
+        preferences['playtime'] = 'medium'
+    return preferences
+
+
+def per_call_us(func, inputs, number: int) -> float:
+    def run():
+        for user_input in inputs:
+            func(user_input)
+    return min(timeit.repeat(run, number=number, repeat=5)) / (number * len(inputs)) * 1e6
+
+
+def main():
+    matcher = IntentMatcher(GENRES)
+
+    def legacy(user_input):
+        return legacy_detect_intent(user_input), legacy_extract_preferences(user_input)
+
+    print(f"{'inputs':<8} {'avg chars':>9} {'legacy':>12} {'compiled':>12} {'speedup':>8}")
+    for label, inputs, number in (('short', SHORT_INPUTS, 5000), ('long', LONG_INPUTS, 500)):
+        legacy_us = per_call_us(legacy, inputs, number)
+        compiled_us = per_call_us(matcher.analyze, inputs, number)
+        avg_chars = sum(map(len, inputs)) / len(inputs)
+        print(f"{label:<8} {avg_chars:>9.0f} {legacy_us:>9.2f} us {compiled_us:>9.2f} us {legacy_us / compiled_us:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
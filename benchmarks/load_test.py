@@ -0,0 +1,416 @@
+"""
+Load generator for the chat API.
+
+Replays a weighted mix of intents against POST /chat, either at a target
+rate (open loop: requests arrive on a Poisson schedule whether or not
+earlier ones have finished, and latency counts from the scheduled arrival,
+so a stalled server shows up as latency rather than as a slower client) or
+at a fixed concurrency (closed loop: each client sends its next request
+when the previous one is answered). Requests are spread over a pool of
+sessions, as real users would be.
+
+By default the API runs in-process through httpx's ASGI transport, sharing
+the event loop and CPU with the load generator; that is handy for quick
+comparisons between code changes. For sizing a deployment, start uvicorn
+with the workers and GAME_EXECUTOR settings under test and pass --url.
+Requests to a URL go over a minimal keep-alive HTTP/1.1 client rather than
+httpx, which spends several times more CPU per request than the server
+does to answer it and so could not overload a server on the same machine.
+
+The report gives throughput, p50/p95/p99 latency and error rates, overall
+and per intent, and the latency of the admitted (2xx) requests alone: under
+overload the server turns the excess away with fast 429s and 503s, which
+would otherwise flatter the overall percentiles. --output saves it as JSON, and --compare prints saved
+reports side by side.
+
+Usage: python -m benchmarks.load_test [--url URL] [--rate RPS | --concurrency N]
+       [--duration SECONDS] [--mix recommendation=4,game_info=3,...] [--output FILE]
+       python -m benchmarks.load_test --compare REPORT.json [REPORT.json ...]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, NamedTuple, Optional, Sequence
+from urllib.parse import urlsplit
+
+import httpx
+
+from game_chatbot import DEFAULT_GAMES_DB
+
+API_KEY = "mysecretapikey123"
+DEFAULT_MIX = {'recommendation': 4, 'game_info': 3, 'review': 2, 'chit_chat': 1}
+DEFAULT_DURATION = 10.0
+DEFAULT_CONCURRENCY = 16
+DEFAULT_SESSIONS = 200
+TIMEOUT = 30.0
+
+INTENT_MESSAGES = {
+    'recommendation': ["Recommend me some {genre} games", "Recommend a {playtime} {genre} game for {platform}",
+                       "What game should I play on {platform}?"],
+    'game_info': ["Tell me about {title}", "tell me about {lower}", "What is {title}?"],
+    'review': ["Review {title}", "Is {title} worth playing?"],
+    'similar': ["Any games similar to {title}?", "Games like {title}"],
+    'genre': ["Give me {genre} games"],
+    'platform': ["I want {platform} games"],
+    'tips': ["Share a gaming tip", "Tell me a gaming fact"],
+    'chit_chat': ["Hello!", "Thanks, that helps", "I have been gaming all weekend", "Goodbye"],
+}
+GENRES = ['action', 'adventure', 'strategy', 'puzzle', 'racing', 'indie']
+PLATFORMS = ['PC', 'PlayStation', 'Xbox', 'Switch', 'Mobile']
+PLAYTIMES = ['short', 'medium', 'long']
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """'recommendation=4,game_info=3' -> {'recommendation': 4.0, 'game_info': 3.0}"""
+    mix = {}
+    for part in text.split(','):
+        intent, _, weight = part.partition('=')
+        intent = intent.strip()
+        if intent not in INTENT_MESSAGES:
+            raise ValueError(f"Unknown intent {intent!r}; choose from {', '.join(INTENT_MESSAGES)}")
+        mix[intent] = float(weight or 1)
+        if mix[intent] < 0:
+            raise ValueError(f"Weight of {intent} must not be negative")
+    if not any(mix.values()):
+        raise ValueError("The mix needs at least one intent with a positive weight")
+    return mix
+
+
+def load_titles(catalog_file: Optional[str] = None) -> List[str]:
+    """Titles to ask about: from a catalog file, else from the bundled catalog"""
+    games_db = DEFAULT_GAMES_DB
+    if catalog_file:
+        with open(catalog_file, encoding='utf-8') as handle:
+            games_db = json.load(handle)['games']
+    return [game['name'] for games in games_db.values() for game in games]
+
+
+class MessageMix:
+    """Draws (intent, message) pairs in proportion to the mix weights"""
+
+    def __init__(self, mix: Dict[str, float], titles: Sequence[str], seed: int = 0):
+        self.intents = [intent for intent, weight in mix.items() if weight > 0]
+        self.weights = [mix[intent] for intent in self.intents]
+        self.titles = titles
+        self.rng = random.Random(seed)
+
+    def next(self):
+        rng = self.rng
+        intent = rng.choices(self.intents, self.weights)[0]
+        title = rng.choice(self.titles)
+        message = rng.choice(INTENT_MESSAGES[intent]).format(
+            genre=rng.choice(GENRES), platform=rng.choice(PLATFORMS), playtime=rng.choice(PLAYTIMES),
+            title=title, lower=title.lower())
+        return intent, message
+
+
+def percentile(ordered: Sequence[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+
+def summarise(samples) -> Dict:
+    """Counts, error rate and latency percentiles in ms for (latency, status) samples"""
+    latencies = sorted(latency * 1000 for latency, _ in samples)
+    statuses = Counter(str(status) for _, status in samples)
+    errors = sum(count for status, count in statuses.items() if not status.startswith('2'))
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'max_ms': round(latencies[-1], 2) if latencies else 0.0,
+        'statuses': dict(sorted(statuses.items())),
+    }
+
+
+class SocketResponse(NamedTuple):
+    status_code: int
+
+
+class SocketClient:
+    """
+    Keep-alive HTTP/1.1 client for POSTs of JSON, a few socket calls per
+    request; it expects Content-Length framed answers, as uvicorn sends
+    """
+
+    def __init__(self, url: str, timeout: float = TIMEOUT):
+        parts = urlsplit(url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.timeout = timeout
+        self._idle = []
+
+    async def post(self, path: str, json: Dict, headers: Dict[str, str]) -> SocketResponse:
+        return await asyncio.wait_for(self._post(path, json, headers), self.timeout)
+
+    async def _post(self, path: str, payload: Dict, headers: Dict[str, str]) -> SocketResponse:
+        body = json.dumps(payload).encode()
+        head = ''.join(f"{name}: {value}\r\n" for name, value in headers.items())
+        request = (f"POST {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+                   f"Content-Length: {len(body)}\r\n{head}\r\n").encode() + body
+        reused = bool(self._idle)
+        reader, writer = self._idle.pop() if reused else await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write(request)
+            try:
+                status_line = await reader.readuntil(b"\r\n")
+            except (asyncio.IncompleteReadError, ConnectionError):
+                if not reused:
+                    raise
+                # The server closed the idle connection; the request never arrived, so send it again
+                writer.close()
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+                writer.write(request)
+                status_line = await reader.readuntil(b"\r\n")
+            header_block = await reader.readuntil(b"\r\n\r\n")
+            length, reusable = 0, True
+            for line in header_block.lower().split(b"\r\n"):
+                if line.startswith(b"content-length:"):
+                    length = int(line[15:])
+                elif line == b"connection: close":
+                    reusable = False
+            await reader.readexactly(length)
+        except BaseException:
+            writer.close()
+            raise
+        if reusable:
+            self._idle.append((reader, writer))
+        else:
+            writer.close()
+        return SocketResponse(int(status_line.split(b" ", 2)[1]))
+
+    async def aclose(self):
+        for _, writer in self._idle:
+            writer.close()
+        self._idle = []
+
+
+class LoadTest:
+    """One load run against client, recording (intent, latency, status) per request"""
+
+    def __init__(self, client, mix: MessageMix, sessions: int = DEFAULT_SESSIONS,
+                 api_key: str = API_KEY, max_in_flight: Optional[int] = None):
+        self.client = client
+        # httpx scans every waiting request on each pool change, which
+        # stalls the generator once thousands queue up; they wait here instead
+        self.in_flight = asyncio.Semaphore(max_in_flight) if max_in_flight else None
+        self.mix = mix
+        self.sessions = sessions
+        self.api_key = api_key
+        self.samples = []
+        self.recording = False
+
+    async def send(self, sent_at: float):
+        """Send the next message of the mix; latency counts from sent_at"""
+        intent, message = self.mix.next()
+        session = f"load-{self.mix.rng.randrange(self.sessions)}"
+        headers = {"X-API-Key": self.api_key, "X-Session-ID": session}
+        if self.in_flight:
+            await self.in_flight.acquire()
+        try:
+            response = await self.client.post("/chat", json={"message": message}, headers=headers)
+            status = response.status_code
+        except (httpx.HTTPError, OSError, EOFError, asyncio.TimeoutError) as error:
+            # Timeouts and refused connections count as errors, by kind
+            status = type(error).__name__
+        finally:
+            if self.in_flight:
+                self.in_flight.release()
+        if self.recording:
+            self.samples.append((intent, time.perf_counter() - sent_at, status))
+
+    async def closed_loop(self, concurrency: int, until: float):
+        async def client_loop():
+            while time.perf_counter() < until:
+                await self.send(time.perf_counter())
+
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+
+    async def open_loop(self, rate: float, until: float):
+        pending = set()
+        arrival = time.perf_counter()
+        while arrival < until:
+            delay = arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            task = asyncio.ensure_future(self.send(arrival))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+            arrival += self.mix.rng.expovariate(rate)
+        if pending:
+            await asyncio.wait(pending)
+
+    async def run(self, duration: float, rate: Optional[float] = None,
+                  concurrency: int = DEFAULT_CONCURRENCY, warmup: float = 1.0) -> Dict:
+        """Warm up, then drive load for duration seconds; returns the summary and per-intent results"""
+        drive = ((lambda until: self.open_loop(rate, until)) if rate
+                 else (lambda until: self.closed_loop(concurrency, until)))
+        if warmup > 0:
+            await drive(time.perf_counter() + warmup)
+        self.samples, self.recording = [], True
+        start = time.perf_counter()
+        await drive(start + duration)
+        elapsed = time.perf_counter() - start
+        self.recording = False
+
+        by_intent = defaultdict(list)
+        for intent, latency, status in self.samples:
+            by_intent[intent].append((latency, status))
+        summary = summarise([(latency, status) for _, latency, status in self.samples])
+        summary['duration_s'] = round(elapsed, 3)
+        summary['throughput_rps'] = round(len(self.samples) / elapsed, 1)
+        admitted = summarise([(latency, status) for _, latency, status in self.samples
+                              if str(status).startswith('2')])
+        admitted['throughput_rps'] = round(admitted['requests'] / elapsed, 1)
+        return {'summary': summary, 'admitted': admitted,
+                'intents': {intent: summarise(samples) for intent, samples in sorted(by_intent.items())}}
+
+
+async def server_info(client: httpx.AsyncClient, api_key: str = API_KEY) -> Dict:
+    """Executor and catalog settings of the server under test, for telling reports apart"""
+    info = {}
+    for name, path in (('executor', '/executor/stats'), ('catalog', '/ready')):
+        try:
+            response = await client.get(path, headers={"X-API-Key": api_key})
+            if response.status_code == 200:
+                info[name] = response.json()
+        except httpx.HTTPError:
+            pass
+    executor = info.get('executor', {})
+    catalog = info.get('catalog', {})
+    return {'executor': executor.get('kind'), 'workers': executor.get('workers'), 'games': catalog.get('games')}
+
+
+async def load_test(url: Optional[str] = None, rate: Optional[float] = None,
+                    concurrency: int = DEFAULT_CONCURRENCY, duration: float = DEFAULT_DURATION,
+                    mix: Optional[Dict[str, float]] = None, sessions: int = DEFAULT_SESSIONS,
+                    titles: Optional[Sequence[str]] = None, warmup: float = 1.0, seed: int = 0,
+                    label: Optional[str] = None, api_key: str = API_KEY) -> Dict:
+    """Run one load test against url (or the in-process app) and return its report"""
+    mix = mix or DEFAULT_MIX
+    connections = max(concurrency, 100)
+    if url:
+        transport = None
+        limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+    else:
+        import api
+
+        # Per-request log lines would cost the in-process server more than some requests do
+        for name in ('api', 'httpx'):
+            logging.getLogger(name).setLevel(logging.WARNING)
+        transport, limits, url = httpx.ASGITransport(app=api.app), httpx.Limits(), "http://load-test"
+        titles = titles or list(api.ensure_catalog().current.catalog.names)
+
+    async with httpx.AsyncClient(base_url=url, transport=transport, limits=limits, timeout=TIMEOUT) as client:
+        # The load itself goes over the cheaper socket client when there is a socket to talk to
+        sender = SocketClient(url) if transport is None else client
+        test = LoadTest(sender, MessageMix(mix, titles or load_titles(), seed), sessions, api_key,
+                        max_in_flight=connections if transport is None else None)
+        try:
+            results = await test.run(duration, rate, concurrency, warmup)
+        finally:
+            if sender is not client:
+                await sender.aclose()
+        server = await server_info(client, api_key)
+
+    return {
+        'label': label,
+        'config': {
+            'target': 'in-process' if transport else url,
+            'mode': 'rate' if rate else 'concurrency',
+            'rate': rate,
+            'concurrency': None if rate else concurrency,
+            'duration_s': duration,
+            'sessions': sessions,
+            'mix': mix,
+            'seed': seed,
+        },
+        'server': server,
+        **results,
+    }
+
+
+def mix_argument(text: str) -> Dict[str, float]:
+    try:
+        return parse_mix(text)
+    except ValueError as error:
+        raise argparse.ArgumentTypeError(str(error))
+
+
+def print_report(report: Dict):
+    config, summary = report['config'], report['summary']
+    load = f"{config['rate']:g} req/s" if config['mode'] == 'rate' else f"{config['concurrency']} clients"
+    server = report['server']
+    print(f"{report['label'] or config['target']}: {load} for {summary['duration_s']:.1f}s "
+          f"({server.get('executor')} executor, {server.get('workers')} workers, {server.get('games')} games)")
+    print(f"  {'intent':<16} {'requests':>9} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    rows = list(report['intents'].items()) + [('all', summary)]
+    if 'admitted' in report:
+        rows.append(('admitted (2xx)', report['admitted']))
+    for intent, result in rows:
+        print(f"  {intent:<16} {result['requests']:>9} {result['error_rate']:>7.1%} {result['p50_ms']:>8.2f} "
+              f"{result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f}")
+    print(f"  throughput {summary['throughput_rps']:,.1f} req/s, statuses {summary['statuses']}")
+
+
+def print_comparison(reports: List[Dict]):
+    print(f"{'run':<28} {'load':>12} {'req/s':>9} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'2xx/s':>8} {'2xx p99':>8}")
+    for report in reports:
+        config, summary = report['config'], report['summary']
+        # Reports saved before admitted requests were summarised separately
+        admitted = report.get('admitted', {'throughput_rps': float('nan'), 'p99_ms': float('nan')})
+        load = f"{config['rate']:g}/s" if config['mode'] == 'rate' else f"{config['concurrency']} clients"
+        print(f"{(report['label'] or config['target'])[:28]:<28} {load:>12} {summary['throughput_rps']:>9,.1f} "
+              f"{summary['error_rate']:>7.1%} {summary['p50_ms']:>8.2f} {summary['p95_ms']:>8.2f} "
+              f"{summary['p99_ms']:>8.2f} {admitted['throughput_rps']:>8,.1f} {admitted['p99_ms']:>8.2f}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Drive the chat API with a mix of intents")
+    parser.add_argument('--url', help="base URL of a running server (default: the app in-process)")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument('--rate', type=float, help="target requests per second (open loop)")
+    load.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help="clients in a closed loop")
+    parser.add_argument('--duration', type=float, default=DEFAULT_DURATION, help="measured seconds")
+    parser.add_argument('--warmup', type=float, default=1.0, help="unmeasured seconds before that")
+    parser.add_argument('--mix', type=mix_argument, default=DEFAULT_MIX,
+                        help=f"intent weights, from: {', '.join(INTENT_MESSAGES)}")
+    parser.add_argument('--sessions', type=int, default=DEFAULT_SESSIONS, help="sessions to spread requests over")
+    parser.add_argument('--catalog-file', help="catalog file the server was started with, for its titles")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--label', help="name for this run in reports")
+    parser.add_argument('--output', help="write the report to this JSON file")
+    parser.add_argument('--compare', nargs='+', metavar='REPORT', help="print saved reports side by side")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        reports = []
+        for path in args.compare:
+            with open(path, encoding='utf-8') as handle:
+                reports.append(json.load(handle))
+        print_comparison(reports)
+        return 0
+
+    titles = load_titles(args.catalog_file) if args.catalog_file else None
+    report = asyncio.run(load_test(args.url, args.rate, args.concurrency, args.duration, args.mix, args.sessions,
+                                   titles, args.warmup, args.seed, args.label))
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, indent=2)
+            handle.write('\n')
+        print(f"Wrote report to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
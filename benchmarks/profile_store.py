@@ -0,0 +1,100 @@
+"""
+Profile writes under a synthetic multi-user load: write-behind ProfileStore
+versus committing every update synchronously.
+
+Each thread plays a slice of the users and, per simulated chat message,
+reads the user's profile, merges a random preference and writes it back.
+Latency is that read-merge-write as seen by the chat path.
+
+Usage: python -m benchmarks.profile_store [THREADS] [USERS] [UPDATES]
+"""
+
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.synthetic import GENRES, PLATFORMS
+from profile_store import SCHEMA, UPSERT, ProfileStore, default_profile, merge_preferences
+
+DEFAULT_THREADS = 8
+DEFAULT_USERS = 2000
+DEFAULT_UPDATES = 40_000
+
+
+class SynchronousStore:
+    """Baseline: every put() commits its row before returning"""
+
+    def __init__(self, path: str):
+        self._local = threading.local()
+        self.path = path
+        self._open().execute(SCHEMA)
+
+    def _open(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = sqlite3.connect(self.path, timeout=30.0)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def get(self, user_id: str):
+        row = self._open().execute('SELECT profile FROM profiles WHERE user_id = ?', (user_id,)).fetchone()
+        return json.loads(row[0]) if row else default_profile()
+
+    def put(self, user_id: str, profile):
+        connection = self._open()
+        with connection:
+            connection.execute(UPSERT, (user_id, json.dumps(profile), time.time()))
+
+    def close(self):
+        pass
+
+
+def run(store, threads: int, users: int, updates: int):
+    latencies = [[] for _ in range(threads)]
+
+    def client(number: int):
+        rng = random.Random(number)
+        own = [f'user-{user}' for user in range(number, users, threads)]
+        for _ in range(updates // threads):
+            user_id = rng.choice(own)
+            start = time.perf_counter()
+            profile = store.get(user_id)
+            merge_preferences(profile, {'genres': [rng.choice(GENRES)], 'platforms': [rng.choice(PLATFORMS)]})
+            store.put(user_id, profile)
+            latencies[number].append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=client, args=(number,)) for number in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    store.close()
+    durable = time.perf_counter() - start
+    samples = sorted(latency for thread in latencies for latency in thread)
+    return (len(samples) / elapsed, len(samples) / durable, samples[len(samples) // 2],
+            samples[int(len(samples) * 0.99)])
+
+
+def main(threads=DEFAULT_THREADS, users=DEFAULT_USERS, updates=DEFAULT_UPDATES):
+    print(f"{threads} threads, {users:,} users, {updates:,} updates")
+    print(f"{'store':>14} {'updates/s':>10} {'durable/s':>10} {'p50 us':>8} {'p99 us':>8} {'rows written':>13}")
+    for name in ('synchronous', 'write-behind'):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'profiles.db')
+            store = SynchronousStore(path) if name == 'synchronous' else ProfileStore(path)
+            rate, durable_rate, p50, p99 = run(store, threads, users, updates)
+            rows = store.rows_written if isinstance(store, ProfileStore) else updates // threads * threads
+            print(f"{name:>14} {rate:>10,.0f} {durable_rate:>10,.0f} {p50 * 1e6:>8.0f} {p99 * 1e6:>8.0f} "
+                  f"{rows:>13,}")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
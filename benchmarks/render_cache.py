@@ -0,0 +1,53 @@
+"""
+Latency of the catalog-driven handlers with a cold and a warm render cache.
+
+Usage: python -m benchmarks.render_cache [TITLES]
+"""
+
+import sys
+import time
+
+from benchmarks.synthetic import synthetic_games_db
+from game_chatbot import DEFAULT_GAMES_DB, GameChatbot
+from shared_catalog import SharedCatalog
+
+REPEATS = 2000
+
+
+def per_call_us(function, argument) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        function(argument)
+    return (time.perf_counter() - start) / REPEATS * 1e6
+
+
+def main(titles: int = 0):
+    games_db = synthetic_games_db(titles) if titles else DEFAULT_GAMES_DB
+    bot = GameChatbot(SharedCatalog.from_games_db(games_db))
+    title = bot.catalog.names[0]
+    genre = bot.catalog.genres.value(0)
+    platform = bot.catalog.platforms.value(0)
+    cases = [
+        ('game info', bot.handle_game_info, title),
+        ('review', bot.handle_review, title),
+        ('genre', bot.handle_genre_preference, {'genres': [genre]}),
+        ('platform', bot.handle_platform_preference, {'platforms': [platform]}),
+    ]
+
+    print(f"{'handler':<10} {'uncached us':>12} {'cached us':>10}")
+    for name, handler, argument in cases:
+        renderer = bot.renderer
+        cache = renderer.cache
+        # Uncached: clear before every call so each one renders again
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            cache.clear()
+            handler(argument)
+        cold = (time.perf_counter() - start) / REPEATS * 1e6
+        warm = per_call_us(handler, argument)
+        print(f"{name:<10} {cold:>12.1f} {warm:>10.1f}")
+    print(bot.renderer.stats())
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,45 @@
+"""
+Weighted recommendation scoring: NumPy vectorized pass versus Python loop.
+
+Usage: python -m benchmarks.scoring [COUNT ...]
+"""
+
+import sys
+import time
+
+from benchmarks.synthetic import GENRES, iter_synthetic_games
+from game_catalog import GameCatalog
+from game_scoring import ScoringEngine
+
+DEFAULT_SIZES = (100_000, 1_000_000)
+PREFERENCES = {'genres': ['puzzle'], 'platforms': ['Switch', 'Mobile'], 'playtime': 'short',
+               'features': ['co-op', 'story-rich']}
+TOP_K = 10
+
+
+def seconds(function, repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats
+
+
+def main(sizes=DEFAULT_SIZES):
+    print(f"{'titles':>10} {'python loop ms':>15} {'numpy ms':>9} {'speedup':>8}")
+    for count in sizes:
+        catalog = GameCatalog()
+        for genre in GENRES:
+            catalog.genres.intern(genre)
+        for genre, game in iter_synthetic_games(count):
+            catalog.add_game(genre, game)
+        vectorized, looped = ScoringEngine(catalog, use_numpy=True), ScoringEngine(catalog, use_numpy=False)
+        assert vectorized.top_k(PREFERENCES, TOP_K) == looped.top_k(PREFERENCES, TOP_K)
+
+        python_seconds = seconds(lambda: looped.top_k(PREFERENCES, TOP_K), 1)
+        numpy_seconds = seconds(lambda: vectorized.top_k(PREFERENCES, TOP_K), 10)
+        print(f"{count:>10,} {python_seconds * 1000:>15.1f} {numpy_seconds * 1000:>9.2f} "
+              f"{python_seconds / numpy_seconds:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,65 @@
+"""
+Similar-games table: build time, cost of adding one title, lookup latency
+and recall against an exhaustive cosine scan.
+
+Usage: python -m benchmarks.similar_games [COUNT ...]
+"""
+
+import random
+import sys
+import time
+
+from benchmarks.synthetic import iter_synthetic_games
+from game_catalog import GameCatalog
+from similar_games import NEIGHBOURS, SimilarGamesIndex
+
+DEFAULT_SIZES = (10_000, 50_000)
+ADDED = 100
+RECALL_SAMPLE = 100
+
+
+def recall(similar: SimilarGamesIndex, sample) -> float:
+    """Share of each sampled row that an exhaustive scan also ranks in its top NEIGHBOURS"""
+    found = wanted = 0
+    for game_id in sample:
+        scores = sorted((similar.similarity(game_id, other) for other in range(len(similar.catalog))
+                         if other != game_id), reverse=True)
+        cutoff = scores[NEIGHBOURS - 1]
+        row = similar.similar(game_id)
+        # Ties at the cutoff are interchangeable, so any of them counts
+        found += sum(1 for other in row if similar.similarity(game_id, other) >= cutoff - 1e-6)
+        wanted += NEIGHBOURS
+    return found / wanted
+
+
+def main(sizes=DEFAULT_SIZES):
+    print(f"{'titles':>8} {'build s':>8} {'add one ms':>11} {'lookup us':>10} {'recall@10':>10}")
+    for count in sizes:
+        games = list(iter_synthetic_games(count + ADDED))
+        catalog = GameCatalog()
+        for genre, game in games[:count]:
+            catalog.add_game(genre, game)
+
+        start = time.perf_counter()
+        similar = SimilarGamesIndex(catalog)
+        build = time.perf_counter() - start
+
+        for genre, game in games[count:]:
+            catalog.add_game(genre, game)
+        start = time.perf_counter()
+        similar.update()
+        add_one = (time.perf_counter() - start) / ADDED
+
+        ids = random.Random(0).sample(range(len(catalog)), RECALL_SAMPLE)
+        start = time.perf_counter()
+        for _ in range(100):
+            for game_id in ids:
+                similar.similar(game_id)
+        lookup = (time.perf_counter() - start) / (100 * len(ids))
+
+        print(f"{count:>8,} {build:>8.2f} {add_one * 1000:>11.2f} {lookup * 1e6:>10.2f} "
+              f"{recall(similar, ids[:20]):>10.2f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,90 @@
+"""
+Resident memory per worker process with and without a shared catalog snapshot.
+
+Starts WORKERS processes that either build the synthetic catalog and its
+indexes themselves or memory-map one snapshot, runs the same queries in
+each, and reports RSS and PSS (proportional set size, which splits shared
+pages between the processes mapping them) while all workers are alive.
+
+Usage: python -m benchmarks.snapshot_memory [TITLES] [WORKERS]
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import synthetic_games_db
+
+QUERIES = ["recommend action games for pc", "tell me about crimson kingdom 12",
+           "review frozen legacy", "short puzzle games on switch"]
+
+
+def memory_kib():
+    """Return (rss, pss) of this process in KiB from /proc/self/smaps_rollup"""
+    values = {}
+    with open('/proc/self/smaps_rollup') as handle:
+        for line in handle:
+            parts = line.split()
+            if parts[0] in ('Rss:', 'Pss:'):
+                values[parts[0][:-1]] = int(parts[1])
+    return values['Rss'], values['Pss']
+
+
+def worker(mode: str, titles: int, snapshot: str):
+    from game_chatbot import GameChatbot
+    from shared_catalog import SharedCatalog
+
+    start = time.perf_counter()
+    if mode == 'snapshot':
+        catalog = SharedCatalog.load(snapshot)
+    else:
+        catalog = SharedCatalog.from_games_db(synthetic_games_db(titles))
+    load_seconds = time.perf_counter() - start
+
+    bot = GameChatbot(catalog)
+    for query in QUERIES:
+        bot.generate_response(query)
+    # Touch every column once, as a long-running worker eventually would
+    sum(bot.catalog.ratings)
+    sum(len(name) for name in bot.catalog.names)
+
+    rss, pss = memory_kib()
+    print(json.dumps({'load_ms': load_seconds * 1000, 'rss_kib': rss, 'pss_kib': pss}), flush=True)
+    sys.stdin.readline()
+
+
+def run(mode: str, titles: int, workers: int, snapshot: str):
+    processes = [
+        subprocess.Popen([sys.executable, '-m', 'benchmarks.snapshot_memory', '--worker', mode, str(titles), snapshot],
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        for _ in range(workers)
+    ]
+    # Read every report before releasing any worker, so all are alive together
+    reports = [json.loads(process.stdout.readline()) for process in processes]
+    for process in processes:
+        process.communicate('\n')
+    average = {key: sum(report[key] for report in reports) / workers for key in reports[0]}
+    print(f"{mode:<9} {titles:>9,} {workers:>7} {average['load_ms']:>10.1f} "
+          f"{average['rss_kib'] / 1024:>9.1f} {average['pss_kib'] / 1024:>9.1f}")
+
+
+def main(titles: int = 200_000, workers: int = 4):
+    from shared_catalog import SharedCatalog
+
+    with tempfile.TemporaryDirectory() as directory:
+        snapshot = os.path.join(directory, 'catalog.snap')
+        SharedCatalog.from_games_db(synthetic_games_db(titles)).save(snapshot)
+        print(f"snapshot size: {os.path.getsize(snapshot) / 2**20:.1f} MiB")
+        print(f"{'mode':<9} {'titles':>9} {'workers':>7} {'load ms':>10} {'RSS MiB':>9} {'PSS MiB':>9}")
+        run('build', titles, workers, snapshot)
+        run('snapshot', titles, workers, snapshot)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == '--worker':
+        worker(sys.argv[2], int(sys.argv[3]), sys.argv[4])
+    else:
+        main(*(int(arg) for arg in sys.argv[1:3]))
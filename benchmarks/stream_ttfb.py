@@ -0,0 +1,60 @@
+"""
+Time to first byte and to the last byte of a cold genre listing, answered
+whole by /chat or streamed by /chat/stream.
+
+Runs the API under uvicorn on a local port, since an in-process ASGI client
+buffers whole responses. Point GAME_CATALOG_SNAPSHOT at a large snapshot;
+the render cache is cleared before every request so each listing is
+rendered from scratch.
+
+Usage: python benchmarks/stream_ttfb.py [REPEATS]
+"""
+
+import statistics
+import sys
+import threading
+import time
+
+import httpx
+import uvicorn
+
+import api
+
+PORT = 8765
+
+
+def timed(client: httpx.Client, path: str, message: str):
+    headers = {"X-API-Key": api.API_KEY, "X-Session-ID": "ttfb"}
+    api.ensure_catalog().current.renderer.invalidate()
+    start = time.perf_counter()
+    first = None
+    with client.stream("POST", path, json={"message": message}, headers=headers) as response:
+        for _ in response.iter_raw():
+            if first is None:
+                first = time.perf_counter() - start
+    return first * 1000, (time.perf_counter() - start) * 1000
+
+
+def main(repeats: int = 10):
+    server = uvicorn.Server(uvicorn.Config(api.app, port=PORT, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    message = f"Give me {api.ensure_catalog().current.catalog.genres.value(0)} games"
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{PORT}", timeout=60) as client:
+            print(f"catalog: {len(api.ensure_catalog().current.catalog):,} titles, message {message!r}")
+            print(f"{'endpoint':<14} {'first byte ms':>14} {'last byte ms':>13}")
+            for path in ("/chat", "/chat/stream"):
+                results = [timed(client, path, message) for _ in range(repeats)]
+                print(f"{path:<14} {statistics.median(r[0] for r in results):>14.2f} "
+                      f"{statistics.median(r[1] for r in results):>13.2f}")
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,178 @@
+"""
+Benchmark suite for the chatbot's hot paths on synthetic catalogs.
+
+For each catalog size it builds a synthetic catalog, generates a realistic
+mix of chat messages about its titles and times every call to
+detect_intent, extract_game_preferences, get_game_recommendations,
+handle_game_info and generate_response. Each path gets one warm-up pass, so
+the figures are steady-state numbers with the render cache filled the way a
+running server would have it. Above SIMILAR_TABLE_LIMIT titles the mix
+leaves out "similar games" questions, whose neighbour table takes longer to
+build than the rest of the run.
+
+Results are printed and can be written as JSON. Given a baseline JSON from
+an earlier run on the same machine, the suite exits with status 1 if any
+path got slower by more than the tolerance. Title lookups do more or less
+work depending on set iteration order, so the suite runs with a fixed
+PYTHONHASHSEED (0 unless one is set) to keep runs comparable.
+
+Usage: python -m benchmarks.suite [--sizes 100 10000 100000] [--output FILE]
+       [--baseline FILE] [--tolerance 0.5]
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+from benchmarks.synthetic import synthetic_games_db, synthetic_messages
+from game_chatbot import GameChatbot
+from game_scoring import np
+from shared_catalog import SharedCatalog
+
+DEFAULT_SIZES = (100, 10_000, 100_000)
+DEFAULT_MESSAGES = 2000
+DEFAULT_REPEATS = 5
+DEFAULT_TOLERANCE = 0.5
+# Timings this close to the baseline are timer noise, whatever the ratio
+NOISE_FLOOR_US = 1.0
+SIMILAR_TABLE_LIMIT = 200_000
+
+
+def time_calls(function: Callable, inputs: Sequence, repeats: int) -> Dict[str, float]:
+    """
+    Call function on every input, after one warm-up pass; per-call timings
+    in microseconds. best_us is the mean call in the fastest pass, which
+    shrugs off interference from the rest of the machine the way timeit's
+    best-of-N does, so it is the figure baselines are compared on.
+    """
+    for value in inputs:
+        function(value)
+    samples, passes = [], []
+    clock = time.perf_counter_ns
+    for _ in range(repeats):
+        for value in inputs:
+            start = clock()
+            function(value)
+            samples.append(clock() - start)
+        passes.append(sum(samples[-len(inputs):]))
+    samples.sort()
+    return {
+        'calls': len(samples),
+        'best_us': round(min(passes) / len(inputs) / 1000, 3),
+        'mean_us': round(sum(samples) / len(samples) / 1000, 3),
+        'p50_us': round(samples[len(samples) // 2] / 1000, 3),
+        'p99_us': round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] / 1000, 3),
+    }
+
+
+def run_size(count: int, messages: int = DEFAULT_MESSAGES, repeats: int = DEFAULT_REPEATS,
+             seed: int = 0) -> Dict:
+    """Build a count-title catalog and time each hot path on it"""
+    start = time.perf_counter()
+    shared = SharedCatalog.from_games_db(synthetic_games_db(count, seed))
+    build = time.perf_counter() - start
+
+    bot = GameChatbot(shared)
+    mix = synthetic_messages(shared.catalog.names, messages, seed)
+    if count > SIMILAR_TABLE_LIMIT:
+        mix = [message for message in mix if bot.detect_intent(message) != 'similar']
+    preferences = [bot.extract_game_preferences(message) for message in mix]
+    about = [message for message in mix if message.lower().startswith('tell me about')]
+    return {
+        'build_s': round(build, 3),
+        'benchmarks': {
+            'detect_intent': time_calls(bot.detect_intent, mix, repeats),
+            'extract_game_preferences': time_calls(bot.extract_game_preferences, mix, repeats),
+            'get_game_recommendations': time_calls(bot.get_game_recommendations, preferences, repeats),
+            'handle_game_info': time_calls(bot.handle_game_info, about, repeats),
+            'generate_response': time_calls(bot.generate_response, mix, repeats),
+        },
+    }
+
+
+def run_suite(sizes: Sequence[int] = DEFAULT_SIZES, messages: int = DEFAULT_MESSAGES,
+              repeats: int = DEFAULT_REPEATS, seed: int = 0,
+              report: Optional[Callable[[int, Dict], None]] = None) -> Dict:
+    """Run every size; report, if given, is called with each size's results as they finish"""
+    results = {}
+    for count in sizes:
+        results[str(count)] = run_size(count, messages, repeats, seed)
+        if report:
+            report(count, results[str(count)])
+    return {
+        'environment': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'numpy': np is not None,
+            'hash_seed': os.environ.get('PYTHONHASHSEED'),
+        },
+        'config': {'messages': messages, 'repeats': repeats, 'seed': seed},
+        'results': results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """Benchmarks more than tolerance slower than in baseline, described"""
+    regressions = []
+    for size, result in current['results'].items():
+        expected = baseline.get('results', {}).get(size, {}).get('benchmarks', {})
+        for name, timings in result['benchmarks'].items():
+            if name not in expected:
+                continue
+            before, after = expected[name]['best_us'], timings['best_us']
+            if after > before * (1 + tolerance) and after - before > NOISE_FLOOR_US:
+                regressions.append(f"{name} at {int(size):,} titles: {before:.2f} -> {after:.2f} us "
+                                   f"(+{(after / before - 1) * 100:.0f}%)")
+    return regressions
+
+
+def print_size(count: int, result: Dict):
+    print(f"\n{count:,} titles (built in {result['build_s']:.2f}s)", flush=True)
+    print(f"  {'path':<26} {'best us':>9} {'mean us':>9} {'p50 us':>9} {'p99 us':>9} {'calls':>7}")
+    for name, timings in result['benchmarks'].items():
+        print(f"  {name:<26} {timings['best_us']:>9.2f} {timings['mean_us']:>9.2f} {timings['p50_us']:>9.2f} "
+              f"{timings['p99_us']:>9.2f} {timings['calls']:>7}", flush=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Time the chatbot's hot paths on synthetic catalogs")
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help="catalog sizes to run, in titles (up to 1000000)")
+    parser.add_argument('--messages', type=int, default=DEFAULT_MESSAGES, help="messages in the mix")
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS, help="timed passes over the mix")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="fail if slower than the results in this JSON file")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown over the baseline, as a fraction")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.sizes, args.messages, args.repeats, args.seed, report=print_size)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as handle:
+            json.dump(results, handle, indent=2)
+            handle.write('\n')
+        print(f"\nWrote results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as handle:
+            regressions = compare(results, json.load(handle), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%} of {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"\nNo regressions beyond {args.tolerance:.0%} of {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    if 'PYTHONHASHSEED' not in os.environ:
+        os.environ['PYTHONHASHSEED'] = '0'
+        os.execv(sys.executable, [sys.executable, '-m', 'benchmarks.suite'] + sys.argv[1:])
+    sys.exit(main())
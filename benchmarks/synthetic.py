@@ -0,0 +1,98 @@
+"""
+Synthetic game catalogs for benchmarks.
+
+Titles are generated deterministically from a seed so runs are comparable.
+Names and descriptions are built fresh for every title, the same way they would
+be when loaded from a real data source.
+"""
+
+import random
+from typing import Dict, Iterator, List, Tuple
+
+GENRES = ['action', 'adventure', 'strategy', 'puzzle', 'racing', 'indie']
+PLATFORMS = ['PC', 'PlayStation', 'Xbox', 'Switch', 'Wii U', 'Mobile']
+PLAYTIMES = ['short', 'medium', 'long']
+FEATURES = [
+    'open-world', 'story-rich', 'character-customization', 'realistic', 'cyberpunk',
+    'exploration', 'puzzle-solving', 'cinematic', 'action', 'turn-based',
+    'empire-building', 'multiplayer', 'real-time-strategy', 'fantasy',
+    'large-scale-battles', 'physics-based', 'co-op', 'racing', 'simulation',
+    'car-collection', 'roguelike', 'fast-paced', 'platformer', 'challenging',
+    'emotional-story', 'philosophical', 'sandbox', 'survival', 'crafting', 'stealth',
+]
+ADJECTIVES = [
+    'Crimson', 'Silent', 'Eternal', 'Forgotten', 'Iron', 'Hidden', 'Broken', 'Neon',
+    'Lost', 'Frozen', 'Golden', 'Shattered', 'Wild', 'Hollow', 'Savage', 'Radiant',
+]
+NOUNS = [
+    'Kingdom', 'Horizon', 'Legacy', 'Frontier', 'Echoes', 'Empire', 'Odyssey', 'Realm',
+    'Circuit', 'Citadel', 'Voyage', 'Labyrinth', 'Dynasty', 'Outpost', 'Tides', 'Crown',
+]
+
+
+def iter_synthetic_games(count: int, seed: int = 0) -> Iterator[Tuple[str, Dict]]:
+    """Yield (genre, game) pairs for count synthetic titles"""
+    rng = random.Random(seed)
+    for index in range(count):
+        genre = rng.choice(GENRES)
+        adjective, noun = rng.choice(ADJECTIVES), rng.choice(NOUNS)
+        yield genre, {
+            'name': f"{adjective} {noun} {index}",
+            'platform': sorted(rng.sample(PLATFORMS, rng.randint(1, 4)), key=PLATFORMS.index),
+            'rating': round(rng.uniform(5.0, 9.9), 1),
+            'year': rng.randint(1990, 2024),
+            'playtime': rng.choice(PLAYTIMES),
+            'description': f"{adjective} {genre} game set in a {noun.lower()} full of surprises #{index}",
+            'features': rng.sample(FEATURES, 3),
+        }
+
+
+def synthetic_games_db(count: int, seed: int = 0) -> Dict[str, List[Dict]]:
+    """Build a synthetic catalog in the genre -> list of game dicts layout"""
+    games_db: Dict[str, List[Dict]] = {genre: [] for genre in GENRES}
+    for genre, game in iter_synthetic_games(count, seed):
+        games_db[genre].append(game)
+    return games_db
+
+
+# Message templates and how often each turns up in a chat session
+MESSAGE_TEMPLATES = [
+    ("Recommend me some {genre} games", 12),
+    ("Recommend a {playtime} {genre} game for {platform}", 10),
+    ("What game should I play on {platform}?", 6),
+    ("Tell me about {title}", 14),
+    ("tell me about {typo}", 6),
+    ("Review {title}", 6),
+    ("Any games similar to {title}?", 5),
+    ("I want {platform} games", 8),
+    ("Give me {genre} games", 8),
+    ("Share a gaming tip", 5),
+    ("Tell me a gaming fact", 4),
+    ("Hello!", 6),
+    ("I have been gaming all weekend and honestly I need something new to try", 5),
+    ("Goodbye", 5),
+]
+
+
+def _typo(title: str, rng: random.Random) -> str:
+    """title in lower case with two neighbouring letters swapped"""
+    title = title.lower()
+    letters = [index for index in range(len(title) - 1) if title[index].isalpha() and title[index + 1].isalpha()]
+    if not letters:
+        return title
+    index = rng.choice(letters)
+    return title[:index] + title[index + 1] + title[index] + title[index + 2:]
+
+
+def synthetic_messages(titles: List[str], count: int, seed: int = 0) -> List[str]:
+    """A realistic mix of count chat messages about games from titles"""
+    rng = random.Random(seed)
+    templates = [template for template, _ in MESSAGE_TEMPLATES]
+    weights = [weight for _, weight in MESSAGE_TEMPLATES]
+    messages = []
+    for template in rng.choices(templates, weights, k=count):
+        title = rng.choice(titles)
+        messages.append(template.format(
+            genre=rng.choice(GENRES), platform=rng.choice(PLATFORMS), playtime=rng.choice(PLAYTIMES),
+            title=title, typo=_typo(title, rng)))
+    return messages
@@ -0,0 +1,66 @@
+"""
+Precision/recall of TitleIndex against the labeled queries in
+benchmarks/title_queries.json, swept over its tuning parameters.
+
+Usage: python -m benchmarks.title_search_eval
+"""
+
+import itertools
+import json
+import os
+from typing import Dict, List
+
+from game_chatbot import GameChatbot
+from title_search import TitleIndex
+
+QUERIES_PATH = os.path.join(os.path.dirname(__file__), 'title_queries.json')
+MIN_SCORES = (0.3, 0.35, 0.4, 0.45, 0.5, 0.6, 0.7, 0.8, 1.0)
+MIN_SIMILARITIES = (0.4, 0.5, 0.6, 0.7)
+
+
+def load_queries(path: str = QUERIES_PATH) -> List[Dict]:
+    with open(path, encoding='utf-8') as handle:
+        return json.load(handle)
+
+
+def evaluate(index: TitleIndex, names: List[str], queries: List[Dict]) -> Dict:
+    """Count true/false positives of best_match over the labeled queries"""
+    true_positives = false_positives = 0
+    expected_total = sum(1 for query in queries if query['expected'])
+    for query in queries:
+        game_id = index.best_match(query['query'])
+        if game_id is None:
+            continue
+        if names[game_id] == query['expected']:
+            true_positives += 1
+        else:
+            false_positives += 1
+    returned = true_positives + false_positives
+    precision = true_positives / returned if returned else 1.0
+    recall = true_positives / expected_total if expected_total else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {'precision': precision, 'recall': recall, 'f1': f1}
+
+
+def main():
+    names = GameChatbot().catalog.names
+    queries = load_queries()
+    print(f"{len(queries)} labeled queries over {len(names)} titles")
+    print(f"{'min_score':>9} {'min_sim':>7} {'precision':>9} {'recall':>7} {'f1':>6}")
+    best = None
+    for min_score, min_similarity in itertools.product(MIN_SCORES, MIN_SIMILARITIES):
+        index = TitleIndex(names, min_score=min_score, min_similarity=min_similarity)
+        result = evaluate(index, names, queries)
+        print(f"{min_score:>9.2f} {min_similarity:>7.2f} {result['precision']:>9.2f} "
+              f"{result['recall']:>7.2f} {result['f1']:>6.2f}")
+        # Ties go to the stricter thresholds, which match fewer titles by accident
+        rank = (result['f1'], result['precision'], min_score, min_similarity)
+        if best is None or rank > best[0]:
+            best = (rank, result, min_score, min_similarity)
+    _, result, min_score, min_similarity = best
+    print(f"best: min_score={min_score} min_similarity={min_similarity} "
+          f"precision={result['precision']:.2f} recall={result['recall']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
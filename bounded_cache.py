@@ -0,0 +1,117 @@
+"""
+Thread-safe, size-bounded LRU cache with hit and miss counters.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, TypeVar
+
+V = TypeVar('V')
+
+_MISSING = object()
+
+
+class LRUCache(Generic[V]):
+    """
+    Mapping that keeps at most max_entries values, dropping the least recently
+    used. Given a sizer, it also keeps the total size of the values at most
+    max_size, and does not store a value larger than that
+    """
+
+    def __init__(self, max_entries: int = 1024, max_size: Optional[int] = None,
+                 sizer: Optional[Callable[[V], int]] = None):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        if (max_size is None) != (sizer is None):
+            raise ValueError("max_size and sizer must be given together")
+        self.max_entries = max_entries
+        self.max_size = max_size
+        self.sizer = sizer
+        self.size = 0
+        self._entries: 'OrderedDict[Hashable, V]' = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        # key -> lock held by the thread currently building that key
+        self._building: Dict[Hashable, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.oversized = 0
+
+    def get(self, key: Hashable, default: Optional[V] = None) -> Optional[V]:
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: V):
+        size = self.sizer(value) if self.sizer is not None else 0
+        with self._lock:
+            if self.max_size is not None:
+                if size > self.max_size:
+                    # Dropping an older value keeps get() from returning it
+                    if self._entries.pop(key, _MISSING) is not _MISSING:
+                        self.size -= self._sizes.pop(key)
+                    self.oversized += 1
+                    return
+                self.size += size - self._sizes.get(key, 0)
+                self._sizes[key] = size
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries or (self.max_size is not None and self.size > self.max_size):
+                oldest, _ = self._entries.popitem(last=False)
+                self.size -= self._sizes.pop(oldest, 0)
+                self.evictions += 1
+
+    def get_or_build(self, key: Hashable, build: Callable[[], V]) -> V:
+        """Return the cached value for key, building and storing it on a miss"""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        # Threads missing the same key wait for the first one's build instead
+        # of all building it at once
+        with self._lock:
+            building = self._building.get(key)
+            if building is None:
+                building = self._building[key] = threading.Lock()
+        with building:
+            with self._lock:
+                value = self._entries.get(key, _MISSING)
+            if value is _MISSING:
+                try:
+                    value = build()
+                    self.put(key, value)
+                finally:
+                    with self._lock:
+                        self._building.pop(key, None)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'size': self.size,
+            'max_size': self.max_size,
+            'oversized': self.oversized,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
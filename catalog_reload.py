@@ -0,0 +1,221 @@
+"""
+Hot catalog reloads and delta updates.
+
+The live catalog bundle is never changed in place. A reload builds a whole
+new SharedCatalog from a versioned catalog file, and a delta copies the
+current bundle and patches the copy's indexes game by game; either way the
+result replaces the live bundle with one reference assignment. Requests that
+already hold the previous bundle finish on it, and chatbots pick up the new
+one at their next message.
+
+A catalog file is JSON: ``{"version": 3, "games": {genre: [game, ...]}}``.
+A delta is a list of changes, each one of::
+
+    {"op": "add", "genre": "puzzle", "game": {...}}
+    {"op": "update", "name": "Portal 2", "genre": "puzzle", "game": {...}}
+    {"op": "remove", "name": "Portal 2"}
+
+Usage: python catalog_reload.py OUTPUT [VERSION]  (writes the bundled catalog)
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from game_catalog import GAME_FIELDS
+from game_index import CatalogIndex
+from shared_catalog import SharedCatalog
+from title_search import TitleIndex, tokenize
+
+CHANGE_OPS = ('add', 'update', 'remove')
+REQUIRED_FIELDS = tuple(field for field in GAME_FIELDS if field != 'genre')
+
+
+class VersionConflict(ValueError):
+    """Raised when an update does not apply on top of the live catalog version"""
+
+
+def load_catalog_file(path: str) -> Tuple[SharedCatalog, int]:
+    """Build a SharedCatalog from a catalog file; returns it with the file's version"""
+    with open(path, encoding='utf-8') as handle:
+        document = json.load(handle)
+    if not isinstance(document.get('version'), int) or not isinstance(document.get('games'), dict):
+        raise ValueError(f"{path} needs an integer 'version' and a 'games' object")
+    for genre, games in document['games'].items():
+        for game in games:
+            _check_game(genre, game)
+    return SharedCatalog.from_games_db(document['games']), document['version']
+
+
+def write_catalog_file(path: str, games_db: Dict[str, List[Dict]], version: int):
+    """Write a catalog file atomically, so a concurrent reload never reads half of it"""
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as handle:
+        json.dump({'version': version, 'games': games_db}, handle, indent=2)
+    os.replace(temporary, path)
+
+
+def apply_changes(shared: SharedCatalog, changes: Iterable[Dict[str, Any]]) -> SharedCatalog:
+    """New SharedCatalog with changes applied; shared itself is left untouched"""
+    catalog, index, titles, similar = _copy_indexes(shared)
+
+    def find(name) -> int:
+        if not isinstance(name, str):
+            raise ValueError("Updates and removals need the game's name")
+        # The first game with that exact name, among the titles sharing a token with it
+        candidates = titles.candidates(name) if tokenize(name) else range(len(catalog))
+        matches = [game_id for game_id in candidates if catalog.names[game_id] == name]
+        if not matches:
+            raise ValueError(f"No game named {name!r}")
+        return min(matches)
+
+    def unindex(game_id: int):
+        index.remove(game_id)
+        titles.remove(game_id)
+        if similar is not None:
+            similar.remove(game_id)
+
+    def reindex(game_id: int):
+        index.insert(game_id)
+        titles.insert(game_id, catalog.names[game_id])
+        if similar is not None:
+            similar.insert(game_id)
+
+    for change in changes:
+        op = change.get('op')
+        if op not in CHANGE_OPS:
+            raise ValueError(f"Change op must be one of {CHANGE_OPS}, not {op!r}")
+        if op == 'add':
+            _check_game(change.get('genre'), change.get('game'))
+            reindex(catalog.add_game(change['genre'], change['game']))
+            continue
+
+        game_id = find(change.get('name'))
+        if op == 'update':
+            _check_game(change.get('genre'), change.get('game'))
+            unindex(game_id)
+            catalog.set_game(game_id, change['genre'], change['game'])
+            reindex(game_id)
+        else:
+            last = len(catalog) - 1
+            unindex(game_id)
+            if game_id != last:
+                unindex(last)
+            catalog.remove_game(game_id)
+            if game_id != last:
+                reindex(game_id)
+
+    # Finish pending work before the bundle can be shared between threads
+    index.refresh_ranks()
+    unchanged = (list(catalog.genres) == list(shared.catalog.genres)
+                 and list(catalog.features) == list(shared.catalog.features))
+    matcher = shared.matcher if unchanged else None
+    return SharedCatalog(catalog, index, titles, similar, matcher=matcher)
+
+
+def _copy_indexes(shared: SharedCatalog):
+    catalog = shared.catalog.copy()
+    if isinstance(shared.catalog.names, list):
+        index, titles = shared.index.copy(catalog), shared.titles.copy()
+    else:
+        # A memory-mapped snapshot is thawed once by rebuilding its indexes
+        index, titles = CatalogIndex(catalog), TitleIndex(catalog.names)
+    similar = None
+    # A table loaded from a snapshot cannot be patched; the copy rebuilds it on first use
+    if shared.similar_built and not shared.similar.read_only:
+        similar = shared.similar.copy(catalog)
+    return catalog, index, titles, similar
+
+
+def _check_game(genre, game):
+    if not isinstance(genre, str) or not genre:
+        raise ValueError("Every game needs a genre")
+    if not isinstance(game, dict):
+        raise ValueError("Every game must be an object")
+    missing = [field for field in REQUIRED_FIELDS if field not in game]
+    if missing:
+        raise ValueError(f"Game {game.get('name')!r} is missing {', '.join(missing)}")
+
+
+class CatalogManager:
+    """Holds the live SharedCatalog and its version, and swaps in replacements"""
+
+    def __init__(self, shared: SharedCatalog, version: int = 0, path: Optional[str] = None):
+        self.current = shared
+        self.version = version
+        self.path = path
+        # Serialises reloads and deltas; readers never take it
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self.deltas = 0
+        self.swapped_at = time.time()
+
+    @classmethod
+    def from_file(cls, path: str) -> 'CatalogManager':
+        shared, version = load_catalog_file(path)
+        return cls(shared, version, path)
+
+    def reload(self, path: Optional[str] = None) -> bool:
+        """
+        Rebuild from the catalog file and swap it in if its version is newer
+        than the live one; returns whether it was swapped
+        """
+        path = path or self.path
+        if path is None:
+            raise ValueError("No catalog file to reload from")
+        with self._lock:
+            shared, version = load_catalog_file(path)
+            if version <= self.version:
+                return False
+            if self.current.similar_built:
+                # Build the slowest index now rather than on the first "similar" question
+                shared.similar
+            self._swap(shared, version)
+            self.reloads += 1
+            return True
+
+    def apply(self, changes: List[Dict[str, Any]], version: Optional[int] = None,
+              base_version: Optional[int] = None) -> int:
+        """
+        Apply changes on top of the live catalog and swap the result in;
+        returns the new version (the live one plus one unless given)
+        """
+        with self._lock:
+            if base_version is not None and base_version != self.version:
+                raise VersionConflict(f"Catalog is at version {self.version}, not {base_version}")
+            if version is None:
+                version = self.version + 1
+            if version <= self.version:
+                raise VersionConflict(f"Version {version} is not newer than {self.version}")
+            self._swap(apply_changes(self.current, changes), version)
+            self.deltas += 1
+            return version
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'version': self.version,
+            'games': len(self.current.catalog),
+            'path': self.path,
+            'reloads': self.reloads,
+            'deltas': self.deltas,
+            'swapped_at': self.swapped_at,
+        }
+
+    def _swap(self, shared: SharedCatalog, version: int):
+        # One reference assignment, so readers see either bundle whole
+        self.current = shared
+        self.version = version
+        self.swapped_at = time.time()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python catalog_reload.py OUTPUT [VERSION]")
+        sys.exit(1)
+    from game_chatbot import DEFAULT_GAMES_DB
+
+    write_catalog_file(sys.argv[1], DEFAULT_GAMES_DB, int(sys.argv[2]) if len(sys.argv) == 3 else 1)
+    print(f"Wrote catalog file to {sys.argv[1]}")
@@ -0,0 +1,310 @@
+"""
+Binary, memory-mappable snapshots of a game catalog and its indexes.
+
+File layout: an 8-byte magic, the header length as an 8-byte little-endian
+integer, a JSON header, then the data sections, each aligned to 8 bytes. The
+header records every section's offset, length and array typecode together
+with the small vocabularies (genres, platforms, features).
+
+Loading maps the file read-only and wraps each section in a memoryview cast,
+so nothing is copied or decoded up front: load time does not depend on the
+catalog size, and every worker process that maps the same file shares its
+pages through the OS page cache.
+
+Usage: python catalog_snapshot.py OUTPUT  (writes the bundled catalog)
+"""
+
+import json
+import mmap
+import os
+import sys
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from game_catalog import GameCatalog, Vocabulary
+from game_index import CatalogIndex
+from similar_games import SimilarGamesIndex
+from title_search import TitleIndex
+
+MAGIC = b'GCSNAP\x00\x01'
+FORMAT_VERSION = 1
+ALIGNMENT = 8
+
+
+class StringColumn(Sequence[str]):
+    """Sequence of strings stored as one UTF-8 blob plus end offsets"""
+
+    __slots__ = ('blob', 'offsets')
+
+    def __init__(self, blob: memoryview, offsets: memoryview):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return str(self.blob[self.offsets[index]:self.offsets[index + 1]], 'utf-8')
+
+    def __iter__(self) -> Iterator[str]:
+        blob, offsets = self.blob, self.offsets
+        for index in range(len(offsets) - 1):
+            yield str(blob[offsets[index]:offsets[index + 1]], 'utf-8')
+
+    def encoded(self, index: int) -> bytes:
+        return bytes(self.blob[self.offsets[index]:self.offsets[index + 1]])
+
+    @property
+    def nbytes(self) -> int:
+        return self.blob.nbytes + self.offsets.nbytes
+
+
+class FrozenStringIndex:
+    """Read-only str -> id lookup, by binary search over keys sorted as UTF-8"""
+
+    __slots__ = ('keys', 'order')
+
+    def __init__(self, keys: StringColumn, order: memoryview):
+        self.keys = keys
+        self.order = order
+
+    def get(self, key: str, default=None):
+        target = key.encode('utf-8')
+        keys, order = self.keys, self.order
+        low, high = 0, len(order)
+        while low < high:
+            middle = (low + high) // 2
+            if keys.encoded(order[middle]) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(order) and keys.encoded(order[low]) == target:
+            return order[low]
+        return default
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self.get(key) is not None
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+
+class PostingLists(Sequence):
+    """Posting lists stored CSR-style as one id array plus end offsets"""
+
+    __slots__ = ('offsets', 'ids')
+
+    def __init__(self, offsets: memoryview, ids: memoryview):
+        self.offsets = offsets
+        self.ids = ids
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> memoryview:
+        return self.ids[self.offsets[index]:self.offsets[index + 1]]
+
+
+class FrozenMapping:
+    """Read-only str -> posting list mapping"""
+
+    __slots__ = ('keys', 'values')
+
+    def __init__(self, keys: FrozenStringIndex, values: PostingLists):
+        self.keys = keys
+        self.values = values
+
+    def get(self, key: str, default=None):
+        position = self.keys.get(key)
+        return default if position is None else self.values[position]
+
+
+class _SnapshotWriter:
+    """Collects sections and writes them behind a JSON header"""
+
+    def __init__(self):
+        self.sections: Dict[str, List] = {}
+        self.chunks: List[bytes] = []
+        self.size = 0
+
+    def add(self, name: str, data: array):
+        payload = data.tobytes()
+        self.sections[name] = [self.size, len(payload), data.typecode]
+        padding = -len(payload) % ALIGNMENT
+        self.chunks.append(payload + b'\0' * padding)
+        self.size += len(payload) + padding
+
+    def add_strings(self, name: str, strings: Iterable[str]):
+        offsets = array('Q', [0])
+        blob = bytearray()
+        for value in strings:
+            blob += value.encode('utf-8')
+            offsets.append(len(blob))
+        self.add(f'{name}.blob', array('B', blob))
+        self.add(f'{name}.offsets', offsets)
+
+    def add_string_index(self, name: str, strings: Sequence[str]):
+        """Strings in id order plus their ids sorted by UTF-8 bytes"""
+        self.add_strings(name, strings)
+        order = sorted(range(len(strings)), key=lambda position: strings[position].encode('utf-8'))
+        self.add(f'{name}.order', array('I', order))
+
+    def add_postings(self, name: str, postings: Iterable[Sequence[int]]):
+        offsets = array('Q', [0])
+        ids = array('I')
+        for posting in postings:
+            ids.extend(posting)
+            offsets.append(len(ids))
+        self.add(f'{name}.offsets', offsets)
+        self.add(f'{name}.ids', ids)
+
+    def write(self, path: str, meta: Dict):
+        header = json.dumps({
+            'format': FORMAT_VERSION,
+            'byteorder': sys.byteorder,
+            'meta': meta,
+            'sections': self.sections,
+        }).encode('utf-8')
+        prefix = MAGIC + len(header).to_bytes(8, 'little') + header
+        prefix += b'\0' * (-len(prefix) % ALIGNMENT)
+
+        # Write beside the target and rename, so processes that already mapped
+        # the old file keep a consistent view
+        temporary = f'{path}.tmp{os.getpid()}'
+        with open(temporary, 'wb') as handle:
+            handle.write(prefix)
+            for chunk in self.chunks:
+                handle.write(chunk)
+        os.replace(temporary, path)
+
+
+def write_snapshot(path: str, catalog: GameCatalog, index: CatalogIndex, titles: TitleIndex,
+                   similar: Optional[SimilarGamesIndex] = None):
+    """Serialise a catalog and its indexes to path"""
+    writer = _SnapshotWriter()
+
+    for name in ('ratings', 'years', 'genre_codes', 'playtime_codes', 'platform_masks',
+                 'feature_offsets', 'feature_ids'):
+        writer.add(f'catalog.{name}', array(_typecode(getattr(catalog, name)), getattr(catalog, name)))
+    writer.add_strings('catalog.names', catalog.names)
+    writer.add_strings('catalog.descriptions', catalog.descriptions)
+
+    writer.add('index.rank_order', array('I', index.rank_order))
+    writer.add('index.rank', array('I', index.rank))
+    facets = {}
+    for facet in ('genre', 'platform', 'playtime'):
+        postings = getattr(index, f'by_{facet}')
+        facets[facet] = sorted(postings)
+        writer.add_postings(f'index.{facet}', (postings[code] for code in facets[facet]))
+
+    writer.add_string_index('titles.tokens', titles.token_names)
+    writer.add_postings('titles.postings', titles.postings)
+    trigrams = sorted(titles.trigram_postings)
+    writer.add_string_index('titles.trigrams', trigrams)
+    writer.add_postings('titles.trigram_postings', (titles.trigram_postings[trigram] for trigram in trigrams))
+    writer.add('titles.title_offsets', array('I', titles.title_offsets))
+    writer.add('titles.title_tokens', array('I', titles.title_tokens))
+    if similar is not None:
+        if similar.indexed < len(catalog):
+            similar.update()
+        writer.add('similar.ids', array('I', similar.neighbour_ids))
+        writer.add('similar.scores', array('f', similar.neighbour_scores))
+
+    writer.write(path, {
+        'genres': list(catalog.genres),
+        'playtimes': list(catalog.playtimes),
+        'platforms': list(catalog.platforms),
+        'features': list(catalog.features),
+        'facets': facets,
+        'titles': {
+            'min_score': titles.min_score,
+            'min_similarity': titles.min_similarity,
+            'max_postings': titles.max_postings,
+        },
+        'similar_neighbours': similar.neighbours if similar is not None else None,
+    })
+
+
+def read_snapshot(path: str) -> Tuple[GameCatalog, CatalogIndex, TitleIndex, Optional[SimilarGamesIndex]]:
+    """
+    Memory-map a snapshot and return the read-only catalog, facet index,
+    title index and similar-games table (None if the snapshot has none)
+    """
+    with open(path, 'rb') as handle:
+        mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    if bytes(view[:len(MAGIC)]) != MAGIC:
+        raise ValueError(f"{path} is not a game catalog snapshot")
+    header_length = int.from_bytes(view[8:16], 'little')
+    header = json.loads(bytes(view[16:16 + header_length]))
+    if header['format'] != FORMAT_VERSION or header['byteorder'] != sys.byteorder:
+        raise ValueError(f"{path} was written by an incompatible snapshot format or platform")
+    data_start = 16 + header_length + (-(16 + header_length) % ALIGNMENT)
+    sections, meta = header['sections'], header['meta']
+
+    def section(name: str) -> memoryview:
+        offset, length, typecode = sections[name]
+        start = data_start + offset
+        return view[start:start + length].cast(typecode)
+
+    def strings(name: str) -> StringColumn:
+        return StringColumn(section(f'{name}.blob'), section(f'{name}.offsets'))
+
+    def string_index(name: str) -> FrozenStringIndex:
+        return FrozenStringIndex(strings(name), section(f'{name}.order'))
+
+    def postings(name: str) -> PostingLists:
+        return PostingLists(section(f'{name}.offsets'), section(f'{name}.ids'))
+
+    catalog = GameCatalog()
+    catalog.genres = Vocabulary(meta['genres'])
+    catalog.playtimes = Vocabulary(meta['playtimes'])
+    catalog.platforms = Vocabulary(meta['platforms'])
+    catalog.features = Vocabulary(meta['features'])
+    catalog.names = strings('catalog.names')
+    catalog.descriptions = strings('catalog.descriptions')
+    for name in ('ratings', 'years', 'genre_codes', 'playtime_codes', 'platform_masks',
+                 'feature_offsets', 'feature_ids'):
+        setattr(catalog, name, section(f'catalog.{name}'))
+
+    facets = {}
+    for facet, codes in meta['facets'].items():
+        facet_postings = postings(f'index.{facet}')
+        facets[facet] = {code: facet_postings[position] for position, code in enumerate(codes)}
+    index = CatalogIndex.from_postings(catalog, section('index.rank_order'), section('index.rank'),
+                                      facets['genre'], facets['platform'], facets['playtime'])
+
+    titles = TitleIndex(**meta['titles'])
+    titles.tokens = string_index('titles.tokens')
+    titles.token_names = titles.tokens.keys
+    titles.postings = postings('titles.postings')
+    titles.trigram_postings = FrozenMapping(string_index('titles.trigrams'), postings('titles.trigram_postings'))
+    titles.title_offsets = section('titles.title_offsets')
+    titles.title_tokens = section('titles.title_tokens')
+
+    similar = None
+    if meta.get('similar_neighbours'):
+        similar = SimilarGamesIndex.from_table(catalog, section('similar.ids'), section('similar.scores'),
+                                               meta['similar_neighbours'])
+
+    return catalog, index, titles, similar
+
+
+def _typecode(column) -> str:
+    return column.typecode if isinstance(column, array) else column.format
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python catalog_snapshot.py OUTPUT")
+        sys.exit(1)
+    from game_chatbot import default_catalog
+
+    default_catalog().save(sys.argv[1])
+    print(f"Wrote catalog snapshot to {sys.argv[1]}")
@@ -0,0 +1,136 @@
+"""
+Runs chatbot work off the event loop, in a thread or process pool.
+
+A ChatExecutor admits at most max_pending requests at a time (queued plus
+running) and rejects the rest with QueueFull, so a burst of slow requests
+cannot pile up without bound behind the pool.
+
+In a thread pool the session's GameChatbot answers directly. A process pool
+cannot share the session objects, so each worker process holds its own
+stateless chatbot over the same catalog (the bundled one, a catalog file,
+or a snapshot that every worker memory-maps) and the calling process records the
+conversation history and the preferences the worker extracted. The session's
+profile and the game it last talked about are sent along with each request,
+and the game comes back, so in either pool recommendations are ranked by
+what the user asked for before and "similar games" means the session's own
+last game.
+"""
+
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
+
+T = TypeVar('T')
+
+EXECUTOR_KINDS = ('thread', 'process')
+
+
+class QueueFull(Exception):
+    """Raised when the executor already has max_pending requests in flight"""
+
+
+class ChatExecutor:
+    """Bounded thread or process pool for generate_response calls"""
+
+    def __init__(self, kind: str = 'thread', workers: Optional[int] = None, max_pending: int = 256,
+                 snapshot: Optional[str] = None, catalog_file: Optional[str] = None):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"kind must be one of {EXECUTOR_KINDS}, not {kind!r}")
+        if max_pending < 1:
+            raise ValueError("max_pending must be at least 1")
+        self.kind = kind
+        self.workers = workers or min(32, (os.cpu_count() or 1) + 4)
+        self.max_pending = max_pending
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        if kind == 'process':
+            self.pool: Executor = ProcessPoolExecutor(self.workers, initializer=_start_worker,
+                                                        initargs=(snapshot, catalog_file))
+        else:
+            self.pool = ThreadPoolExecutor(self.workers, thread_name_prefix='chat')
+
+    async def run(self, function: Callable[..., T], *args) -> T:
+        """Run function(*args) in the pool, or raise QueueFull if too many calls are in flight"""
+        # Only touched from the event loop thread, so no lock is needed
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise QueueFull(f"{self.pending} requests already pending")
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, function, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    async def generate(self, chatbot, user_input: str) -> str:
+        """Answer one message for chatbot, keeping its conversation history"""
+        if self.kind == 'thread':
+            return await self.run(chatbot.generate_response, user_input)
+        response, preferences, context = await self.run(_answer, user_input, chatbot.user_preferences,
+                                                         chatbot.current_context)
+        chatbot.current_context = context
+        chatbot.remember_preferences(preferences)
+        chatbot.conversation_history.append(('user', user_input))
+        chatbot.conversation_history.append(('bot', response))
+        return response
+
+    async def generate_batch(self, chatbot, messages: List[str]) -> List[str]:
+        """Answer a batch of messages for chatbot, keeping its conversation history"""
+        if self.kind == 'thread':
+            return await self.run(chatbot.generate_responses, messages)
+        responses, preferences, context = await self.run(_answer_batch, messages, chatbot.user_preferences,
+                                                          chatbot.current_context)
+        chatbot.current_context = context
+        for message, response, message_preferences in zip(messages, responses, preferences):
+            chatbot.remember_preferences(message_preferences)
+            chatbot.conversation_history.append(('user', message))
+            chatbot.conversation_history.append(('bot', response))
+        return responses
+
+    def stats(self) -> dict:
+        return {
+            'kind': self.kind,
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            'pending': self.pending,
+            'completed': self.completed,
+            'rejected': self.rejected,
+        }
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+# Per-process chatbot used by process pool workers
+_worker_chatbot = None
+
+
+def _start_worker(snapshot: Optional[str], catalog_file: Optional[str] = None):
+    global _worker_chatbot
+    from catalog_reload import load_catalog_file
+    from game_chatbot import GameChatbot, default_catalog
+    from shared_catalog import SharedCatalog
+
+    if catalog_file:
+        catalog = load_catalog_file(catalog_file)[0]
+    else:
+        catalog = SharedCatalog.load(snapshot) if snapshot else default_catalog()
+    _worker_chatbot = GameChatbot(catalog, history_size=1)
+
+
+def _answer(user_input: str, profile: Dict, context: Optional[Dict]) -> Tuple[str, Dict, Optional[Dict]]:
+    # The worker's chatbot serves every session, so it takes on the caller's state first
+    _worker_chatbot.user_preferences, _worker_chatbot.current_context = profile, context
+    intent, preferences = _worker_chatbot.matcher.analyze(user_input)
+    _worker_chatbot.remember_preferences(preferences)
+    return _worker_chatbot.dispatch_intent(intent, preferences, user_input), preferences, _worker_chatbot.current_context
+
+
+def _answer_batch(messages: List[str], profile: Dict,
+                  context: Optional[Dict]) -> Tuple[List[str], List[Dict], Optional[Dict]]:
+    _worker_chatbot.user_preferences, _worker_chatbot.current_context = profile, context
+    matcher = _worker_chatbot.matcher
+    responses = _worker_chatbot.generate_responses(messages)
+    return responses, [matcher.analyze(message).preferences for message in messages], _worker_chatbot.current_context
@@ -0,0 +1,87 @@
+"""
+Bounded conversation history.
+
+Only the most recent turns are kept, in a fixed-size ring buffer, while
+running counters remember how many messages each side has sent in total, so
+summaries stay constant-time however long a conversation runs. Turns pushed
+out of the buffer can optionally be appended to a JSON-lines spill file for
+later analysis.
+"""
+
+import json
+import time
+import uuid
+from collections import deque
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_MAX_MESSAGES = 100
+SPILL_BATCH = 32
+
+Message = Tuple[str, str]
+
+
+class ConversationHistory:
+    """Ring buffer of (role, message) tuples with per-role counters"""
+
+    __slots__ = ('messages', 'counts', 'total', 'spill_path', 'conversation_id', '_pending')
+
+    def __init__(self, max_messages: int = DEFAULT_MAX_MESSAGES, spill_path: Optional[str] = None):
+        if max_messages < 1:
+            raise ValueError("max_messages must be at least 1")
+        self.messages: Deque[Message] = deque(maxlen=max_messages)
+        self.counts: Dict[str, int] = {}
+        self.total = 0
+        self.spill_path = spill_path
+        self.conversation_id = uuid.uuid4().hex if spill_path else None
+        self._pending: List[str] = []
+
+    @property
+    def max_messages(self) -> int:
+        return self.messages.maxlen
+
+    def append(self, message: Message):
+        """Record a (role, text) message, spilling the oldest one if the buffer is full"""
+        role = message[0]
+        if self.spill_path and len(self.messages) == self.messages.maxlen:
+            self._spill(self.messages[0], self.total - len(self.messages))
+        self.messages.append(message)
+        self.counts[role] = self.counts.get(role, 0) + 1
+        self.total += 1
+
+    def count(self, role: str) -> int:
+        """Messages ever sent by role, including ones no longer retained"""
+        return self.counts.get(role, 0)
+
+    def clear(self):
+        self.flush()
+        self.messages.clear()
+        self.counts.clear()
+        self.total = 0
+
+    def flush(self):
+        """Write spilled messages still waiting in memory to the spill file"""
+        if not self._pending:
+            return
+        with open(self.spill_path, 'a', encoding='utf-8') as handle:
+            handle.write(''.join(self._pending))
+        self._pending.clear()
+
+    def _spill(self, message: Message, sequence: int):
+        self._pending.append(json.dumps({
+            'conversation': self.conversation_id,
+            'sequence': sequence,
+            'role': message[0],
+            'message': message[1],
+            'spilled_at': time.time(),
+        }) + '\n')
+        if len(self._pending) >= SPILL_BATCH:
+            self.flush()
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def __iter__(self) -> Iterator[Message]:
+        return iter(self.messages)
+
+    def __getitem__(self, index: int) -> Message:
+        return self.messages[index]
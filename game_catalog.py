@@ -0,0 +1,347 @@
+"""
+Columnar game catalog.
+
+Every field of a game lives in its own column: ratings and years in typed
+arrays, genre and playtime as small integer codes, platforms as bitmasks and
+features as interned ids. A ``GameRow`` is a thin view over one position in
+those columns that behaves like the original game dictionaries, so code
+written as ``game['name']`` keeps working without materialising a dict per
+title.
+"""
+
+import hashlib
+import sys
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+PLAYTIMES = ('short', 'medium', 'long')
+GAME_FIELDS = ('name', 'platform', 'rating', 'year', 'playtime', 'description', 'features', 'genre')
+# Typed columns with one entry per game
+ARRAY_COLUMNS = ('ratings', 'years', 'genre_codes', 'playtime_codes', 'platform_masks')
+
+
+class Vocabulary:
+    """Interning table that maps strings to small integer codes"""
+
+    __slots__ = ('_values', '_codes')
+
+    def __init__(self, values: Iterable[str] = ()):
+        self._values: List[str] = []
+        self._codes: Dict[str, int] = {}
+        for value in values:
+            self.intern(value)
+
+    def intern(self, value: str) -> int:
+        """Return the code for value, adding it to the table if needed"""
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self._values)
+            self._values.append(value)
+            self._codes[value] = code
+        return code
+
+    def code(self, value: str) -> Optional[int]:
+        """Return the code for value without adding it"""
+        return self._codes.get(value)
+
+    def value(self, code: int) -> str:
+        """Return the string stored under code"""
+        return self._values[code]
+
+    def copy(self) -> 'Vocabulary':
+        return Vocabulary(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._values)
+
+    def __contains__(self, value: object) -> bool:
+        return value in self._codes
+
+
+class GameRow:
+    """Read-only, dict-like view of a single game in a GameCatalog"""
+
+    __slots__ = ('catalog', 'id')
+
+    def __init__(self, catalog: 'GameCatalog', game_id: int):
+        self.catalog = catalog
+        self.id = game_id
+
+    def __getitem__(self, key: str):
+        getter = _ROW_GETTERS.get(key)
+        if getter is None:
+            raise KeyError(key)
+        return getter(self.catalog, self.id)
+
+    def get(self, key: str, default=None):
+        """Return the value for key, or default if the field does not exist"""
+        getter = _ROW_GETTERS.get(key)
+        if getter is None:
+            return default
+        return getter(self.catalog, self.id)
+
+    def __contains__(self, key: object) -> bool:
+        return key in _ROW_GETTERS
+
+    def keys(self) -> Tuple[str, ...]:
+        return GAME_FIELDS
+
+    def to_dict(self) -> Dict:
+        """Materialise the row as a plain game dictionary"""
+        return {key: self[key] for key in GAME_FIELDS}
+
+    copy = to_dict
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, GameRow):
+            return NotImplemented
+        return self.catalog is other.catalog and self.id == other.id
+
+    def __hash__(self) -> int:
+        return hash((id(self.catalog), self.id))
+
+    def __repr__(self) -> str:
+        return f"GameRow({self.id}, {self.catalog.names[self.id]!r})"
+
+
+class GameCatalog:
+    """
+    Compact store for the game database.
+
+    Games are numbered in insertion order; that id is the position of the game
+    in every column. Removing a game moves the last game into its place, so
+    ids stay dense.
+    """
+
+    MAX_PLATFORMS = 32
+
+    def __init__(self):
+        self.genres = Vocabulary()
+        self.playtimes = Vocabulary(PLAYTIMES)
+        self.platforms = Vocabulary()
+        self.features = Vocabulary()
+
+        self.names: List[str] = []
+        self.descriptions: List[str] = []
+        self.ratings = array('d')
+        self.years = array('H')
+        self.genre_codes = array('H')
+        self.playtime_codes = array('B')
+        self.platform_masks = array('I')
+        # Features are stored CSR-style: the ids of game i are
+        # feature_ids[feature_offsets[i]:feature_offsets[i + 1]]
+        self.feature_offsets = array('I', [0])
+        self.feature_ids = array('I')
+
+        self._platform_cache: Dict[int, Tuple[str, ...]] = {}
+        # Bumped on every change, so derived caches know when to drop their entries
+        self.version = 0
+
+    @classmethod
+    def from_games_db(cls, games_db: Dict[str, List[Dict]]) -> 'GameCatalog':
+        """Build a catalog from the genre -> list of game dicts layout"""
+        catalog = cls()
+        for genre, games in games_db.items():
+            catalog.genres.intern(genre)
+            for game in games:
+                catalog.add_game(genre, game)
+        return catalog
+
+    def digest(self) -> str:
+        """
+        Hex digest of the catalog's content: the same for the same games in
+        the same order, loaded the same way, while version only counts the
+        changes made since loading
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        for strings in (self.genres, self.playtimes, self.platforms, self.features, self.names, self.descriptions):
+            if hasattr(strings, 'blob'):
+                # A snapshot's string column; its bytes are quicker to hash than its strings
+                digest.update(strings.blob)
+                digest.update(memoryview(strings.offsets).cast('B'))
+            else:
+                digest.update('\0'.join(strings).encode())
+            digest.update(b'\1')
+        for name in ARRAY_COLUMNS + ('feature_offsets', 'feature_ids'):
+            digest.update(memoryview(getattr(self, name)).cast('B'))
+        return digest.hexdigest()
+
+    def copy(self) -> 'GameCatalog':
+        """Mutable copy of the catalog, also of a read-only snapshot"""
+        catalog = GameCatalog.__new__(GameCatalog)
+        catalog.genres, catalog.playtimes = self.genres.copy(), self.playtimes.copy()
+        catalog.platforms, catalog.features = self.platforms.copy(), self.features.copy()
+        catalog.names = list(self.names)
+        catalog.descriptions = list(self.descriptions)
+        for name in ARRAY_COLUMNS + ('feature_offsets', 'feature_ids'):
+            setattr(catalog, name, _copy_column(getattr(self, name)))
+        catalog._platform_cache = dict(self._platform_cache)
+        catalog.version = self.version
+        return catalog
+
+    def add_game(self, genre: str, game: Dict) -> int:
+        """Append a game dictionary to the catalog and return its id"""
+        self._check_mutable()
+        game_id = len(self.names)
+        self.names.append(game['name'])
+        self.descriptions.append(game['description'])
+        self.ratings.append(game['rating'])
+        self.years.append(game['year'])
+        self.genre_codes.append(self.genres.intern(genre))
+        self.playtime_codes.append(self.playtimes.intern(game['playtime']))
+        self.platform_masks.append(self.platform_mask(game['platform'], create=True))
+        self.feature_ids.extend(self.features.intern(feature) for feature in game['features'])
+        self.feature_offsets.append(len(self.feature_ids))
+        self.version += 1
+        return game_id
+
+    def set_game(self, game_id: int, genre: str, game: Dict):
+        """Replace the game stored under game_id"""
+        self._check_mutable(game_id)
+        self.names[game_id] = game['name']
+        self.descriptions[game_id] = game['description']
+        self.ratings[game_id] = game['rating']
+        self.years[game_id] = game['year']
+        self.genre_codes[game_id] = self.genres.intern(genre)
+        self.playtime_codes[game_id] = self.playtimes.intern(game['playtime'])
+        self.platform_masks[game_id] = self.platform_mask(game['platform'], create=True)
+        self._set_features(game_id, [self.features.intern(feature) for feature in game['features']])
+        self.version += 1
+
+    def remove_game(self, game_id: int) -> int:
+        """
+        Remove a game, moving the last game into its id; returns the old id
+        of the moved game (game_id itself when it was the last one)
+        """
+        self._check_mutable(game_id)
+        last = len(self.names) - 1
+        offsets = self.feature_offsets
+        if game_id != last:
+            for column in (self.names, self.descriptions) + tuple(getattr(self, name) for name in ARRAY_COLUMNS):
+                column[game_id] = column[last]
+            self._set_features(game_id, self.feature_ids[offsets[last]:offsets[last + 1]])
+        for column in (self.names, self.descriptions) + tuple(getattr(self, name) for name in ARRAY_COLUMNS):
+            del column[last]
+        del self.feature_ids[offsets[last]:]
+        del offsets[last + 1]
+        self.version += 1
+        return last
+
+    def _set_features(self, game_id: int, codes: Iterable[int]):
+        offsets = self.feature_offsets
+        start, end = offsets[game_id], offsets[game_id + 1]
+        codes = array('I', codes)
+        self.feature_ids[start:end] = codes
+        shift = len(codes) - (end - start)
+        if shift:
+            for later in range(game_id + 1, len(offsets)):
+                offsets[later] += shift
+
+    def _check_mutable(self, game_id: Optional[int] = None):
+        if not isinstance(self.names, list):
+            raise TypeError("Cannot change a read-only catalog snapshot; copy() it first")
+        if game_id is not None and not 0 <= game_id < len(self.names):
+            raise IndexError(game_id)
+
+    def platform_mask(self, platforms: Iterable[str], create: bool = False) -> int:
+        """Return the bitmask for a collection of platform names"""
+        mask = 0
+        for platform in platforms:
+            if create:
+                code = self.platforms.intern(platform)
+                if code >= self.MAX_PLATFORMS:
+                    raise ValueError(f"Catalog supports at most {self.MAX_PLATFORMS} platforms")
+            else:
+                code = self.platforms.code(platform)
+                if code is None:
+                    continue
+            mask |= 1 << code
+        return mask
+
+    def platform_names(self, mask: int) -> Tuple[str, ...]:
+        """Decode a platform bitmask into platform names"""
+        names = self._platform_cache.get(mask)
+        if names is None:
+            names = tuple(platform for code, platform in enumerate(self.platforms) if mask & (1 << code))
+            self._platform_cache[mask] = names
+        return names
+
+    def genre_of(self, game_id: int) -> str:
+        return self.genres.value(self.genre_codes[game_id])
+
+    def playtime_of(self, game_id: int) -> str:
+        return self.playtimes.value(self.playtime_codes[game_id])
+
+    def platforms_of(self, game_id: int) -> List[str]:
+        return list(self.platform_names(self.platform_masks[game_id]))
+
+    def features_of(self, game_id: int) -> List[str]:
+        start, end = self.feature_offsets[game_id], self.feature_offsets[game_id + 1]
+        return [self.features.value(code) for code in self.feature_ids[start:end]]
+
+    def games_in_genre(self, genre: str) -> List[GameRow]:
+        """Return the games of one genre in catalog order"""
+        return list(self.iter_genre(genre))
+
+    def iter_genre(self, genre: str) -> Iterator[GameRow]:
+        """Yield the games of one genre in catalog order, scanning lazily"""
+        code = self.genres.code(genre)
+        if code is None:
+            return
+        for game_id, genre_code in enumerate(self.genre_codes):
+            if genre_code == code:
+                yield GameRow(self, game_id)
+
+    def by_genre(self) -> Dict[str, List[GameRow]]:
+        """Return the catalog in the legacy genre -> list of games layout"""
+        games_db: Dict[str, List[GameRow]] = {genre: [] for genre in self.genres}
+        for game in self:
+            games_db[game['genre']].append(game)
+        return games_db
+
+    def nbytes(self) -> int:
+        """Approximate size of the columns, excluding the shared vocabularies"""
+        columns = (self.ratings, self.years, self.genre_codes, self.playtime_codes,
+                   self.platform_masks, self.feature_offsets, self.feature_ids)
+        total = sum(column.itemsize * len(column) for column in columns)
+        for strings in (self.names, self.descriptions):
+            if isinstance(strings, list):
+                total += sys.getsizeof(strings) + sum(sys.getsizeof(value) for value in strings)
+            else:
+                # Snapshot string columns know their own size
+                total += strings.nbytes
+        return total
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, game_id: int) -> GameRow:
+        if not 0 <= game_id < len(self.names):
+            raise IndexError(game_id)
+        return GameRow(self, game_id)
+
+    def __iter__(self) -> Iterator[GameRow]:
+        for game_id in range(len(self.names)):
+            yield GameRow(self, game_id)
+
+
+def _copy_column(column) -> array:
+    """Copy an array or a memory-mapped snapshot column into a new array"""
+    copied = array(column.typecode if isinstance(column, array) else column.format)
+    copied.frombytes(memoryview(column).cast('B'))
+    return copied
+
+
+_ROW_GETTERS = {
+    'name': lambda catalog, game_id: catalog.names[game_id],
+    'platform': GameCatalog.platforms_of,
+    'rating': lambda catalog, game_id: catalog.ratings[game_id],
+    'year': lambda catalog, game_id: catalog.years[game_id],
+    'playtime': GameCatalog.playtime_of,
+    'description': lambda catalog, game_id: catalog.descriptions[game_id],
+    'features': GameCatalog.features_of,
+    'genre': GameCatalog.genre_of,
+}
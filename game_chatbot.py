@@ -1,160 +1,213 @@
+import asyncio
+import functools
 import random
 import re
+import sys
+import time
+from collections import deque
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
 import json
 
+from catalog_reload import CatalogManager
+from conversation_log import DEFAULT_MAX_MESSAGES, ConversationHistory
+from game_catalog import GameCatalog, GameRow
+from game_index import CatalogIndex
+from game_scoring import ScoringEngine
+from intent_matcher import IntentMatcher
+from metrics import REGISTRY
+from profile_store import default_profile, learn_preferences, learned_preferences, merge_preferences
+from response_renderer import ResponseRenderer, iter_platform, iter_recommendations
+from shared_catalog import SharedCatalog
+from title_search import TitleIndex
+
+HANDLER_SECONDS = REGISTRY.histogram(
+    'chatbot_handler_duration_seconds', "Time to answer a message, by intent and handler", ('intent', 'handler'))
+FALLBACKS = REGISTRY.counter(
+    'chatbot_fallbacks', "Answers that fell back from the direct path, by handler and reason", ('handler', 'reason'))
+FEATURE_CANDIDATES = 50  # best rated exact matches reordered by the features a message asks for
+INTENT_HANDLERS = {
+    'greeting': 'handle_greeting',
+    'recommendation': 'handle_recommendation',
+    'game_info': 'handle_game_info',
+    'similar': 'handle_similar',
+    'platform_preference': 'handle_platform_preference',
+    'genre_preference': 'handle_genre_preference',
+    'tips': 'handle_tips',
+    'facts': 'handle_facts',
+    'review': 'handle_review',
+    'goodbye': 'handle_goodbye',
+}
+
+# Bundled game database, genre -> list of games
+DEFAULT_GAMES_DB = {
+    'action': [
+        {
+            'name': 'The Witcher 3: Wild Hunt',
+            'platform': ['PC', 'PlayStation', 'Xbox', 'Switch'],
+            'rating': 9.3,
+            'year': 2015,
+            'playtime': 'long',
+            'description': 'Open-world RPG with rich storytelling and complex characters',
+            'features': ['open-world', 'story-rich', 'character-customization']
+        },
+        {
+            'name': 'Red Dead Redemption 2',
+            'platform': ['PC', 'PlayStation', 'Xbox'],
+            'rating': 9.7,
+            'year': 2018,
+            'playtime': 'long',
+            'description': 'Immersive western adventure with stunning details',
+            'features': ['open-world', 'story-rich', 'realistic']
+        },
+        {
+            'name': 'Cyberpunk 2077',
+            'platform': ['PC', 'PlayStation', 'Xbox'],
+            'rating': 7.8,
+            'year': 2020,
+            'playtime': 'long',
+            'description': 'Futuristic RPG in a dystopian megacity',
+            'features': ['open-world', 'cyberpunk', 'character-customization']
+        }
+    ],
+    'adventure': [
+        {
+            'name': 'The Legend of Zelda: Breath of the Wild',
+            'platform': ['Switch', 'Wii U'],
+            'rating': 9.7,
+            'year': 2017,
+            'playtime': 'long',
+            'description': 'Revolutionary open-world adventure with physics-based gameplay',
+            'features': ['open-world', 'exploration', 'puzzle-solving']
+        },
+        {
+            'name': 'Uncharted 4: A Thief\'s End',
+            'platform': ['PlayStation'],
+            'rating': 9.0,
+            'year': 2016,
+            'playtime': 'medium',
+            'description': 'Cinematic action-adventure with treasure hunting',
+            'features': ['story-rich', 'cinematic', 'action']
+        }
+    ],
+    'strategy': [
+        {
+            'name': 'Civilization VI',
+            'platform': ['PC', 'PlayStation', 'Xbox', 'Switch', 'Mobile'],
+            'rating': 8.5,
+            'year': 2016,
+            'playtime': 'long',
+            'description': 'Turn-based strategy game about building civilizations',
+            'features': ['turn-based', 'empire-building', 'multiplayer']
+        },
+        {
+            'name': 'Total War: Warhammer III',
+            'platform': ['PC'],
+            'rating': 8.2,
+            'year': 2022,
+            'playtime': 'long',
+            'description': 'Epic fantasy strategy with massive battles',
+            'features': ['real-time-strategy', 'fantasy', 'large-scale-battles']
+        }
+    ],
+    'puzzle': [
+        {
+            'name': 'Portal 2',
+            'platform': ['PC', 'PlayStation', 'Xbox'],
+            'rating': 9.5,
+            'year': 2011,
+            'playtime': 'short',
+            'description': 'Mind-bending puzzle game with clever mechanics',
+            'features': ['puzzle-solving', 'physics-based', 'co-op']
+        },
+        {
+            'name': 'The Witness',
+            'platform': ['PC', 'PlayStation', 'Xbox', 'Mobile'],
+            'rating': 8.4,
+            'year': 2016,
+            'playtime': 'medium',
+            'description': 'Beautiful puzzle island with interconnected challenges',
+            'features': ['puzzle-solving', 'exploration', 'philosophical']
+        }
+    ],
+    'racing': [
+        {
+            'name': 'Forza Horizon 5',
+            'platform': ['PC', 'Xbox'],
+            'rating': 9.1,
+            'year': 2021,
+            'playtime': 'medium',
+            'description': 'Open-world racing in beautiful Mexico',
+            'features': ['open-world', 'racing', 'multiplayer']
+        },
+        {
+            'name': 'Gran Turismo 7',
+            'platform': ['PlayStation'],
+            'rating': 8.7,
+            'year': 2022,
+            'playtime': 'long',
+            'description': 'Realistic racing simulator with extensive car collection',
+            'features': ['simulation', 'racing', 'car-collection']
+        }
+    ],
+    'indie': [
+        {
+            'name': 'Hades',
+            'platform': ['PC', 'PlayStation', 'Xbox', 'Switch'],
+            'rating': 9.0,
+            'year': 2020,
+            'playtime': 'medium',
+            'description': 'Roguelike action game with excellent storytelling',
+            'features': ['roguelike', 'story-rich', 'fast-paced']
+        },
+        {
+            'name': 'Celeste',
+            'platform': ['PC', 'PlayStation', 'Xbox', 'Switch'],
+            'rating': 9.4,
+            'year': 2018,
+            'playtime': 'short',
+            'description': 'Challenging platformer with emotional depth',
+            'features': ['platformer', 'challenging', 'emotional-story']
+        }
+    ]
+}
+
+
+@functools.lru_cache(maxsize=None)
+def default_catalog() -> SharedCatalog:
+    """Build the bundled catalog and its indexes once per process"""
+    return SharedCatalog.from_games_db(DEFAULT_GAMES_DB)
+
+
 class GameChatbot:
     """
     A comprehensive game chatbot that can discuss games, provide recommendations,
     answer gaming questions, and engage in conversations about video games.
     """
     
-    def __init__(self):
-        self.user_preferences = {
-            'favorite_genres': [],
-            'preferred_platforms': [],
-            'completed_games': [],
-            'wishlist': [],
-            'playtime_preference': 'medium'  # short, medium, long
-        }
-        self.conversation_history = []
+    def __init__(self, catalog: Union[SharedCatalog, CatalogManager, None] = None, history_size: int = DEFAULT_MAX_MESSAGES,
+                 history_spill_path: Optional[str] = None, user_preferences: Optional[Dict] = None):
+        self.user_preferences = user_preferences if user_preferences is not None else default_profile()
+        # Called with user_preferences whenever a message changes them, e.g. to persist them
+        self.on_preferences_changed: Optional[Callable[[Dict], None]] = None
+        self.conversation_history = ConversationHistory(history_size, history_spill_path)
         self.current_context = None
-        self.initialize_game_database()
+        self.initialize_game_database(catalog)
         
-    def initialize_game_database(self):
-        """Initialize the comprehensive game database"""
-        self.games_db = {
-            'action': [
-                {
-                    'name': 'The Witcher 3: Wild Hunt',
-                    'platform': ['PC', 'PlayStation', 'Xbox', 'Switch'],
-                    'rating': 9.3,
-                    'year': 2015,
-                    'playtime': 'long',
-                    'description': 'Open-world RPG with rich storytelling and complex characters',
-                    'features': ['open-world', 'story-rich', 'character-customization']
-                },
-                {
-                    'name': 'Red Dead Redemption 2',
-                    'platform': ['PC', 'PlayStation', 'Xbox'],
-                    'rating': 9.7,
-                    'year': 2018,
-                    'playtime': 'long',
-                    'description': 'Immersive western adventure with stunning details',
-                    'features': ['open-world', 'story-rich', 'realistic']
-                },
-                {
-                    'name': 'Cyberpunk 2077',
-                    'platform': ['PC', 'PlayStation', 'Xbox'],
-                    'rating': 7.8,
-                    'year': 2020,
-                    'playtime': 'long',
-                    'description': 'Futuristic RPG in a dystopian megacity',
-                    'features': ['open-world', 'cyberpunk', 'character-customization']
-                }
-            ],
-            'adventure': [
-                {
-                    'name': 'The Legend of Zelda: Breath of the Wild',
-                    'platform': ['Switch', 'Wii U'],
-                    'rating': 9.7,
-                    'year': 2017,
-                    'playtime': 'long',
-                    'description': 'Revolutionary open-world adventure with physics-based gameplay',
-                    'features': ['open-world', 'exploration', 'puzzle-solving']
-                },
-                {
-                    'name': 'Uncharted 4: A Thief\'s End',
-                    'platform': ['PlayStation'],
-                    'rating': 9.0,
-                    'year': 2016,
-                    'playtime': 'medium',
-                    'description': 'Cinematic action-adventure with treasure hunting',
-                    'features': ['story-rich', 'cinematic', 'action']
-                }
-            ],
-            'strategy': [
-                {
-                    'name': 'Civilization VI',
-                    'platform': ['PC', 'PlayStation', 'Xbox', 'Switch', 'Mobile'],
-                    'rating': 8.5,
-                    'year': 2016,
-                    'playtime': 'long',
-                    'description': 'Turn-based strategy game about building civilizations',
-                    'features': ['turn-based', 'empire-building', 'multiplayer']
-                },
-                {
-                    'name': 'Total War: Warhammer III',
-                    'platform': ['PC'],
-                    'rating': 8.2,
-                    'year': 2022,
-                    'playtime': 'long',
-                    'description': 'Epic fantasy strategy with massive battles',
-                    'features': ['real-time-strategy', 'fantasy', 'large-scale-battles']
-                }
-            ],
-            'puzzle': [
-                {
-                    'name': 'Portal 2',
-                    'platform': ['PC', 'PlayStation', 'Xbox'],
-                    'rating': 9.5,
-                    'year': 2011,
-                    'playtime': 'short',
-                    'description': 'Mind-bending puzzle game with clever mechanics',
-                    'features': ['puzzle-solving', 'physics-based', 'co-op']
-                },
-                {
-                    'name': 'The Witness',
-                    'platform': ['PC', 'PlayStation', 'Xbox', 'Mobile'],
-                    'rating': 8.4,
-                    'year': 2016,
-                    'playtime': 'medium',
-                    'description': 'Beautiful puzzle island with interconnected challenges',
-                    'features': ['puzzle-solving', 'exploration', 'philosophical']
-                }
-            ],
-            'racing': [
-                {
-                    'name': 'Forza Horizon 5',
-                    'platform': ['PC', 'Xbox'],
-                    'rating': 9.1,
-                    'year': 2021,
-                    'playtime': 'medium',
-                    'description': 'Open-world racing in beautiful Mexico',
-                    'features': ['open-world', 'racing', 'multiplayer']
-                },
-                {
-                    'name': 'Gran Turismo 7',
-                    'platform': ['PlayStation'],
-                    'rating': 8.7,
-                    'year': 2022,
-                    'playtime': 'long',
-                    'description': 'Realistic racing simulator with extensive car collection',
-                    'features': ['simulation', 'racing', 'car-collection']
-                }
-            ],
-            'indie': [
-                {
-                    'name': 'Hades',
-                    'platform': ['PC', 'PlayStation', 'Xbox', 'Switch'],
-                    'rating': 9.0,
-                    'year': 2020,
-                    'playtime': 'medium',
-                    'description': 'Roguelike action game with excellent storytelling',
-                    'features': ['roguelike', 'story-rich', 'fast-paced']
-                },
-                {
-                    'name': 'Celeste',
-                    'platform': ['PC', 'PlayStation', 'Xbox', 'Switch'],
-                    'rating': 9.4,
-                    'year': 2018,
-                    'playtime': 'short',
-                    'description': 'Challenging platformer with emotional depth',
-                    'features': ['platformer', 'challenging', 'emotional-story']
-                }
-            ]
-        }
+    def initialize_game_database(self, catalog: Union[SharedCatalog, CatalogManager, None] = None):
+        """
+        Attach the game catalog, the bundled one unless a shared catalog is
+        injected. With a CatalogManager, each message is answered from the
+        catalog that is live when it arrives
+        """
+        if catalog is None:
+            catalog = default_catalog()
+        if isinstance(catalog, CatalogManager):
+            self.catalog_manager: Optional[CatalogManager] = catalog
+            catalog = catalog.current
+        else:
+            self.catalog_manager = None
+        self.shared_catalog = catalog
         
         # Gaming tips and facts
         self.gaming_tips = [
@@ -184,149 +237,217 @@ class GameChatbot:
             "Gaming can improve hand-eye coordination, problem-solving, and reaction times."
         ]
         
+    @property
+    def catalog(self) -> GameCatalog:
+        return self.shared_catalog.catalog
+        
+    @property
+    def index(self) -> CatalogIndex:
+        return self.shared_catalog.index
+        
+    @property
+    def matcher(self) -> IntentMatcher:
+        return self.shared_catalog.matcher
+        
+    @property
+    def titles(self) -> TitleIndex:
+        return self.shared_catalog.titles
+        
+    @property
+    def renderer(self) -> ResponseRenderer:
+        return self.shared_catalog.renderer
+        
+    @property
+    def scorer(self) -> ScoringEngine:
+        return self.shared_catalog.scorer
+        
+    @property
+    def games_db(self) -> Dict[str, List[GameRow]]:
+        """Genre -> list of games view of the catalog, kept for backwards compatibility"""
+        return self.catalog.by_genre()
+        
     def detect_intent(self, user_input: str) -> str:
         """Detect user intent from their input"""
-        user_input = user_input.lower()
-        
-        # Recommendation patterns
-        if any(word in user_input for word in ['recommend', 'suggestion', 'should i play', 'what game', 'good games']):
-            return 'recommendation'
-            
-        # Game info patterns
-        elif any(word in user_input for word in ['tell me about', 'what is', 'information about', 'details']):
-            return 'game_info'
-            
-        # Platform/genre preference patterns
-        elif any(word in user_input for word in ['platform', 'console', 'pc', 'playstation', 'xbox', 'switch']):
-            return 'platform_preference'
-            
-        # Genre patterns
-        elif any(word in user_input for word in ['action', 'adventure', 'strategy', 'puzzle', 'racing', 'indie', 'genre']):
-            return 'genre_preference'
-            
-        # Tips and advice patterns
-        elif any(word in user_input for word in ['tip', 'advice', 'help', 'how to', 'guide']):
-            return 'tips'
-            
-        # Facts patterns
-        elif any(word in user_input for word in ['fact', 'interesting', 'did you know', 'trivia']):
-            return 'facts'
-            
-        # Reviews patterns
-        elif any(word in user_input for word in ['review', 'opinion', 'rating', 'worth playing']):
-            return 'review'
-            
-        # Greeting patterns
-        elif any(word in user_input for word in ['hello', 'hi', 'hey', 'greetings']):
-            return 'greeting'
-            
-        # Goodbye patterns
-        elif any(word in user_input for word in ['bye', 'goodbye', 'exit', 'quit']):
-            return 'goodbye'
-            
-        else:
-            return 'general_chat'
+        return self.matcher.detect_intent(user_input)
     
     def extract_game_preferences(self, user_input: str) -> Dict:
         """Extract game preferences from user input"""
-        preferences = {}
-        user_input = user_input.lower()
-        
-        # Extract genres
-        genres = []
-        for genre in self.games_db.keys():
-            if genre in user_input:
-                genres.append(genre)
-        if genres:
-            preferences['genres'] = genres
-            
-        # Extract platforms
-        platforms = []
-        platform_keywords = {
-            'pc': 'PC', 'computer': 'PC',
-            'playstation': 'PlayStation', 'ps4': 'PlayStation', 'ps5': 'PlayStation',
-            'xbox': 'Xbox', 'switch': 'Switch', 'nintendo': 'Switch'
-        }
-        for keyword, platform in platform_keywords.items():
-            if keyword in user_input:
-                platforms.append(platform)
-        if platforms:
-            preferences['platforms'] = platforms
-            
-        # Extract playtime preference
-        if any(word in user_input for word in ['short', 'quick', 'brief']):
-            preferences['playtime'] = 'short'
-        elif any(word in user_input for word in ['long', 'lengthy', 'extended']):
-            preferences['playtime'] = 'long'
-        elif any(word in user_input for word in ['medium', 'moderate']):
-            preferences['playtime'] = 'medium'
-            
-        return preferences
+        return self.matcher.extract_preferences(user_input)
     
-    def get_game_recommendations(self, preferences: Dict = None, count: int = 3) -> List[Dict]:
-        """Get game recommendations based on user preferences"""
+    def get_game_recommendations(self, preferences: Dict = None, count: int = 3,
+                                 learned: Optional[Dict] = None) -> List[Dict]:
+        """
+        Get game recommendations based on user preferences. Learned
+        preferences fill the facets preferences leave open, and the games
+        that also match them come first
+        """
         if not preferences:
             preferences = {}
+        game_ids = []
+        if learned:
+            personalised = {**learned, **preferences}
+            game_ids = self._exact_matches(personalised, count)
+            preferences_only = len(game_ids) < count
+            if preferences_only:
+                FALLBACKS.inc('get_game_recommendations', 'learned_relaxed')
+        else:
+            personalised, preferences_only = preferences, True
             
-        recommended_games = []
-        
-        # Get all games from database
-        all_games = []
-        for genre, games in self.games_db.items():
-            for game in games:
-                game['genre'] = genre
-                all_games.append(game)
-        
-        # Filter based on preferences
-        filtered_games = all_games
-        
-        if 'genres' in preferences:
-            filtered_games = [game for game in filtered_games if game['genre'] in preferences['genres']]
-            
-        if 'platforms' in preferences:
-            filtered_games = [game for game in filtered_games 
-                            if any(platform in game['platform'] for platform in preferences['platforms'])]
-            
-        if 'playtime' in preferences:
-            filtered_games = [game for game in filtered_games if game['playtime'] == preferences['playtime']]
-        
-        # Sort by rating and select top recommendations
-        filtered_games.sort(key=lambda x: x['rating'], reverse=True)
+        # Exact matches first, from the rating-ordered posting lists; if there
+        # are too few, fill up with the closest matches by weighted score.
+        # Games matching the learned facets match preferences too
+        if preferences_only:
+            matches = self._exact_matches(preferences, count + len(game_ids))
+            game_ids += [game_id for game_id in matches if game_id not in game_ids][:count - len(game_ids)]
+        if len(game_ids) < count:
+            FALLBACKS.inc('get_game_recommendations', 'score_fill')
+            game_ids += self.scorer.top_k(personalised, count - len(game_ids), exclude=game_ids)
         
-        return filtered_games[:count] if filtered_games else random.sample(all_games, min(count, len(all_games)))
+        return [self.catalog[game_id] for game_id in game_ids]
+    
+    def _exact_matches(self, preferences: Dict, count: int) -> List[int]:
+        """index.top_k, with the games sharing most wanted features first among the best rated matches"""
+        features = preferences.get('features')
+        if not features:
+            return self.index.top_k(preferences, count)
+        wanted = set(features)
+        candidates = self.index.top_k(preferences, max(count, FEATURE_CANDIDATES))
+        # The sort is stable, so equally matching games stay in rating order
+        candidates.sort(key=lambda game_id: -len(wanted.intersection(self.catalog.features_of(game_id))))
+        return candidates[:count]
     
     def find_game_by_name(self, game_name: str) -> Optional[Dict]:
         """Find a specific game by name"""
-        game_name = game_name.lower()
-        for genre, games in self.games_db.items():
-            for game in games:
-                if game_name in game['name'].lower():
-                    game_copy = game.copy()
-                    game_copy['genre'] = genre
-                    return game_copy
-        return None
+        game_id = self.titles.best_match(game_name)
+        if game_id is None:
+            return None
+        return self.catalog[game_id].to_dict()
     
     def generate_response(self, user_input: str) -> str:
         """Generate appropriate response based on user input"""
-        intent = self.detect_intent(user_input)
+        self._use_live_catalog()
+        intent, preferences = self.matcher.analyze(user_input)
+        self.remember_preferences(preferences)
+        self.conversation_history.append(('user', user_input))
+        response = self.dispatch_intent(intent, preferences, user_input)
+        self.conversation_history.append(('bot', response))
+        return response
+    
+    def stream_response(self, user_input: str) -> Iterator[str]:
+        """Yield the response to user_input in chunks, one game block at a time"""
+        self._use_live_catalog()
+        intent, preferences = self.matcher.analyze(user_input)
+        self.remember_preferences(preferences)
         self.conversation_history.append(('user', user_input))
+        parts = []
+        try:
+            for chunk in self.stream_intent(intent, preferences, user_input):
+                parts.append(chunk)
+                yield chunk
+        finally:
+            # A client that disconnects early leaves the part it was sent
+            self.conversation_history.append(('bot', "".join(parts)))
+    
+    def stream_intent(self, intent: str, preferences: Dict, user_input: str) -> Iterator[str]:
+        """dispatch_intent as chunks; list answers stream per game, others come whole"""
+        if intent == 'recommendation':
+            return self.iter_recommendation(preferences)
+        if intent == 'platform_preference':
+            return self.iter_platform_preference(preferences)
+        if intent == 'genre_preference':
+            return self.iter_genre_preference(preferences)
+        return iter([self.dispatch_intent(intent, preferences, user_input)])
+    
+    async def generate_response_async(self, user_input: str, executor=None) -> str:
+        """
+        Awaitable generate_response that keeps the event loop free.
+        
+        The work runs on a ChatExecutor when one is given, otherwise on the
+        event loop's default thread pool.
+        """
+        if executor is not None:
+            return await executor.generate(self, user_input)
+        return await asyncio.get_running_loop().run_in_executor(None, self.generate_response, user_input)
+    
+    def generate_responses(self, messages: List[str]) -> List[str]:
+        """
+        Answer a batch of messages, in order, as if each were sent on its own.
+        
+        Every distinct message is analysed once, and answers that depend only
+        on the catalog are built once per group of messages sharing an intent
+        and the same lookup (title, genre, platform or preferences).
+        """
+        self._use_live_catalog()
+        analyses = {}
+        for message in messages:
+            if message not in analyses:
+                analyses[message] = self.matcher.analyze(message)
         
+        shared: Dict[Tuple, str] = {}
+        responses = []
+        for message in messages:
+            intent, preferences = analyses[message]
+            self.remember_preferences(preferences)
+            key = self._batch_key(intent, preferences, message)
+            if intent == 'recommendation':
+                # Recommendations also depend on what the user asked for before
+                key += tuple((name, tuple(value) if isinstance(value, list) else value)
+                             for name, value in learned_preferences(self.user_preferences).items())
+            response = shared.get(key) if key is not None else None
+            if response is None:
+                response = self.dispatch_intent(intent, preferences, message)
+                if key is not None:
+                    shared[key] = response
+            self.conversation_history.append(('user', message))
+            self.conversation_history.append(('bot', response))
+            responses.append(response)
+        return responses
+    
+    @staticmethod
+    def _batch_key(intent: str, preferences: Dict, message: str) -> Optional[Tuple]:
+        # Answers to these intents are a pure function of the key
+        if intent in ('game_info', 'review'):
+            return (intent, message)
+        if intent == 'genre_preference':
+            return (intent, preferences.get('genres', [None])[0])
+        if intent == 'platform_preference':
+            return (intent, preferences.get('platforms', [None])[0])
+        if intent == 'recommendation':
+            return (intent, tuple(preferences.get('genres', ())), tuple(preferences.get('platforms', ())),
+                    preferences.get('playtime'), tuple(preferences.get('features', ())))
+        return None
+    
+    def _use_live_catalog(self):
+        # Only switched between messages, so one answer never mixes two catalogs
+        if self.catalog_manager is not None:
+            self.shared_catalog = self.catalog_manager.current
+    
+    def remember_preferences(self, preferences: Dict):
+        """Add the genres, platforms and playtime a message mentioned to user_preferences"""
+        changed = merge_preferences(self.user_preferences, preferences)
+        changed = learn_preferences(self.user_preferences, preferences) or changed
+        if changed and self.on_preferences_changed is not None:
+            self.on_preferences_changed(self.user_preferences)
+    
+    def dispatch_intent(self, intent: str, preferences: Dict, user_input: str) -> str:
+        """Route an analysed message to the handler for its intent"""
+        start = time.perf_counter()
         if intent == 'greeting':
             response = self.handle_greeting()
             
         elif intent == 'recommendation':
-            preferences = self.extract_game_preferences(user_input)
             response = self.handle_recommendation(preferences)
             
         elif intent == 'game_info':
             response = self.handle_game_info(user_input)
             
+        elif intent == 'similar':
+            response = self.handle_similar(user_input)
+            
         elif intent == 'platform_preference':
-            preferences = self.extract_game_preferences(user_input)
             response = self.handle_platform_preference(preferences)
             
         elif intent == 'genre_preference':
-            preferences = self.extract_game_preferences(user_input)
             response = self.handle_genre_preference(preferences)
             
         elif intent == 'tips':
@@ -344,7 +465,8 @@ class GameChatbot:
         else:
             response = self.handle_general_chat(user_input)
         
-        self.conversation_history.append(('bot', response))
+        HANDLER_SECONDS.observe(time.perf_counter() - start, intent,
+                                INTENT_HANDLERS.get(intent, 'handle_general_chat'))
         return response
     
     def handle_greeting(self) -> str:
@@ -358,84 +480,87 @@ class GameChatbot:
     
     def handle_recommendation(self, preferences: Dict) -> str:
         """Handle game recommendation requests"""
-        recommendations = self.get_game_recommendations(preferences)
+        return "".join(self.iter_recommendation(preferences))
+    
+    def iter_recommendation(self, preferences: Dict) -> Iterator[str]:
+        """handle_recommendation as chunks, ranked by the preferences learned so far"""
+        recommendations = self.get_game_recommendations(preferences, learned=learned_preferences(self.user_preferences))
         
         if not recommendations:
-            return "I couldn't find games matching your exact preferences, but let me suggest some popular games across different genres!"
+            FALLBACKS.inc('handle_recommendation', 'no_games')
+            yield "I couldn't find games matching your exact preferences, but let me suggest some popular games across different genres!"
+            return
         
-        response = "🎮 **Game Recommendations for You:**\n\n"
-        
-        for i, game in enumerate(recommendations, 1):
-            response += f"{i}. **{game['name']}** ({game['year']})\n"
-            response += f"   📱 Platforms: {', '.join(game['platform'])}\n"
-            response += f"   ⭐ Rating: {game['rating']}/10\n"
-            response += f"   🎭 Genre: {game['genre'].title()}\n"
-            response += f"   ⏱️ Playtime: {game['playtime'].title()}\n"
-            response += f"   📝 {game['description']}\n\n"
-        
-        response += "Would you like more details about any of these games or different recommendations? 🎮"
-        return response
+        yield from iter_recommendations(recommendations)
     
     def handle_game_info(self, user_input: str) -> str:
         """Handle requests for specific game information"""
-        # Try to extract game name from the input
-        words = user_input.split()
-        potential_game_names = []
+        # Look the title up in the fuzzy title index
+        game_id = self.titles.best_match(user_input)
         
-        # Look for game names in the input
-        for genre, games in self.games_db.items():
-            for game in games:
-                game_words = game['name'].lower().split()
-                if any(word in user_input.lower() for word in game_words):
-                    potential_game_names.append((game, genre))
-        
-        if potential_game_names:
-            game, genre = potential_game_names[0]  # Take the first match
-            response = f"🎮 **{game['name']}** ({game['year']})\n\n"
-            response += f"📱 **Platforms:** {', '.join(game['platform'])}\n"
-            response += f"⭐ **Rating:** {game['rating']}/10\n"
-            response += f"🎭 **Genre:** {genre.title()}\n"
-            response += f"⏱️ **Playtime:** {game['playtime'].title()}\n"
-            response += f"🏷️ **Features:** {', '.join(game['features'])}\n\n"
-            response += f"📝 **Description:** {game['description']}\n\n"
-            response += "Would you like recommendations for similar games? 🎮"
-            return response
+        if game_id is not None:
+            self._set_context(game_id)
+            return self.renderer.game_info(game_id)
         else:
+            FALLBACKS.inc('handle_game_info', 'title_miss')
             return "I'd love to help you learn about a specific game! Could you tell me which game you're interested in? I have information about many popular titles across different genres! 🎮"
     
+    def handle_similar(self, user_input: str) -> str:
+        """Handle "games similar to X", defaulting to the game last talked about"""
+        game_id = self.titles.best_match(user_input)
+        if game_id is None and self.current_context:
+            FALLBACKS.inc('handle_similar', 'previous_game')
+            game_id = self._context_game()
+        
+        if game_id is not None:
+            self._set_context(game_id)
+            return self.renderer.similar(game_id, self.shared_catalog.similar)
+        FALLBACKS.inc('handle_similar', 'title_miss')
+        return "Which game should I find similar titles for? Tell me one you loved, like \"games similar to Portal 2\"! 🎮"
+    
+    def _set_context(self, game_id: int):
+        self.current_context = {'game_id': game_id, 'name': self.catalog.names[game_id]}
+    
+    def _context_game(self) -> Optional[int]:
+        """Id of the game last talked about, looked up again if the catalog changed since"""
+        game_id, name = self.current_context['game_id'], self.current_context['name']
+        if game_id < len(self.catalog) and self.catalog.names[game_id] == name:
+            return game_id
+        return self.titles.best_match(name)
+    
     def handle_platform_preference(self, preferences: Dict) -> str:
         """Handle platform-specific requests"""
+        return "".join(self.iter_platform_preference(preferences))
+    
+    def iter_platform_preference(self, preferences: Dict) -> Iterator[str]:
+        """handle_platform_preference as chunks"""
         if 'platforms' in preferences:
             platform = preferences['platforms'][0]
-            games = self.get_game_recommendations({'platforms': [platform]}, count=5)
-            
-            response = f"🎮 **Great {platform} Games:**\n\n"
-            for i, game in enumerate(games, 1):
-                response += f"{i}. **{game['name']}** - {game['description'][:50]}... (Rating: {game['rating']}/10)\n"
-            
-            response += f"\n{platform} is an excellent gaming platform! Would you like detailed info about any of these games? 🎮"
-            return response
+            chunks = self.renderer.stream_platform(platform)
+            if chunks is None:
+                # No game runs on it; suggest the closest matches instead
+                FALLBACKS.inc('handle_platform_preference', 'no_games_on_platform')
+                chunks = iter_platform(platform, self.get_game_recommendations({'platforms': [platform]}, count=5))
+            yield from chunks
         else:
-            return "Which gaming platform are you interested in? I can recommend games for PC, PlayStation, Xbox, Nintendo Switch, and mobile! 🎮"
+            FALLBACKS.inc('handle_platform_preference', 'no_platform')
+            yield "Which gaming platform are you interested in? I can recommend games for PC, PlayStation, Xbox, Nintendo Switch, and mobile! 🎮"
     
     def handle_genre_preference(self, preferences: Dict) -> str:
         """Handle genre-specific requests"""
+        return "".join(self.iter_genre_preference(preferences))
+    
+    def iter_genre_preference(self, preferences: Dict) -> Iterator[str]:
+        """handle_genre_preference as chunks"""
         if 'genres' in preferences:
-            genre = preferences['genres'][0]
-            if genre in self.games_db:
-                games = self.games_db[genre]
-                response = f"🎮 **{genre.title()} Games You'll Love:**\n\n"
-                
-                for i, game in enumerate(games, 1):
-                    response += f"{i}. **{game['name']}** ({game['year']})\n"
-                    response += f"   ⭐ Rating: {game['rating']}/10\n"
-                    response += f"   📝 {game['description']}\n\n"
-                
-                response += f"{genre.title()} games offer amazing experiences! Want to know more about any specific game? 🎮"
-                return response
+            chunks = self.renderer.stream_genre(preferences['genres'][0])
+            if chunks is not None:
+                yield from chunks
+                return
         
-        available_genres = list(self.games_db.keys())
-        return f"I can help you explore different game genres! Available genres: {', '.join(g.title() for g in available_genres)}. Which one interests you? 🎮"
+        FALLBACKS.inc('handle_genre_preference', 'no_genre')
+        available_genres = list(self.catalog.genres)
+        yield f"I can help you explore different game genres! Available genres: {', '.join(g.title() for g in available_genres)}. Which one interests you? 🎮"
     
     def handle_tips(self) -> str:
         """Handle gaming tips requests"""
@@ -453,27 +578,12 @@ class GameChatbot:
     
     def handle_review(self, user_input: str) -> str:
         """Handle game review requests"""
-        game = self.find_game_by_name(user_input)
-        if game:
-            response = f"🎮 **{game['name']} Review:**\n\n"
-            response += f"⭐ **Overall Rating:** {game['rating']}/10\n\n"
-            
-            if game['rating'] >= 9.0:
-                response += "🏆 **Verdict:** Masterpiece! This game is absolutely phenomenal and a must-play for any gamer.\n"
-            elif game['rating'] >= 8.0:
-                response += "👍 **Verdict:** Excellent game! Highly recommended with great gameplay and features.\n"
-            elif game['rating'] >= 7.0:
-                response += "✅ **Verdict:** Good game worth playing, with some minor flaws but overall enjoyable.\n"
-            else:
-                response += "⚠️ **Verdict:** Average game. Might be worth trying if you're interested in the genre.\n"
-            
-            response += f"\n📝 **Description:** {game['description']}\n"
-            response += f"🎭 **Genre:** {game['genre'].title()}\n"
-            response += f"📱 **Platforms:** {', '.join(game['platform'])}\n\n"
-            response += "Would you like recommendations for similar games? 🎮"
-            return response
-        else:
-            return "Which game would you like me to review? I can share ratings, opinions, and detailed information about many popular games! 🎮"
+        game_id = self.titles.best_match(user_input)
+        if game_id is not None:
+            self._set_context(game_id)
+            return self.renderer.review(game_id)
+        FALLBACKS.inc('handle_review', 'title_miss')
+        return "Which game would you like me to review? I can share ratings, opinions, and detailed information about many popular games! 🎮"
     
     def handle_goodbye(self) -> str:
         """Handle goodbye messages"""
@@ -500,8 +610,29 @@ class GameChatbot:
         if not self.conversation_history:
             return "No conversation yet!"
         
-        total_messages = len(self.conversation_history)
-        user_messages = len([msg for msg in self.conversation_history if msg[0] == 'user'])
-        bot_messages = len([msg for msg in self.conversation_history if msg[0] == 'bot'])
+        total_messages = self.conversation_history.total
+        user_messages = self.conversation_history.count('user')
+        bot_messages = self.conversation_history.count('bot')
         
         return f"Conversation Summary: {total_messages} total messages ({user_messages} from user, {bot_messages} from bot)"
+    
+    def state_size(self) -> int:
+        """Approximate bytes of per-user state, not counting the shared catalog"""
+        history = self.conversation_history
+        return (sys.getsizeof(self) + sys.getsizeof(history)
+                + _deep_size((self.user_preferences, history.messages, history.counts, self.current_context)))
+
+
+def _deep_size(value, seen: Optional[set] = None) -> int:
+    """sys.getsizeof of value plus the containers and strings it holds"""
+    if seen is None:
+        seen = set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_deep_size(key, seen) + _deep_size(item, seen) for key, item in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset, deque)):
+        size += sum(_deep_size(item, seen) for item in value)
+    return size
@@ -0,0 +1,222 @@
+"""
+Facet index over a GameCatalog.
+
+Posting lists are kept per genre, platform and playtime, each already ordered
+by rating (highest first, ties in catalog order), so a recommendation query
+walks the smallest matching posting list, checks the other facets against the
+catalog columns and stops as soon as it has enough results.
+
+Single games can be inserted and removed in place, binary searching their
+position in each posting list, so a small catalog change does not require a
+rebuild.
+"""
+
+import bisect
+import heapq
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from game_catalog import GameCatalog
+
+
+class CatalogIndex:
+    """Rating-ordered posting lists for the genre, platform and playtime facets"""
+
+    def __init__(self, catalog: GameCatalog):
+        self.catalog = catalog
+        self.rank_order = array('I')
+        self.rank = array('I')
+        self.by_genre: Dict[int, array] = {}
+        self.by_platform: Dict[int, array] = {}
+        self.by_playtime: Dict[int, array] = {}
+        # Position in rank_order from which rank is out of date, see insert()
+        self._stale_from: Optional[int] = None
+        self.rebuild()
+
+    @classmethod
+    def from_postings(cls, catalog: GameCatalog, rank_order: Sequence[int], rank: Sequence[int],
+                      by_genre: Dict[int, Sequence[int]], by_platform: Dict[int, Sequence[int]],
+                      by_playtime: Dict[int, Sequence[int]]) -> 'CatalogIndex':
+        """Wrap posting lists that were built earlier, e.g. loaded from a snapshot"""
+        index = cls.__new__(cls)
+        index.catalog = catalog
+        index.rank_order, index.rank = rank_order, rank
+        index.by_genre, index.by_platform, index.by_playtime = by_genre, by_platform, by_playtime
+        index._stale_from = None
+        return index
+
+    def rebuild(self):
+        """Recompute every posting list from the catalog columns"""
+        catalog = self.catalog
+        ratings = catalog.ratings
+        # sorted() is stable, so equal ratings keep catalog order exactly like
+        # the list.sort(reverse=True) this index replaces
+        order = sorted(range(len(catalog)), key=lambda game_id: -ratings[game_id])
+        self.rank_order = array('I', order)
+        self.rank = array('I', bytes(4 * len(order)))
+        for position, game_id in enumerate(order):
+            self.rank[game_id] = position
+
+        by_genre: Dict[int, array] = {}
+        by_platform: Dict[int, array] = {}
+        by_playtime: Dict[int, array] = {}
+        platform_bits = [(code, 1 << code) for code in range(len(catalog.platforms))]
+        for game_id in order:
+            by_genre.setdefault(catalog.genre_codes[game_id], array('I')).append(game_id)
+            by_playtime.setdefault(catalog.playtime_codes[game_id], array('I')).append(game_id)
+            mask = catalog.platform_masks[game_id]
+            for code, bit in platform_bits:
+                if mask & bit:
+                    by_platform.setdefault(code, array('I')).append(game_id)
+        self.by_genre, self.by_platform, self.by_playtime = by_genre, by_platform, by_playtime
+
+    def copy(self, catalog: GameCatalog) -> 'CatalogIndex':
+        """Mutable copy of the posting lists, over a copy of the catalog they index"""
+        def copied(postings: Dict[int, Sequence[int]]) -> Dict[int, array]:
+            return {code: array('I', posting) for code, posting in postings.items()}
+        return CatalogIndex.from_postings(catalog, array('I', self.rank_order), array('I', self.rank),
+                                          copied(self.by_genre), copied(self.by_platform), copied(self.by_playtime))
+
+    def insert(self, game_id: int):
+        """
+        Add a game to the posting lists, reading its facets from the catalog.
+        After a series of inserts and removals, refresh_ranks() brings the
+        rank table up to date in one pass
+        """
+        position = self._position(self.rank_order, game_id)
+        self.rank_order.insert(position, game_id)
+        if game_id == len(self.rank):
+            self.rank.append(0)
+        self._mark_stale(position)
+        for postings, code in self._facets(game_id):
+            posting = postings.setdefault(code, array('I'))
+            posting.insert(self._position(posting, game_id), game_id)
+
+    def remove(self, game_id: int):
+        """
+        Take a game out of the posting lists; call before the catalog row
+        changes. Removing the last game id also releases its rank slot
+        """
+        position = self._position(self.rank_order, game_id)
+        del self.rank_order[position]
+        self._mark_stale(position)
+        if game_id == len(self.rank) - 1:
+            del self.rank[game_id]
+        for postings, code in self._facets(game_id):
+            posting = postings[code]
+            del posting[self._position(posting, game_id)]
+            if not posting:
+                del postings[code]
+
+    def _position(self, posting: Sequence[int], game_id: int) -> int:
+        # Posting lists are ordered by rating, highest first, then by id
+        ratings = self.catalog.ratings
+        return bisect.bisect_left(posting, (-ratings[game_id], game_id),
+                                  key=lambda other: (-ratings[other], other))
+
+    def refresh_ranks(self):
+        """Renumber the ranks shifted by insert() and remove()"""
+        if self._stale_from is None:
+            return
+        rank, rank_order = self.rank, self.rank_order
+        for position in range(self._stale_from, len(rank_order)):
+            rank[rank_order[position]] = position
+        self._stale_from = None
+
+    def _mark_stale(self, position: int):
+        if self._stale_from is None or position < self._stale_from:
+            self._stale_from = position
+
+    def _facets(self, game_id: int):
+        catalog = self.catalog
+        yield self.by_genre, catalog.genre_codes[game_id]
+        yield self.by_playtime, catalog.playtime_codes[game_id]
+        mask = catalog.platform_masks[game_id]
+        for code in range(mask.bit_length()):
+            if mask >> code & 1:
+                yield self.by_platform, code
+
+    def search(self, genres: Optional[Iterable[str]] = None, platforms: Optional[Iterable[str]] = None,
+               playtime: Optional[str] = None, after: Optional[Tuple[float, int]] = None) -> Iterator[int]:
+        """
+        Yield ids of games matching every given facet, best rated first.
+
+        A game matches when its genre is one of genres, it runs on any of
+        platforms and its playtime equals playtime; a facet left as None is
+        not filtered on. With after, a (rating, game id) pair, the scan starts
+        behind that position in the ordering, found by binary search, so a
+        listing can be paged through without walking the earlier pages again.
+        """
+        catalog = self.catalog
+        facets = []
+
+        if genres is not None:
+            genre_codes = _codes(catalog.genres, genres)
+            facets.append(('genre', genre_codes, [self.by_genre[c] for c in genre_codes if c in self.by_genre]))
+        if platforms is not None:
+            platform_codes = _codes(catalog.platforms, platforms)
+            facets.append(('platform', platform_codes,
+                           [self.by_platform[c] for c in platform_codes if c in self.by_platform]))
+        if playtime is not None:
+            playtime_codes = _codes(catalog.playtimes, [playtime])
+            facets.append(('playtime', playtime_codes,
+                           [self.by_playtime[c] for c in playtime_codes if c in self.by_playtime]))
+
+        if not facets:
+            yield from self._tail(self.rank_order, after)
+            return
+        if any(not postings for _, _, postings in facets):
+            return
+
+        # Drive the scan from the smallest facet and verify the others per game
+        facets.sort(key=lambda facet: sum(len(posting) for posting in facet[2]))
+        _, _, driver = facets[0]
+        checks = facets[1:]
+        genre_codes = next((codes for name, codes, _ in checks if name == 'genre'), None)
+        platform_mask = next((sum(1 << c for c in codes) for name, codes, _ in checks if name == 'platform'), None)
+        playtime_codes = next((codes for name, codes, _ in checks if name == 'playtime'), None)
+
+        if len(driver) == 1:
+            candidates: Iterable[int] = self._tail(driver[0], after)
+        else:
+            self.refresh_ranks()
+            candidates = heapq.merge(*(self._tail(posting, after) for posting in driver), key=self.rank.__getitem__)
+
+        previous = None
+        for game_id in candidates:
+            # A game can sit in several platform postings; merged duplicates are adjacent
+            if game_id == previous:
+                continue
+            previous = game_id
+            if genre_codes is not None and catalog.genre_codes[game_id] not in genre_codes:
+                continue
+            if platform_mask is not None and not catalog.platform_masks[game_id] & platform_mask:
+                continue
+            if playtime_codes is not None and catalog.playtime_codes[game_id] not in playtime_codes:
+                continue
+            yield game_id
+
+    def _tail(self, posting: Sequence[int], after: Optional[Tuple[float, int]]) -> Iterable[int]:
+        """The part of a posting list ordered behind after, without copying it"""
+        if after is None:
+            return posting
+        ratings = self.catalog.ratings
+        rating, game_id = after
+        start = bisect.bisect_right(posting, (-rating, game_id), key=lambda other: (-ratings[other], other))
+        return map(posting.__getitem__, range(start, len(posting)))
+
+    def top_k(self, preferences: Dict, count: int) -> List[int]:
+        """Return up to count game ids matching a preferences dict, best rated first"""
+        if count <= 0:
+            return []
+        matches = self.search(preferences.get('genres'), preferences.get('platforms'), preferences.get('playtime'))
+        results = []
+        for game_id in matches:
+            results.append(game_id)
+            if len(results) == count:
+                break
+        return results
+
+
+def _codes(vocabulary, values: Iterable[str]) -> frozenset:
+    return frozenset(code for code in map(vocabulary.code, values) if code is not None)
@@ -0,0 +1,170 @@
+"""
+Graded recommendation scoring.
+
+Instead of keeping only the games that match every stated preference, each
+game gets a weighted score from its rating and how closely its genre,
+platforms, playtime and features match, and the best k are returned. With
+NumPy installed the whole catalog is scored in one vectorized pass and the
+top k picked with argpartition; without it the same formula runs as a
+Python loop.
+"""
+
+import heapq
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from game_catalog import GameCatalog
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; scoring falls back to pure Python
+    np = None
+
+
+class ScoreWeights(NamedTuple):
+    """Weight of each component; every component is scaled to 0..1 first"""
+    rating: float = 1.0
+    genre: float = 1.0
+    platform: float = 0.75
+    playtime: float = 0.5
+    features: float = 0.5
+
+
+class ScoringEngine:
+    """Scores every game of a catalog against a preferences dict"""
+
+    def __init__(self, catalog: GameCatalog, weights: ScoreWeights = ScoreWeights(),
+                 use_numpy: Optional[bool] = None):
+        if use_numpy and np is None:
+            raise ImportError("NumPy is not installed")
+        self.catalog = catalog
+        self.weights = weights
+        self.use_numpy = np is not None if use_numpy is None else use_numpy
+        self.version = -1
+        self._columns: Dict[str, object] = {}
+
+    def top_k(self, preferences: Dict, count: int, exclude: Iterable[int] = ()) -> List[int]:
+        """Ids of the count best scoring games, best first, ties in catalog order"""
+        excluded = set(exclude)
+        if count <= 0 or len(self.catalog) <= len(excluded):
+            return []
+        if self.use_numpy:
+            return self._top_k_numpy(preferences, count, excluded)
+        return self._top_k_python(preferences, count, excluded)
+
+    def scores(self, preferences: Dict):
+        """Score of every game, as a NumPy array or a list without NumPy"""
+        if self.use_numpy:
+            return self._scores_numpy(preferences)
+        wanted = self._wanted(preferences)
+        return [self._score(game_id, wanted) for game_id in range(len(self.catalog))]
+
+    def _wanted(self, preferences: Dict):
+        catalog = self.catalog
+        genres = {code for code in map(catalog.genres.code, preferences.get('genres') or ()) if code is not None}
+        platforms = list(preferences.get('platforms') or ())
+        platform_mask = catalog.platform_mask(platforms)
+        playtime = preferences.get('playtime')
+        playtime_code = catalog.playtimes.code(playtime) if playtime else None
+        features = list(preferences.get('features') or ())
+        feature_codes = {code for code in map(catalog.features.code, features) if code is not None}
+        return genres, platform_mask, len(platforms), playtime_code, feature_codes, len(features)
+
+    # --- NumPy path ---
+
+    def _refresh(self):
+        # Mutable catalogs are copied and re-copied when they change; snapshot
+        # columns are memory-mapped and wrapped without copying
+        catalog = self.catalog
+        if self.version == catalog.version and self._columns:
+            return
+        columns = {}
+        for name in ('ratings', 'genre_codes', 'playtime_codes', 'platform_masks', 'feature_offsets', 'feature_ids'):
+            column = getattr(catalog, name)
+            if isinstance(column, array):
+                columns[name] = np.array(column)
+            else:
+                columns[name] = np.frombuffer(column, dtype=column.format)
+        # Game id of every feature_ids entry, for counting matches per game
+        offsets = columns['feature_offsets']
+        columns['feature_owner'] = np.repeat(np.arange(len(offsets) - 1, dtype=np.int64), np.diff(offsets))
+        self._columns = columns
+        self.version = catalog.version
+
+    def _scores_numpy(self, preferences: Dict):
+        self._refresh()
+        columns = self._columns
+        weights = self.weights
+        genres, platform_mask, platform_count, playtime_code, feature_codes, feature_count = self._wanted(preferences)
+
+        score = columns['ratings'] * (weights.rating / 10.0)
+        if genres:
+            # Lookup tables indexed by code beat np.isin on these small vocabularies
+            score += _lookup(genres, len(self.catalog.genres), weights.genre)[columns['genre_codes']]
+        if platform_count:
+            masks = columns['platform_masks']
+            matched = np.zeros(len(masks), dtype=np.float64)
+            bit = 0
+            while platform_mask >> bit:
+                if platform_mask >> bit & 1:
+                    matched += (masks >> bit) & 1
+                bit += 1
+            score += matched * (weights.platform / platform_count)
+        if playtime_code is not None:
+            distance = np.abs(columns['playtime_codes'].astype(np.int8) - playtime_code)
+            score += (1.0 - distance / 2.0) * weights.playtime
+        if feature_count:
+            hits = _lookup(feature_codes, len(self.catalog.features), True)[columns['feature_ids']]
+            matched = np.bincount(columns['feature_owner'][hits], minlength=len(score))
+            score += matched * (weights.features / feature_count)
+        return score
+
+    def _top_k_numpy(self, preferences: Dict, count: int, excluded: set) -> List[int]:
+        score = self._scores_numpy(preferences)
+        if excluded:
+            score[list(excluded)] = -np.inf
+        count = min(count, len(score) - len(excluded))
+        if count < len(score):
+            candidates = np.argpartition(-score, count - 1)[:count]
+            # argpartition may cut a tie arbitrarily; widen to every game tied
+            # with the last place so ties resolve in catalog order
+            threshold = score[candidates].min()
+            candidates = np.flatnonzero(score >= threshold)
+        else:
+            candidates = np.arange(len(score))
+        order = np.lexsort((candidates, -score[candidates]))
+        return candidates[order[:count]].tolist()
+
+    # --- Pure Python path ---
+
+    def _score(self, game_id: int, wanted) -> float:
+        catalog = self.catalog
+        weights = self.weights
+        genres, platform_mask, platform_count, playtime_code, feature_codes, feature_count = wanted
+
+        score = catalog.ratings[game_id] * (weights.rating / 10.0)
+        if genres and catalog.genre_codes[game_id] in genres:
+            score += weights.genre
+        if platform_count:
+            matched = bin(catalog.platform_masks[game_id] & platform_mask).count('1')
+            score += matched * (weights.platform / platform_count)
+        if playtime_code is not None:
+            score += (1.0 - abs(catalog.playtime_codes[game_id] - playtime_code) / 2.0) * weights.playtime
+        if feature_count:
+            start, end = catalog.feature_offsets[game_id], catalog.feature_offsets[game_id + 1]
+            matched = sum(1 for code in catalog.feature_ids[start:end] if code in feature_codes)
+            score += matched * (weights.features / feature_count)
+        return score
+
+    def _top_k_python(self, preferences: Dict, count: int, excluded: set) -> List[int]:
+        wanted = self._wanted(preferences)
+        scored = ((self._score(game_id, wanted), -game_id) for game_id in range(len(self.catalog))
+                  if game_id not in excluded)
+        return [-negated for _, negated in heapq.nlargest(count, scored)]
+
+
+def _lookup(codes: set, size: int, value):
+    """Table indexed by code holding value at codes and zero elsewhere"""
+    table = np.zeros(size, dtype=type(value))
+    table[list(codes)] = value
+    return table
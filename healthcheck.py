@@ -0,0 +1,54 @@
+"""
+Container health probe: asks the running API whether it is ready.
+
+Meant for ``python -S healthcheck.py``: it imports nothing but socket, so a
+probe costs a few milliseconds and no catalog is built. The API's /ready
+answers from in-process state, 200 once the catalog is built and 503 while
+it is warming up.
+
+The URL comes from the command line or GAME_HEALTH_URL, and defaults to
+the API's /ready on the image's port. Setting GAME_HEALTH_URL to an empty
+string turns the probe off, for containers that run the interactive demo
+and have no server to ask.
+
+Usage: python -S healthcheck.py [URL]
+"""
+
+import os
+import socket
+import sys
+
+TIMEOUT = 2.0
+DEFAULT_URL = 'http://127.0.0.1:8080/ready'
+
+
+def probe(url: str) -> str:
+    """Empty string if url answers 200, else why not"""
+    if not url.startswith('http://'):
+        return f"only http:// URLs can be probed, not {url!r}"
+    address, _, path = url[len('http://'):].partition('/')
+    host, _, port = address.partition(':')
+    try:
+        with socket.create_connection((host, int(port or 80)), timeout=TIMEOUT) as connection:
+            connection.sendall(f"GET /{path} HTTP/1.0\r\nHost: {address}\r\n\r\n".encode('ascii'))
+            status_line = connection.makefile('rb').readline().decode('latin-1').strip()
+    except (OSError, ValueError) as error:
+        return f"{url}: {error}"
+    if status_line.split(' ')[1:2] != ['200']:
+        return f"{url}: {status_line or 'no response'}"
+    return ''
+
+
+def main(argv) -> int:
+    url = argv[1] if len(argv) > 1 else os.environ.get('GAME_HEALTH_URL', DEFAULT_URL)
+    if not url:
+        return 0
+    problem = probe(url)
+    if problem:
+        print(f"unhealthy: {problem}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
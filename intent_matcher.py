@@ -0,0 +1,214 @@
+"""
+Single-pass intent and preference matching.
+
+Every keyword the chatbot reacts to is compiled into one regular expression,
+shaped like a prefix trie and anchored on word boundaries. A message is scanned once and the matches are sorted
+into the detected intent plus the genres, platforms, playtime and features it mentions.
+
+Keywords match whole words or phrases, so "hi" no longer fires inside "this".
+A keyword ending in ``*`` is a stem and also matches longer words, e.g.
+``recommend*`` matches "recommended" and "recommendations".
+
+Most traffic repeats a few phrasings, so analyses are kept in an LRU cache
+keyed by the normalized message: lowercased, with punctuation that no
+keyword contains turned into spaces and runs of whitespace collapsed. A
+matcher is rebuilt whenever its keywords or the catalog's genres change,
+and a new matcher starts with an empty cache.
+"""
+
+import re
+import string
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+from bounded_cache import LRUCache
+
+# Checked in priority order: the first intent with a matching keyword wins
+INTENT_KEYWORDS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ('similar', ('similar', 'games like', 'more like', 'alike')),
+    ('recommendation', ('recommend*', 'suggestion*', 'should i play', 'what game*', 'good games')),
+    ('game_info', ('tell me about', 'what is', 'information about', 'detail*')),
+    ('platform_preference', ('platform*', 'console*', 'pc', 'playstation', 'xbox', 'switch')),
+    ('genre_preference', ('genre*',)),  # plus every catalog genre, see IntentMatcher
+    ('tips', ('tip', 'tips', 'advice', 'help', 'how to', 'guide*')),
+    ('facts', ('fact', 'facts', 'interesting', 'did you know', 'trivia')),
+    ('review', ('review*', 'opinion*', 'rating*', 'worth playing')),
+    ('greeting', ('hello', 'hi', 'hey', 'greetings')),
+    ('goodbye', ('bye', 'goodbye', 'exit', 'quit')),
+)
+
+PLATFORM_KEYWORDS: Dict[str, str] = {
+    'pc': 'PC', 'computer': 'PC',
+    'playstation': 'PlayStation', 'ps4': 'PlayStation', 'ps5': 'PlayStation',
+    'xbox': 'Xbox', 'switch': 'Switch', 'nintendo': 'Switch'
+}
+
+# Checked in priority order, like INTENT_KEYWORDS
+PLAYTIME_KEYWORDS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ('short', ('short', 'quick', 'brief')),
+    ('long', ('long', 'lengthy', 'extended')),
+    ('medium', ('medium', 'moderate')),
+)
+
+
+DEFAULT_CACHE_SIZE = 4096
+MAX_CACHED_CHARS = 200  # longer messages are rarely repeated and are analysed without the cache
+
+
+class MessageAnalysis(NamedTuple):
+    """Intent and extracted preferences for one message"""
+    intent: str
+    preferences: Dict
+
+
+class IntentMatcher:
+    """
+    Compiled keyword matcher for intents, genres, platforms, playtime and
+    features.
+
+    Genre and feature keywords come from the catalog, so a matcher should be
+    rebuilt when the set of genres or features changes. A feature matches
+    hyphenated or with spaces ("open-world", "open world"); features named
+    like a genre are left to the genre.
+    """
+
+    def __init__(self, genres: Iterable[str], features: Iterable[str] = (),
+                 intent_keywords: Sequence[Tuple[str, Sequence[str]]] = INTENT_KEYWORDS,
+                 platform_keywords: Dict[str, str] = PLATFORM_KEYWORDS,
+                 playtime_keywords: Sequence[Tuple[str, Sequence[str]]] = PLAYTIME_KEYWORDS,
+                 cache_size: int = DEFAULT_CACHE_SIZE):
+        self.genres = list(genres)
+        self.features = [feature for feature in features if feature not in self.genres]
+        self.intents = [intent for intent, _ in intent_keywords]
+        self.platforms = list(platform_keywords.values())
+        self.playtimes = [playtime for playtime, _ in playtime_keywords]
+
+        # keyword -> list of (kind, position) tags; one keyword can feed
+        # several results, e.g. "switch" is both an intent and a platform
+        tags: Dict[str, List[Tuple[str, int]]] = {}
+        genre_intent = self.intents.index('genre_preference') if 'genre_preference' in self.intents else None
+        for position, (_, keywords) in enumerate(intent_keywords):
+            for keyword in keywords:
+                tags.setdefault(keyword, []).append(('intent', position))
+        for position, genre in enumerate(self.genres):
+            for keyword in (genre, genre + 's'):
+                tags.setdefault(keyword, []).append(('genre', position))
+                if genre_intent is not None:
+                    tags[keyword].append(('intent', genre_intent))
+        for position, keyword in enumerate(platform_keywords):
+            tags.setdefault(keyword, []).append(('platform', position))
+        for position, (_, keywords) in enumerate(playtime_keywords):
+            for keyword in keywords:
+                tags.setdefault(keyword, []).append(('playtime', position))
+        for position, feature in enumerate(self.features):
+            for keyword in {feature, feature + 's', feature.replace('-', ' '), feature.replace('-', ' ') + 's'}:
+                tags.setdefault(keyword, []).append(('feature', position))
+
+        # The keywords are laid out as a prefix trie, so at each word start the
+        # regex engine rejects most branches after a single character
+        keywords = sorted(tags)
+        self._tags = [tags[keyword] for keyword in keywords]
+        trie: Dict = {}
+        for group, keyword in enumerate(keywords):
+            node = trie
+            for char in keyword.rstrip('*').lower():
+                node = node.setdefault(char, {})
+            node[_STEM if keyword.endswith('*') else _END] = group
+        self.pattern = re.compile(rf'(?<!\w){_trie_pattern(trie)}(?!\w)')
+
+        # Punctuation other than _ is not a word character, so as a space it
+        # still ends keywords; only punctuation inside keywords is kept
+        keyword_chars = set(''.join(keyword.rstrip('*').lower() for keyword in keywords))
+        self._punctuation = {ord(char): ' ' for char in string.punctuation if char not in keyword_chars | {'_'}}
+        self.cache: LRUCache[MessageAnalysis] = LRUCache(cache_size)
+        # Per message, while the cache counts lookups (up to two a message);
+        # not locked, so threads may lose the odd increment
+        self.hits = 0
+        self.misses = 0
+
+    def normalize(self, user_input: str) -> str:
+        """
+        The message as it is analysed and cached. The only difference this
+        makes to the analysis is that a phrase such as "games like" now
+        also matches across punctuation
+        """
+        return ' '.join(user_input.lower().translate(self._punctuation).split())
+
+    def analyze(self, user_input: str) -> MessageAnalysis:
+        """Detect the intent of a message and extract its preferences in one pass"""
+        if len(user_input) > MAX_CACHED_CHARS:
+            return self._analyze(self.normalize(user_input))
+        # Repeats of the exact message skip normalizing; a normalized message
+        # is its own normal form, so both kinds of key share one cache
+        analysis = self.cache.get(user_input)
+        if analysis is None:
+            message = self.normalize(user_input)
+            analysis = self.cache.get(message) if message != user_input else None
+            if analysis is None:
+                self.misses += 1
+                analysis = self._analyze(message)
+                self.cache.put(message, analysis)
+            else:
+                self.hits += 1
+            if message != user_input:
+                self.cache.put(user_input, analysis)
+        else:
+            self.hits += 1
+        # Callers get their own preferences to change
+        intent, preferences = analysis
+        return MessageAnalysis(intent, {key: list(value) if isinstance(value, list) else value
+                                        for key, value in preferences.items()})
+
+    def _analyze(self, message: str) -> MessageAnalysis:
+        intent = playtime = None
+        genres, platforms, features = set(), set(), set()
+        for match in self.pattern.finditer(message):
+            for kind, position in self._tags[int(match.lastgroup[1:])]:
+                if kind == 'intent':
+                    if intent is None or position < intent:
+                        intent = position
+                elif kind == 'genre':
+                    genres.add(position)
+                elif kind == 'platform':
+                    platforms.add(position)
+                elif kind == 'feature':
+                    features.add(position)
+                elif playtime is None or position < playtime:
+                    playtime = position
+
+        preferences = {}
+        if genres:
+            preferences['genres'] = [self.genres[position] for position in sorted(genres)]
+        if platforms:
+            preferences['platforms'] = list(dict.fromkeys(self.platforms[position] for position in sorted(platforms)))
+        if playtime is not None:
+            preferences['playtime'] = self.playtimes[playtime]
+        if features:
+            preferences['features'] = [self.features[position] for position in sorted(features)]
+        return MessageAnalysis(self.intents[intent] if intent is not None else 'general_chat', preferences)
+
+    def detect_intent(self, user_input: str) -> str:
+        return self.analyze(user_input).intent
+
+    def extract_preferences(self, user_input: str) -> Dict:
+        return self.analyze(user_input).preferences
+
+    def stats(self) -> Dict:
+        """Hits and misses of the analysis cache, counted per analysed message"""
+        lookups = self.hits + self.misses
+        return {**self.cache.stats(), 'hits': self.hits, 'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0}
+
+
+_END, _STEM = '$end', '$stem'
+
+
+def _trie_pattern(node: Dict) -> str:
+    """Render a keyword trie as a regex with one named group per keyword"""
+    branches = []
+    for char in sorted(key for key in node if len(key) == 1):
+        branches.append((r'\s+' if char == ' ' else re.escape(char)) + _trie_pattern(node[char]))
+    if _STEM in node:
+        branches.append(rf'(?P<k{node[_STEM]}>)\w*')
+    if _END in node:
+        branches.append(f'(?P<k{node[_END]}>)')
+    return branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
@@ -0,0 +1,280 @@
+"""
+Persistent user profiles in SQLite, written behind the chat path.
+
+Profiles live in one table of a WAL-mode SQLite database, as JSON. put()
+only records the new profile in memory: a background thread writes every
+pending profile in one transaction each flush_interval seconds, or sooner
+once flush_batch profiles are waiting. Several updates to one profile
+between flushes cost one row write. Recently used profiles are kept in an
+LRU cache, and reads that miss it borrow a connection from a small pool;
+WAL lets them run while the flusher writes.
+
+Besides the most recent genres and platforms, a profile keeps a decayed
+weight per genre, platform and playtime the user mentioned, which steers
+later recommendations towards what they asked for most, and most recently.
+"""
+
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+from bounded_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PLAYTIME = 'medium'
+MAX_REMEMBERED = 10  # favourite genres and platforms kept per profile
+DECAY = 0.7  # share of its weight a mention keeps after each later message stating preferences
+LEARNED_SHARE = 0.3  # share of a facet's weight a value needs to steer recommendations
+FORGOTTEN = 0.001  # weights that decayed below this are dropped when rescaling
+RESCALE = 1e6
+WEIGHT_FIELDS = (('genre_weights', 'genres'), ('platform_weights', 'platforms'), ('playtime_weights', 'playtime'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    user_id TEXT PRIMARY KEY,
+    profile TEXT NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+UPSERT = """
+INSERT INTO profiles (user_id, profile, updated_at) VALUES (?, ?, ?)
+ON CONFLICT (user_id) DO UPDATE SET profile = excluded.profile, updated_at = excluded.updated_at
+"""
+
+
+def default_profile() -> Dict[str, Any]:
+    """Profile of a user the chatbot knows nothing about yet"""
+    return {
+        'favorite_genres': [],
+        'preferred_platforms': [],
+        'completed_games': [],
+        'wishlist': [],
+        'playtime_preference': DEFAULT_PLAYTIME,  # short, medium, long
+        # value -> decayed weight, relative to weight_scale, see learn_preferences()
+        'genre_weights': {},
+        'platform_weights': {},
+        'playtime_weights': {},
+        'weight_scale': 1.0,
+    }
+
+
+def copy_profile(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a profile that shares no lists or dicts with it"""
+    return {key: list(value) if isinstance(value, list) else dict(value) if isinstance(value, dict) else value
+            for key, value in profile.items()}
+
+
+def merge_preferences(profile: Dict[str, Any], preferences: Dict) -> bool:
+    """
+    Fold preferences extracted from one message into profile, most recent
+    last; returns whether the profile changed
+    """
+    changed = False
+    for field, key in (('favorite_genres', 'genres'), ('preferred_platforms', 'platforms')):
+        values = profile[field]
+        for value in preferences.get(key, ()):
+            if values and values[-1] == value:
+                continue
+            if value in values:
+                values.remove(value)
+            values.append(value)
+            del values[:-MAX_REMEMBERED]
+            changed = True
+    playtime = preferences.get('playtime')
+    if playtime and playtime != profile['playtime_preference']:
+        profile['playtime_preference'] = playtime
+        changed = True
+    return changed
+
+
+def learn_preferences(profile: Dict[str, Any], preferences: Dict) -> bool:
+    """
+    Count the genres, platforms and playtime of one message into profile's
+    decayed weights; returns whether the message mentioned any. Instead of
+    multiplying every weight by DECAY, each message adds 1 / DECAY times as
+    much as the one before, so an update costs the same however long the
+    conversation has been; the weights are scaled back down now and then
+    """
+    mentioned = [(field, values if isinstance(values, list) else [values])
+                 for field, values in ((field, preferences.get(key)) for field, key in WEIGHT_FIELDS) if values]
+    if not mentioned:
+        return False
+    scale = profile['weight_scale'] / DECAY
+    for field, values in mentioned:
+        weights = profile[field]
+        for value in values:
+            weights[value] = weights.get(value, 0.0) + scale
+    if scale > RESCALE:
+        for field, _ in WEIGHT_FIELDS:
+            profile[field] = {value: weight / scale for value, weight in profile[field].items()
+                              if weight / scale >= FORGOTTEN}
+        scale = 1.0
+    profile['weight_scale'] = scale
+    return True
+
+
+def learned_preferences(profile: Dict[str, Any]) -> Dict:
+    """
+    Preferences the profile's weights point to, shaped like those extracted
+    from a message: per facet, the values holding at least LEARNED_SHARE of
+    its weight, strongest first (only the strongest playtime)
+    """
+    learned = {}
+    for field, key in WEIGHT_FIELDS:
+        weights = profile[field]
+        if not weights:
+            continue
+        threshold = LEARNED_SHARE * sum(weights.values())
+        strongest = sorted((value for value, weight in weights.items() if weight >= threshold),
+                           key=weights.__getitem__, reverse=True)
+        if strongest:
+            learned[key] = strongest[0] if key == 'playtime' else strongest
+    return learned
+
+
+class ProfileStore:
+    """SQLite profile table with an LRU read cache and batched background writes"""
+
+    def __init__(self, path: str, pool_size: int = 4, cache_size: int = 1024,
+                 flush_interval: float = 0.5, flush_batch: int = 512):
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
+        if flush_batch < 1:
+            raise ValueError("flush_batch must be at least 1")
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self.cache: LRUCache[Dict[str, Any]] = LRUCache(cache_size)
+        # Readers share the pool; the flusher has its own connection, SQLite allows one writer anyway
+        self._writer = self._connect()
+        self._writer.execute(SCHEMA)
+        self._pool: 'queue.Queue[sqlite3.Connection]' = queue.Queue()
+        for _ in range(pool_size):
+            self._pool.put(self._connect())
+        # user id -> newest profile not yet written
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        # The batch being written, still readable until its transaction commits
+        self._flushing: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        # Serialises flushes from the background thread and flush() callers
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+        self.puts = 0
+        self.rows_written = 0
+        self.flushes = 0
+        self.errors = 0
+        self._thread = threading.Thread(target=self._run, name='profile-flusher', daemon=True)
+        self._thread.start()
+
+    def get(self, user_id: str) -> Dict[str, Any]:
+        """The user's profile (a copy the caller may change), or a default one"""
+        with self._lock:
+            profile = self._pending.get(user_id) or self._flushing.get(user_id)
+            puts = self.puts
+        if profile is None:
+            profile = self.cache.get(user_id)
+        if profile is None:
+            profile = self._read(user_id)
+            with self._lock:
+                # A put() while reading may have cached a newer profile; keep it
+                if self.puts == puts:
+                    self.cache.put(user_id, profile)
+        return copy_profile(profile)
+
+    def put(self, user_id: str, profile: Dict[str, Any]):
+        """Record the user's new profile; it reaches the database on the next flush"""
+        if self._closed:
+            raise ValueError("ProfileStore is closed")
+        profile = copy_profile(profile)
+        with self._lock:
+            self.cache.put(user_id, profile)
+            self._pending[user_id] = profile
+            self.puts += 1
+            full = len(self._pending) >= self.flush_batch
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """Write every pending profile now"""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, {}
+                self._flushing = batch
+            if not batch:
+                return
+            now = time.time()
+            rows = [(user_id, json.dumps(profile), now) for user_id, profile in batch.items()]
+            try:
+                with self._writer:
+                    self._writer.executemany(UPSERT, rows)
+            except sqlite3.Error:
+                logger.exception("Failed to write %d profiles, will retry", len(rows))
+                self.errors += 1
+                with self._lock:
+                    # Profiles updated meanwhile are newer than the failed ones
+                    self._pending = {**batch, **self._pending}
+                    self._flushing = {}
+                return
+            with self._lock:
+                self._flushing = {}
+            self.rows_written += len(rows)
+            self.flushes += 1
+
+    def close(self):
+        """Stop the flusher, write what is pending and close every connection"""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        self._writer.close()
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            'pending': pending,
+            'puts': self.puts,
+            'rows_written': self.rows_written,
+            'flushes': self.flushes,
+            'errors': self.errors,
+            'cache': self.cache.stats(),
+        }
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False, timeout=5.0)
+        connection.execute('PRAGMA journal_mode=WAL')
+        # With WAL, NORMAL only syncs at checkpoints and is still safe against corruption
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        connection = self._pool.get()
+        try:
+            yield connection
+        finally:
+            self._pool.put(connection)
+
+    def _read(self, user_id: str) -> Dict[str, Any]:
+        with self._connection() as connection:
+            row = connection.execute('SELECT profile FROM profiles WHERE user_id = ?', (user_id,)).fetchone()
+        if row is None:
+            return default_profile()
+        return {**default_profile(), **json.loads(row[0])}
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
@@ -0,0 +1,185 @@
+"""
+Opt-in profiling of single chat requests.
+
+A RequestProfiler runs one call under cProfile and tracemalloc and writes a
+report: the functions with the most cumulative time, the peak memory traced
+during the call and the allocation sites still holding memory when it
+returned (what the request added to caches and history). Reports go to a
+directory that keeps only the newest max_reports, each as JSON plus the raw
+cProfile stats for tools such as snakeviz.
+
+Only one call is profiled at a time, since tracemalloc traces the whole
+process; a request that arrives while another is being profiled simply runs
+unprofiled. Requests that are not profiled never touch this module.
+"""
+
+import cProfile
+import glob
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+DEFAULT_MAX_REPORTS = 50
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+REPORT_ID_PATTERN = re.compile(r'[0-9]+-[0-9]+-[0-9]+')
+
+# Frames of the profiler's own machinery, left out of allocation sites
+_IGNORED_ALLOCATIONS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, cProfile.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+)
+
+
+class RequestProfiler:
+    """Profiles calls on request and keeps a bounded ring of reports on disk"""
+
+    def __init__(self, directory: str, max_reports: int = DEFAULT_MAX_REPORTS, sample_rate: float = 0.0):
+        if max_reports < 1:
+            raise ValueError("max_reports must be at least 1")
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0 and 1")
+        self.directory = directory
+        self.max_reports = max_reports
+        self.sample_rate = sample_rate
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._sequence = 0
+        self.profiled = 0
+        self.skipped = 0
+
+    def profile(self, function: Callable[..., Any], *args, reason: str = 'requested',
+                message_chars: int = 0) -> Tuple[Any, Optional[str]]:
+        """
+        Call function(*args) under the profilers; returns its result and the
+        report id, or None as the id if another call was being profiled.
+        Reports record only the length of the message, never its text, since
+        whoever reads them need not see what other users wrote
+        """
+        if not self._lock.acquire(blocking=False):
+            self.skipped += 1
+            return function(*args), None
+        try:
+            was_tracing = tracemalloc.is_tracing()
+            if not was_tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            profiler = cProfile.Profile()
+            error = None
+            start = time.perf_counter()
+            profiler.enable()
+            try:
+                result = function(*args)
+            except BaseException as raised:
+                error = raised
+            finally:
+                profiler.disable()
+                duration = time.perf_counter() - start
+                current, peak = tracemalloc.get_traced_memory()
+                snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED_ALLOCATIONS)
+                if not was_tracing:
+                    tracemalloc.stop()
+
+            report = {
+                'reason': reason,
+                'message_chars': message_chars,
+                'duration_ms': round(duration * 1000, 3),
+                'error': repr(error) if error is not None else None,
+                'memory_peak_bytes': peak - baseline,
+                'memory_retained_bytes': current - baseline,
+                'functions': _top_functions(profiler),
+                'allocations': _top_allocations(snapshot),
+            }
+            report_id = self._write(report, profiler)
+            self.profiled += 1
+            if error is not None:
+                raise error
+            return result, report_id
+        finally:
+            self._lock.release()
+
+    def reports(self) -> List[Dict]:
+        """Summaries of the stored reports, newest first"""
+        summaries = []
+        for path in sorted(glob.glob(os.path.join(self.directory, '*.json')), reverse=True):
+            try:
+                with open(path, encoding='utf-8') as handle:
+                    report = json.load(handle)
+            except (OSError, ValueError):
+                continue  # pruned or being replaced by another worker
+            # Reports written by older versions may lack some keys
+            summaries.append({key: report.get(key) for key in ('id', 'created', 'reason', 'message_chars',
+                                                               'duration_ms', 'error', 'memory_peak_bytes')})
+        return summaries
+
+    def report(self, report_id: str) -> Optional[Dict]:
+        """A stored report, or None if there is none with that id"""
+        path = self.path(report_id, '.json')
+        if path is None or not os.path.exists(path):
+            return None
+        with open(path, encoding='utf-8') as handle:
+            return json.load(handle)
+
+    def path(self, report_id: str, suffix: str) -> Optional[str]:
+        """Where report_id's file with suffix lives; None for ids this profiler would never write"""
+        if not REPORT_ID_PATTERN.fullmatch(report_id):
+            return None
+        return os.path.join(self.directory, report_id + suffix)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'directory': self.directory,
+            'max_reports': self.max_reports,
+            'sample_rate': self.sample_rate,
+            'profiled': self.profiled,
+            'skipped': self.skipped,
+        }
+
+    def _write(self, report: Dict, profiler: cProfile.Profile) -> str:
+        self._sequence += 1
+        created = time.time()
+        # Sortable by time, and unique between workers sharing the directory
+        report_id = f'{int(created * 1000):013d}-{os.getpid()}-{self._sequence}'
+        report = {'id': report_id, 'created': created, **report}
+        profiler.dump_stats(self.path(report_id, '.prof'))
+        temporary = self.path(report_id, '.json') + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as handle:
+            json.dump(report, handle, indent=1)
+        os.replace(temporary, self.path(report_id, '.json'))
+        self._prune()
+        return report_id
+
+    def _prune(self):
+        reports = sorted(glob.glob(os.path.join(self.directory, '*.json')))
+        for path in reports[:-self.max_reports]:
+            for stale in (path, path[:-len('.json')] + '.prof'):
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass
+
+
+def _top_functions(profiler: cProfile.Profile) -> List[Dict]:
+    entries = pstats.Stats(profiler).stats.items()
+    ranked = sorted(entries, key=lambda entry: entry[1][3], reverse=True)[:TOP_FUNCTIONS]
+    return [{
+        'function': f'{os.path.basename(filename)}:{line}({name})' if line else name,
+        'calls': calls,
+        'own_ms': round(own * 1000, 3),
+        'cumulative_ms': round(cumulative * 1000, 3),
+    } for (filename, line, name), (_, calls, own, cumulative, _) in ranked]
+
+
+def _top_allocations(snapshot: tracemalloc.Snapshot) -> List[Dict]:
+    return [{
+        'site': f'{os.path.basename(statistic.traceback[0].filename)}:{statistic.traceback[0].lineno}',
+        'bytes': statistic.size,
+        'blocks': statistic.count,
+    } for statistic in snapshot.statistics('lineno')[:TOP_ALLOCATIONS]]
@@ -0,0 +1,201 @@
+"""
+Markdown blocks rendered from catalog data, memoized in an LRU cache bounded
+by entry count and total characters.
+
+The game info, review, similar games, genre and platform answers depend
+only on the catalog, so each is rendered once per game id, genre or platform and then
+served from the cache. The cache is dropped whenever the catalog's version
+changes.
+
+The list answers are also available as iterators of chunks (a header, one
+block per game, a footer) so they can be streamed while still rendering.
+"""
+
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, Optional
+
+from bounded_cache import LRUCache
+from game_catalog import GameCatalog, GameRow
+from game_index import CatalogIndex
+from similar_games import SimilarGamesIndex
+
+DEFAULT_MAX_ENTRIES = 4096
+# Characters of rendered text kept in all; whole genre and platform listings
+# of a large catalog run to megabytes each
+DEFAULT_MAX_CHARS = 64 * 1024 * 1024
+# A listing longer than this share of the budget is rendered again each time
+# rather than pushing most other blocks out of the cache
+LISTING_SHARE = 16
+PLATFORM_GAMES = 5
+SIMILAR_GAMES = 5
+
+
+class ResponseRenderer:
+    """Renders and caches the catalog-driven chatbot answers"""
+
+    def __init__(self, catalog: GameCatalog, index: CatalogIndex, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_chars: int = DEFAULT_MAX_CHARS):
+        self.catalog = catalog
+        self.index = index
+        self.cache: LRUCache[str] = LRUCache(max_entries, max_chars, len)
+        self.max_listing_chars = max_chars // LISTING_SHARE
+        self.version = catalog.version
+
+    def game_info(self, game_id: int) -> str:
+        return self._cached(('info', game_id), lambda: render_game_info(self.catalog[game_id]))
+
+    def review(self, game_id: int) -> str:
+        return self._cached(('review', game_id), lambda: render_review(self.catalog[game_id]))
+
+    def similar(self, game_id: int, neighbours: SimilarGamesIndex) -> str:
+        """Games most similar to game_id, looked up in its neighbours table"""
+        def build():
+            return render_similar(self.catalog[game_id],
+                                  (self.catalog[other] for other in neighbours.similar(game_id, SIMILAR_GAMES)))
+        return self._cached(('similar', game_id), build)
+
+    def genre(self, genre: str) -> Optional[str]:
+        """Games of a genre, or None for a genre the catalog does not have"""
+        chunks = self.stream_genre(genre)
+        return None if chunks is None else "".join(chunks)
+
+    def platform(self, platform: str) -> Optional[str]:
+        """Best rated games on a platform, or None when no game runs on it"""
+        chunks = self.stream_platform(platform)
+        return None if chunks is None else "".join(chunks)
+
+    def stream_genre(self, genre: str) -> Optional[Iterator[str]]:
+        """genre() as chunks, rendered on demand unless already cached"""
+        if genre not in self.catalog.genres:
+            return None
+        return self._streamed(('genre', genre), lambda: iter_genre(genre, self.catalog.iter_genre(genre)))
+
+    def stream_platform(self, platform: str) -> Optional[Iterator[str]]:
+        """platform() as chunks, rendered on demand unless already cached"""
+        # Platforms are only interned by games that run on them
+        if platform not in self.catalog.platforms:
+            return None
+
+        def chunks():
+            game_ids = self.index.top_k({'platforms': [platform]}, PLATFORM_GAMES)
+            return iter_platform(platform, (self.catalog[game_id] for game_id in game_ids))
+        return self._streamed(('platform', platform), chunks)
+
+    def invalidate(self):
+        """Forget every rendered block"""
+        self.cache.clear()
+        self.version = self.catalog.version
+
+    def stats(self) -> Dict[str, Any]:
+        return self.cache.stats()
+
+    def _cached(self, key: Hashable, build):
+        if self.catalog.version != self.version:
+            self.invalidate()
+        return self.cache.get_or_build(key, build)
+
+    def _streamed(self, key: Hashable, chunks: Callable[[], Iterable[str]]) -> Iterator[str]:
+        if self.catalog.version != self.version:
+            self.invalidate()
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+        parts = []
+        length = 0
+        for chunk in chunks():
+            if parts is not None:
+                parts.append(chunk)
+                length += len(chunk)
+                if length > self.max_listing_chars:
+                    parts = None  # too long to cache, so stop collecting it
+            yield chunk
+        # Only a fully consumed stream is cached
+        if parts is not None:
+            self.cache.put(key, "".join(parts))
+
+
+def render_game_info(game: GameRow) -> str:
+    return "".join([
+        f"🎮 **{game['name']}** ({game['year']})\n\n",
+        f"📱 **Platforms:** {', '.join(game['platform'])}\n",
+        f"⭐ **Rating:** {game['rating']}/10\n",
+        f"🎭 **Genre:** {game['genre'].title()}\n",
+        f"⏱️ **Playtime:** {game['playtime'].title()}\n",
+        f"🏷️ **Features:** {', '.join(game['features'])}\n\n",
+        f"📝 **Description:** {game['description']}\n\n",
+        "Would you like recommendations for similar games? 🎮",
+    ])
+
+
+def render_review(game: GameRow) -> str:
+    rating = game['rating']
+    if rating >= 9.0:
+        verdict = "🏆 **Verdict:** Masterpiece! This game is absolutely phenomenal and a must-play for any gamer.\n"
+    elif rating >= 8.0:
+        verdict = "👍 **Verdict:** Excellent game! Highly recommended with great gameplay and features.\n"
+    elif rating >= 7.0:
+        verdict = "✅ **Verdict:** Good game worth playing, with some minor flaws but overall enjoyable.\n"
+    else:
+        verdict = "⚠️ **Verdict:** Average game. Might be worth trying if you're interested in the genre.\n"
+    return "".join([
+        f"🎮 **{game['name']} Review:**\n\n",
+        f"⭐ **Overall Rating:** {rating}/10\n\n",
+        verdict,
+        f"\n📝 **Description:** {game['description']}\n",
+        f"🎭 **Genre:** {game['genre'].title()}\n",
+        f"📱 **Platforms:** {', '.join(game['platform'])}\n\n",
+        "Would you like recommendations for similar games? 🎮",
+    ])
+
+
+def iter_recommendations(games: Iterable[GameRow]) -> Iterator[str]:
+    yield "🎮 **Game Recommendations for You:**\n\n"
+    for i, game in enumerate(games, 1):
+        yield (f"{i}. **{game['name']}** ({game['year']})\n"
+               f"   📱 Platforms: {', '.join(game['platform'])}\n"
+               f"   ⭐ Rating: {game['rating']}/10\n"
+               f"   🎭 Genre: {game['genre'].title()}\n"
+               f"   ⏱️ Playtime: {game['playtime'].title()}\n"
+               f"   📝 {game['description']}\n\n")
+    yield "Would you like more details about any of these games or different recommendations? 🎮"
+
+
+def iter_similar(game: GameRow, games: Iterable[GameRow]) -> Iterator[str]:
+    yield f"🎮 **Games Similar to {game['name']}:**\n\n"
+    for i, other in enumerate(games, 1):
+        yield (f"{i}. **{other['name']}** ({other['year']})\n"
+               f"   🎭 Genre: {other['genre'].title()} | ⭐ Rating: {other['rating']}/10\n"
+               f"   🏷️ {', '.join(other['features'])}\n\n")
+    yield f"If you enjoyed {game['name']}, any of these should be a great fit! Want details on one of them? 🎮"
+
+
+def iter_genre(genre: str, games: Iterable[GameRow]) -> Iterator[str]:
+    yield f"🎮 **{genre.title()} Games You'll Love:**\n\n"
+    for i, game in enumerate(games, 1):
+        yield (f"{i}. **{game['name']}** ({game['year']})\n"
+               f"   ⭐ Rating: {game['rating']}/10\n"
+               f"   📝 {game['description']}\n\n")
+    yield f"{genre.title()} games offer amazing experiences! Want to know more about any specific game? 🎮"
+
+
+def iter_platform(platform: str, games: Iterable[GameRow]) -> Iterator[str]:
+    yield f"🎮 **Great {platform} Games:**\n\n"
+    for i, game in enumerate(games, 1):
+        yield f"{i}. **{game['name']}** - {game['description'][:50]}... (Rating: {game['rating']}/10)\n"
+    yield f"\n{platform} is an excellent gaming platform! Would you like detailed info about any of these games? 🎮"
+
+
+def render_recommendations(games: Iterable[GameRow]) -> str:
+    return "".join(iter_recommendations(games))
+
+
+def render_similar(game: GameRow, games: Iterable[GameRow]) -> str:
+    return "".join(iter_similar(game, games))
+
+
+def render_genre(genre: str, games: Iterable[GameRow]) -> str:
+    return "".join(iter_genre(genre, games))
+
+
+def render_platform(platform: str, games: Iterable[GameRow]) -> str:
+    return "".join(iter_platform(platform, games))
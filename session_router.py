@@ -0,0 +1,529 @@
+"""
+Session-affinity front process for several API worker processes.
+
+Chat state lives in the worker that holds the session, so every request of
+a session has to reach the same worker. The router starts the workers, each
+a uvicorn process on its own Unix socket, and relays HTTP/1.1 requests to
+them, picking the worker for a session id on a consistent-hash ring: when a
+worker is added or removed, only the sessions on its share of the ring
+move. Requests that arrive without a session id get a new one here, so the
+worker that starts the session is the one its later requests hash to.
+
+The router only reads request and response heads and copies bodies through,
+so it spends far less per request than a worker does to answer it. Catalog
+reloads and deltas are sent to every worker, since each holds its own
+catalog, one at a time so every worker applies them in the same order,
+and kept in a log: a worker that comes back, restarted from the base
+catalog or after missing updates, is sent the ones it lacks before it gets
+requests again. A reload that swapped in a new catalog supersedes the
+updates before it, so the log only grows with the deltas since the last
+one. A worker that exits is restarted, and its sessions go to the other
+workers until it is back. /router/stats is answered by the router itself.
+
+Usage: python session_router.py [--workers N] [--host HOST] [--port PORT] [--app api:app]
+"""
+
+import argparse
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import os
+import re
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REPLICAS = 64
+DEFAULT_PORT = 8000
+# Must match the session handling in api.py
+SESSION_HEADER = b"x-session-id"
+SESSION_COOKIE = "session_id"
+SESSION_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,128}")
+SESSION_PATHS = frozenset((b"/chat", b"/chat/stream", b"/chat/batch", b"/profile"))
+RELOAD_PATH = b"/admin/catalog/reload"
+BROADCAST_PATHS = frozenset((RELOAD_PATH, b"/admin/catalog/delta"))
+MAX_BODY = 8 * 1024 * 1024  # larger request bodies are refused before they are read
+STATS_PATH = b"/router/stats"
+
+
+def _point(key: str) -> int:
+    # Stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+
+class HashRing:
+    """Consistent-hash ring with replicas points per node"""
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = DEFAULT_REPLICAS):
+        if replicas < 1:
+            raise ValueError("replicas must be at least 1")
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._nodes: List[str] = []
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str):
+        if node in self._nodes:
+            return
+        for replica in range(self.replicas):
+            point = _point(f"{node}#{replica}")
+            position = bisect.bisect(self._points, point)
+            self._points.insert(position, point)
+            self._nodes.insert(position, node)
+
+    def remove(self, node: str):
+        kept = [(point, owner) for point, owner in zip(self._points, self._nodes) if owner != node]
+        self._points = [point for point, _ in kept]
+        self._nodes = [owner for _, owner in kept]
+
+    def node(self, key: str) -> Optional[str]:
+        """The node owning key: the first point clockwise from the key's point"""
+        if not self._points:
+            return None
+        position = bisect.bisect(self._points, _point(key))
+        return self._nodes[position % len(self._nodes)]
+
+    def __contains__(self, node: object) -> bool:
+        return node in self._nodes
+
+    def __len__(self) -> int:
+        return len(set(self._nodes))
+
+
+class Worker:
+    """One uvicorn process serving the app on a Unix socket, with idle connections to it"""
+
+    def __init__(self, name: str, socket_path: str):
+        self.name = name
+        self.socket_path = socket_path
+        self.process: Optional[subprocess.Popen] = None
+        self.idle: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+        self.requests = 0
+        self.restarts = 0
+        # Sequence number of the last catalog update the process has applied
+        self.applied = 0
+
+    def start(self, app: str, env: Dict[str, str]):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.applied = 0
+        self.process = subprocess.Popen([sys.executable, '-m', 'uvicorn', app, '--uds', self.socket_path,
+                                         '--log-level', 'warning'], env=env)
+
+    def running(self) -> bool:
+        return self.process is not None and self.process.poll() is None
+
+    async def connect(self):
+        """A connection to the worker, and whether it was reused from the idle ones"""
+        if self.idle:
+            return self.idle.pop(), True
+        try:
+            return await asyncio.open_unix_connection(self.socket_path), False
+        except OSError as error:
+            raise WorkerUnavailable(f"Worker {self.name}: {error}") from error
+
+    def close_idle(self):
+        for _, writer in self.idle:
+            writer.close()
+        self.idle = []
+
+
+class BadRequest(Exception):
+    """Raised for a request the router cannot relay"""
+
+
+class WorkerUnavailable(Exception):
+    """Raised when a worker cannot take a request; nothing was sent to the client yet"""
+
+
+class SessionRouter:
+    """Relays requests to workers, keeping each session on one of them"""
+
+    def __init__(self, workers: int, app: str = 'api:app', socket_dir: Optional[str] = None,
+                 replicas: int = DEFAULT_REPLICAS):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.app = app
+        self.socket_dir = socket_dir or tempfile.mkdtemp(prefix='game-router-')
+        self.workers = {str(index): Worker(str(index), os.path.join(self.socket_dir, f'worker-{index}.sock'))
+                        for index in range(workers)}
+        self.ring = HashRing(replicas=replicas)
+        self.env = dict(os.environ)
+        self.requests = 0
+        self.new_sessions = 0
+        # (sequence number, request) of the catalog updates every worker has to apply, oldest first
+        self.catalog_updates: List[Tuple[int, bytes]] = []
+        self.update_sequence = 0
+        # Held while updates are sent, so broadcasts and catch-ups never interleave
+        self._update_lock = asyncio.Lock()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._supervisor: Optional[asyncio.Task] = None
+
+    async def start(self, host: str = '127.0.0.1', port: int = DEFAULT_PORT, ready_timeout: float = 60.0):
+        """Start the workers, wait until they accept connections, then listen on host:port"""
+        for worker in self.workers.values():
+            worker.start(self.app, self.env)
+        deadline = time.monotonic() + ready_timeout
+        while len(self.ring) < len(self.workers):
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"Only {len(self.ring)} of {len(self.workers)} workers started")
+            await self._check_workers()
+            await asyncio.sleep(0.05)
+        self._server = await asyncio.start_server(self.handle_client, host, port)
+        self._supervisor = asyncio.ensure_future(self._supervise())
+        return self._server
+
+    async def stop(self):
+        if self._supervisor is not None:
+            self._supervisor.cancel()
+        if self._server is not None:
+            self._server.close()
+        for worker in self.workers.values():
+            worker.close_idle()
+            if worker.running():
+                worker.process.terminate()
+        for worker in self.workers.values():
+            if worker.process is not None:
+                await asyncio.get_running_loop().run_in_executor(None, worker.process.wait)
+
+    async def _supervise(self):
+        while True:
+            await asyncio.sleep(0.5)
+            await self._check_workers()
+
+    async def _check_workers(self):
+        """Take exited workers off the ring and restart them; put them back once they accept connections"""
+        for worker in self.workers.values():
+            if not worker.running():
+                logger.warning("Worker %s exited; restarting it", worker.name)
+                self._take_down(worker)
+                worker.restarts += 1
+                worker.start(self.app, self.env)
+            elif worker.name not in self.ring:
+                try:
+                    _, writer = await asyncio.open_unix_connection(worker.socket_path)
+                except OSError:
+                    continue
+                writer.close()
+                # Back on the ring before the lock is released, so no update goes past it
+                async with self._update_lock:
+                    try:
+                        await self._catch_up(worker)
+                    except WorkerUnavailable as error:
+                        logger.warning("%s; will retry catching it up", error)
+                        continue
+                    self.ring.add(worker.name)
+
+    async def _catch_up(self, worker: Worker):
+        """Send worker the logged catalog updates it has not applied, in order"""
+        for sequence, request in self.catalog_updates:
+            if sequence <= worker.applied:
+                continue
+            parts = []
+            status = await self._exchange(worker, request, b"POST", parts.append, _no_drain)
+            if not 200 <= status < 300:
+                # The other workers took it; this one is left as close to them as it gets
+                logger.warning("Worker %s refused catalog update %d on catching up: %s", worker.name, sequence,
+                               b"".join(parts).partition(b"\r\n\r\n")[2][:200])
+            worker.applied = sequence
+
+    def _take_down(self, worker: Worker):
+        self.ring.remove(worker.name)
+        worker.close_idle()
+
+    def stats(self) -> Dict:
+        return {
+            'requests': self.requests,
+            'new_sessions': self.new_sessions,
+            'catalog_updates': len(self.catalog_updates),
+            'workers': [{'name': worker.name, 'pid': worker.process.pid if worker.process else None,
+                         'up': worker.name in self.ring, 'requests': worker.requests, 'restarts': worker.restarts,
+                         'applied_update': worker.applied}
+                        for worker in self.workers.values()],
+        }
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Relay requests from one client connection until either side closes it"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break  # the client closed the connection between requests
+                try:
+                    keep_alive = await self.relay(head, reader, writer)
+                except BadRequest as error:
+                    await self._answer(writer, 400, {'detail': str(error)}, keep_alive=False)
+                    break
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.LimitOverrunError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def relay(self, head: bytes, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> bool:
+        """Send one request to its worker and its response to the client; returns whether to keep the connection"""
+        request_line, _, header_block = head[:-4].partition(b"\r\n")
+        try:
+            method, target, _ = request_line.split(b" ", 2)
+        except ValueError:
+            raise BadRequest("Malformed request line")
+        headers = _parse_headers(header_block)
+        if b"chunked" in headers.get(b"transfer-encoding", b""):
+            raise BadRequest("Chunked request bodies are not supported")
+        if headers.get(b"expect", b"").lower() == b"100-continue":
+            # Answered here: a worker's interim response would end up in the relayed one
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            header_block = _without(header_block, b"expect")
+        try:
+            length = int(headers.get(b"content-length", b"0"))
+        except ValueError:
+            raise BadRequest("Invalid Content-Length")
+        if length < 0:
+            raise BadRequest("Invalid Content-Length")
+        if length > MAX_BODY:
+            await self._answer(writer, 413, {'detail': f"Request bodies are limited to {MAX_BODY} bytes"},
+                               keep_alive=False)
+            return False
+        body = await reader.readexactly(length)
+        keep_alive = headers.get(b"connection", b"").lower() != b"close"
+        path = target.split(b"?", 1)[0]
+        self.requests += 1
+
+        if path == STATS_PATH:
+            await self._answer(writer, 200, self.stats(), keep_alive)
+            return keep_alive
+
+        session_id = _session_id(headers)
+        if session_id is None and path in SESSION_PATHS:
+            # Name the session here, so it starts on the worker its id hashes to
+            session_id = uuid.uuid4().hex
+            self.new_sessions += 1
+            header_block = _without(header_block, SESSION_HEADER) + b"\r\nX-Session-ID: " + session_id.encode()
+        request = request_line + b"\r\n" + header_block + b"\r\n\r\n" + body
+
+        if method == b"POST" and path in BROADCAST_PATHS:
+            return await self._broadcast(path, request, writer, keep_alive)
+        key = session_id if session_id is not None else uuid.uuid4().hex
+        for _ in range(len(self.workers)):
+            worker = self._worker_for(key)
+            if worker is None:
+                break
+            try:
+                await self._exchange(worker, request, method, writer.write, writer.drain)
+                return keep_alive
+            except WorkerUnavailable as error:
+                # Nothing reached the client yet, so the next worker on the ring can take it
+                logger.warning("%s; routing around it", error)
+                self._take_down(worker)
+        await self._answer(writer, 503, {'detail': "No worker available"}, keep_alive, {'Retry-After': '1'})
+        return keep_alive
+
+    def _log_update(self, path: bytes, request: bytes, responses: List[bytes], updated: List[Worker]) -> bool:
+        """Log an update that workers took; returns whether it changed their catalogs"""
+        if path == RELOAD_PATH:
+            if not any(_swapped(response) for response in responses):
+                return False
+            # The reloaded file replaces every earlier update
+            self.catalog_updates.clear()
+        self.update_sequence += 1
+        self.catalog_updates.append((self.update_sequence, request))
+        for worker in updated:
+            worker.applied = self.update_sequence
+        return True
+
+    def _worker_for(self, key: str) -> Optional[Worker]:
+        name = self.ring.node(key)
+        return self.workers[name] if name is not None else None
+
+    async def _broadcast(self, path: bytes, request: bytes, writer: asyncio.StreamWriter, keep_alive: bool) -> bool:
+        """
+        Send a catalog update to every worker; answers with the first
+        success, else the first failure. An update any worker took is logged
+        for workers that come back later, and the workers that refused it
+        leave the ring until catching up has sent it to them again
+        """
+        answers = []
+        updated = []
+        refused = []
+        async with self._update_lock:
+            for worker in list(self.workers.values()):
+                if worker.name not in self.ring:
+                    continue
+                parts = []
+                try:
+                    status = await self._exchange(worker, request, b"POST", parts.append, _no_drain)
+                except WorkerUnavailable as error:
+                    logger.warning("%s; it misses this catalog update", error)
+                    self._take_down(worker)
+                    continue
+                answers.append((status, b"".join(parts)))
+                (updated if 200 <= status < 300 else refused).append(worker)
+            accepted = [response for status, response in answers if 200 <= status < 300]
+            if accepted and self._log_update(path, request, accepted, updated):
+                for worker in refused:
+                    logger.warning("Worker %s refused catalog update %d; catching it up", worker.name,
+                                   self.update_sequence)
+                    self._take_down(worker)
+        if not answers:
+            await self._answer(writer, 503, {'detail': "No worker available"}, keep_alive, {'Retry-After': '1'})
+            return keep_alive
+        writer.write((accepted or [response for _, response in answers])[0])
+        await writer.drain()
+        return keep_alive
+
+    async def _exchange(self, worker: Worker, request: bytes, method: bytes, write, drain) -> int:
+        """
+        Send request to worker and pass its response to write as it arrives;
+        returns the status. Raises WorkerUnavailable if the worker gave no
+        response, and so nothing was written
+        """
+        (reader, connection), reused = await worker.connect()
+        try:
+            connection.write(request)
+            try:
+                status_line = await reader.readuntil(b"\r\n")
+            except (asyncio.IncompleteReadError, ConnectionError):
+                if not reused:
+                    raise
+                # The worker closed the idle connection, and likely the others idle
+                # as long; the request never arrived, so send it again on a new one
+                connection.close()
+                worker.close_idle()
+                (reader, connection), _ = await worker.connect()
+                connection.write(request)
+                status_line = await reader.readuntil(b"\r\n")
+            header_block = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, ConnectionError) as error:
+            connection.close()
+            raise WorkerUnavailable(f"Worker {worker.name} closed the connection") from error
+        except BaseException:
+            connection.close()
+            raise
+        worker.requests += 1
+
+        try:
+            head = status_line + header_block
+            headers = _parse_headers(header_block[:-4])
+            status = int(status_line.split(b" ", 2)[1])
+            reusable = headers.get(b"connection", b"").lower() != b"close"
+            if method == b"HEAD" or status in (204, 304) or status < 200:
+                write(head)
+            elif b"content-length" in headers:
+                # One write, so one send, for head and body
+                write(head + await reader.readexactly(int(headers[b"content-length"])))
+            elif b"chunked" in headers.get(b"transfer-encoding", b""):
+                # Streamed answers are passed on chunk by chunk
+                write(head)
+                while True:
+                    size_line = await reader.readuntil(b"\r\n")
+                    size = int(size_line.split(b";", 1)[0], 16)
+                    if size == 0:
+                        write(size_line + await reader.readuntil(b"\r\n"))
+                        break
+                    write(size_line + await reader.readexactly(size + 2))
+                    await drain()
+            else:
+                write(head + await reader.read())
+                reusable = False
+            await drain()
+        except BaseException:
+            # The client may already have part of the response, so this is not retried
+            connection.close()
+            raise
+        if reusable:
+            worker.idle.append((reader, connection))
+        else:
+            connection.close()
+        return status
+
+    async def _answer(self, writer: asyncio.StreamWriter, status: int, document: Dict, keep_alive: bool,
+                      headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(document).encode()
+        headers = {'Content-Type': 'application/json', 'Content-Length': len(body), **(headers or {})}
+        if not keep_alive:
+            headers['Connection'] = 'close'
+        head = ''.join(f"{name}: {value}\r\n" for name, value in headers.items())
+        writer.write(f"HTTP/1.1 {status} {_REASONS[status]}\r\n{head}\r\n".encode() + body)
+        await writer.drain()
+
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 413: 'Payload Too Large', 503: 'Service Unavailable'}
+
+
+async def _no_drain():
+    pass
+
+
+def _swapped(response: bytes) -> bool:
+    """Whether a reload response says the worker swapped in a new catalog"""
+    try:
+        return bool(json.loads(response.partition(b"\r\n\r\n")[2]).get('swapped', True))
+    except ValueError:
+        return True
+
+
+def _parse_headers(block: bytes) -> Dict[bytes, bytes]:
+    """Header names lowercased to values; a repeated header keeps its last value"""
+    headers = {}
+    for line in block.split(b"\r\n"):
+        name, _, value = line.partition(b":")
+        if name:
+            headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+def _without(block: bytes, name: bytes) -> bytes:
+    """A header block without the header called name (given lowercased)"""
+    return b"\r\n".join(line for line in block.split(b"\r\n")
+                          if line.partition(b":")[0].strip().lower() != name)
+
+
+def _session_id(headers: Dict[bytes, bytes]) -> Optional[str]:
+    """The session id the API would use for these headers, if the client sent one"""
+    candidates = [headers.get(SESSION_HEADER, b"").decode('latin-1')]
+    for cookie in headers.get(b"cookie", b"").decode('latin-1').split(';'):
+        name, _, value = cookie.strip().partition('=')
+        if name == SESSION_COOKIE:
+            candidates.append(value)
+    return next((candidate for candidate in candidates if SESSION_ID_PATTERN.fullmatch(candidate)), None)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Route API sessions to a fixed worker process each")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--app', default='api:app', help="ASGI app the workers serve")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    async def serve():
+        # Stop the workers too, whether stopped by Ctrl-C or by a process manager
+        stopped = asyncio.Event()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            asyncio.get_running_loop().add_signal_handler(signal_number, stopped.set)
+        router = SessionRouter(args.workers, args.app)
+        try:
+            await router.start(args.host, args.port)
+            logger.info("Routing sessions on %s:%d to %d workers", args.host, args.port, args.workers)
+            await stopped.wait()
+        finally:
+            await router.stop()
+
+    asyncio.run(serve())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
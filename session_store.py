@@ -0,0 +1,121 @@
+"""
+Bounded store for per-session chatbot state.
+
+Sessions are kept in least-recently-used order. A session idle for longer
+than the TTL is dropped the next time the store is touched, and when the
+store is full the least recently used session makes room for a new one, so
+memory stays bounded however many distinct clients connect.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+S = TypeVar('S')
+
+
+class SessionStore(Generic[S]):
+    """LRU + idle-TTL map from session id to a session object built by factory"""
+
+    def __init__(self, factory: Callable[[], S], max_sessions: int = 10000, ttl_seconds: float = 1800.0,
+                 sizer: Callable[[S], int] = sys.getsizeof, clock: Callable[[], float] = time.monotonic,
+                 on_evict: Optional[Callable[[S], Any]] = None):
+        if max_sessions < 1:
+            raise ValueError("max_sessions must be at least 1")
+        self.factory = factory
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.sizer = sizer
+        self.clock = clock
+        self.on_evict = on_evict
+        # session id -> (session, last access time), oldest access first
+        self._sessions: 'OrderedDict[str, Tuple[S, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def get(self, session_id: str) -> S:
+        """Return the session for session_id, creating it if needed"""
+        now = self.clock()
+        with self._lock:
+            dropped = self._expire(now)
+            entry = self._sessions.pop(session_id, None)
+            if entry is None:
+                if len(self._sessions) >= self.max_sessions:
+                    dropped.append(self._sessions.popitem(last=False)[1][0])
+                    self.evicted += 1
+                session = self.factory()
+                self.created += 1
+            else:
+                session = entry[0]
+            self._sessions[session_id] = (session, now)
+        self._dropped(dropped)
+        return session
+
+    def peek(self, session_id: str) -> Optional[S]:
+        """Return an existing session without creating it or refreshing its TTL"""
+        with self._lock:
+            dropped = self._expire(self.clock())
+            entry = self._sessions.get(session_id)
+        self._dropped(dropped)
+        return entry[0] if entry else None
+
+    def discard(self, session_id: str) -> bool:
+        """Forget a session; returns whether it existed"""
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+        if entry is None:
+            return False
+        self._dropped([entry[0]])
+        return True
+
+    def clear(self):
+        """Drop every session, passing each to on_evict"""
+        with self._lock:
+            dropped = [session for session, _ in self._sessions.values()]
+            self._sessions.clear()
+        self._dropped(dropped)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: object) -> bool:
+        return session_id in self._sessions
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters and the approximate memory held by live sessions"""
+        with self._lock:
+            dropped = self._expire(self.clock())
+            sessions = [session for session, _ in self._sessions.values()]
+        self._dropped(dropped)
+        return {
+            'sessions': len(sessions),
+            'max_sessions': self.max_sessions,
+            'ttl_seconds': self.ttl_seconds,
+            'created': self.created,
+            'evicted': self.evicted,
+            'expired': self.expired,
+            'memory_bytes': sum(self.sizer(session) for session in sessions),
+        }
+
+    def _expire(self, now: float) -> List[S]:
+        # Entries are ordered by last access, so expired ones sit at the front
+        deadline = now - self.ttl_seconds
+        expired = []
+        while self._sessions:
+            session_id, (session, last_seen) = next(iter(self._sessions.items()))
+            if last_seen > deadline:
+                break
+            del self._sessions[session_id]
+            expired.append(session)
+            self.expired += 1
+        return expired
+
+    def _dropped(self, sessions: List[S]):
+        # Called outside the lock, so a slow hook never blocks other requests
+        if self.on_evict is not None:
+            for session in sessions:
+                self.on_evict(session)
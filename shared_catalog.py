@@ -0,0 +1,79 @@
+"""
+A game catalog bundled with the indexes built over it.
+
+A SharedCatalog is read-only once built, so one instance can back any
+number of GameChatbot objects, and a snapshot of it can be memory-mapped by
+several worker processes at once. Catalog changes build a new SharedCatalog,
+see catalog_reload.
+"""
+
+import threading
+from typing import Dict, List, Optional
+
+from catalog_snapshot import read_snapshot, write_snapshot
+from game_catalog import GameCatalog
+from game_index import CatalogIndex
+from game_scoring import ScoringEngine
+from intent_matcher import IntentMatcher
+from response_renderer import ResponseRenderer
+from similar_games import SimilarGamesIndex
+from title_search import TitleIndex
+
+
+class SharedCatalog:
+    """Catalog with its facet index, title index, matcher, answer cache and scorer"""
+
+    def __init__(self, catalog: GameCatalog, index: Optional[CatalogIndex] = None,
+                 titles: Optional[TitleIndex] = None, similar: Optional[SimilarGamesIndex] = None,
+                 matcher: Optional[IntentMatcher] = None):
+        self.catalog = catalog
+        self.index = index if index is not None else CatalogIndex(catalog)
+        self.titles = titles if titles is not None else TitleIndex(catalog.names)
+        self.matcher = matcher if matcher is not None else IntentMatcher(catalog.genres, catalog.features)
+        self.renderer = ResponseRenderer(catalog, self.index)
+        self.scorer = ScoringEngine(catalog)
+        self._similar = similar
+        self._similar_lock = threading.Lock()
+        self._digest: Optional[str] = None
+
+    @property
+    def similar(self) -> SimilarGamesIndex:
+        """
+        Similar-games table, built on first use since it is the slowest index
+        to build. Concurrent first uses wait for one build rather than each
+        making their own
+        """
+        if self._similar is None:
+            with self._similar_lock:
+                if self._similar is None:
+                    self._similar = SimilarGamesIndex(self.catalog)
+        return self._similar
+
+    @property
+    def similar_built(self) -> bool:
+        return self._similar is not None
+
+    @property
+    def digest(self) -> str:
+        """Digest of the catalog's content, computed on first use"""
+        if self._digest is None:
+            self._digest = self.catalog.digest()
+        return self._digest
+
+    @property
+    def digest_built(self) -> bool:
+        return self._digest is not None
+
+    @classmethod
+    def from_games_db(cls, games_db: Dict[str, List[Dict]]) -> 'SharedCatalog':
+        """Build the catalog and all of its indexes from the genre -> games layout"""
+        return cls(GameCatalog.from_games_db(games_db))
+
+    @classmethod
+    def load(cls, path: str) -> 'SharedCatalog':
+        """Memory-map a snapshot written by save()"""
+        return cls(*read_snapshot(path))
+
+    def save(self, path: str):
+        """Write a binary snapshot that other processes can load()"""
+        write_snapshot(path, self.catalog, self.index, self.titles, self.similar)
@@ -0,0 +1,243 @@
+"""
+Precomputed nearest-neighbour table for "games similar to X".
+
+Each game is described by a content vector over its features, genre,
+platforms and playtime, and two games are compared by the cosine of their
+vectors. The NEIGHBOURS most similar games of every game are kept in a flat
+table, best first, so answering "similar to X" is one slice of that table.
+
+Comparing every pair of games would cost O(N^2). Candidates instead come
+from inverted lists, tried from the most to the least specific key: the
+genre plus a pair of features, a pair of features, a single feature and
+finally the genre alone. A wider key is only used while there are fewer
+candidates than NEIGHBOURS, and at most MAX_CANDIDATES are scored.
+
+Games are indexed one at a time against the games indexed before them, and
+each new game is also offered to its candidates' tables, so adding a title
+costs one candidate scan instead of a rebuild. Removing a game clears it
+from every row; rows it leaves short are only refilled as later games are
+offered to them.
+"""
+
+from array import array
+from itertools import combinations
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+from game_catalog import GameCatalog
+
+NEIGHBOURS = 10
+MAX_CANDIDATES = 256
+EMPTY = 0xFFFFFFFF
+
+# Weight of one shared token of each kind in the content vector
+FEATURE_WEIGHT = 1.0
+GENRE_WEIGHT = 1.0
+PLATFORM_WEIGHT = 0.5
+PLAYTIME_WEIGHT = 0.5
+
+
+class SimilarGamesIndex:
+    """Top-N most similar games for every game of a catalog"""
+
+    def __init__(self, catalog: GameCatalog, neighbours: int = NEIGHBOURS, max_candidates: int = MAX_CANDIDATES):
+        self.catalog = catalog
+        self.neighbours = neighbours
+        self.max_candidates = max_candidates
+        # Row i of the table is neighbour_ids/neighbour_scores[i * neighbours:(i + 1) * neighbours]
+        self.neighbour_ids = array('I')
+        self.neighbour_scores = array('f')
+        self.indexed = 0
+        self._feature_masks: List[int] = []
+        self._norms = array('d')
+        self._postings: Dict[Hashable, array] = {}
+        self.update()
+
+    @classmethod
+    def from_table(cls, catalog: GameCatalog, neighbour_ids: Sequence[int], neighbour_scores: Sequence[float],
+                   neighbours: int) -> 'SimilarGamesIndex':
+        """Wrap a table built earlier, e.g. loaded from a snapshot; it cannot be extended"""
+        index = cls.__new__(cls)
+        index.catalog = catalog
+        index.neighbours = neighbours
+        index.max_candidates = 0
+        index.neighbour_ids, index.neighbour_scores = neighbour_ids, neighbour_scores
+        index.indexed = len(neighbour_ids) // neighbours
+        index._feature_masks = []
+        index._norms = array('d')
+        index._postings = None
+        return index
+
+    @property
+    def read_only(self) -> bool:
+        """True for a table loaded from a snapshot, which cannot be updated"""
+        return self._postings is None
+
+    def similar(self, game_id: int, count: Optional[int] = None) -> List[int]:
+        """Ids of the games most similar to game_id, best first"""
+        if self.indexed < len(self.catalog):
+            self.update()
+        start = game_id * self.neighbours
+        row = self.neighbour_ids[start:start + min(count or self.neighbours, self.neighbours)]
+        return [neighbour for neighbour in row if neighbour != EMPTY]
+
+    def similarity(self, first: int, second: int) -> float:
+        """Cosine similarity of two games' content vectors"""
+        catalog = self.catalog
+        return self._dot(first, self._feature_mask(first), catalog.genre_codes[first],
+                         catalog.platform_masks[first], catalog.playtime_codes[first], second) / (
+            self._norm(first) * self._norm(second))
+
+    def update(self):
+        """Index the games added to the catalog since the last update"""
+        self._check_mutable()
+        for game_id in range(self.indexed, len(self.catalog)):
+            self.insert(game_id)
+
+    def copy(self, catalog: GameCatalog) -> 'SimilarGamesIndex':
+        """Mutable copy of the table, over a copy of the catalog it describes"""
+        self._check_mutable()
+        index = SimilarGamesIndex.__new__(SimilarGamesIndex)
+        index.catalog = catalog
+        index.neighbours = self.neighbours
+        index.max_candidates = self.max_candidates
+        index.neighbour_ids = array('I', self.neighbour_ids)
+        index.neighbour_scores = array('f', self.neighbour_scores)
+        index.indexed = self.indexed
+        index._feature_masks = list(self._feature_masks)
+        index._norms = array('d', self._norms)
+        index._postings = {key: array('I', posting) for key, posting in self._postings.items()}
+        return index
+
+    def insert(self, game_id: int):
+        """Index a game: the next id, or one freed by remove() after its catalog row changed"""
+        self._check_mutable()
+        catalog = self.catalog
+        mask = self._compute_mask(game_id)
+        genre, platforms, playtime = (catalog.genre_codes[game_id], catalog.platform_masks[game_id],
+                                      catalog.playtime_codes[game_id])
+        if game_id == self.indexed:
+            self._feature_masks.append(mask)
+            self._norms.append(self._compute_norm(game_id, mask))
+            self.neighbour_ids.extend([EMPTY] * self.neighbours)
+            self.neighbour_scores.extend([0.0] * self.neighbours)
+            self.indexed += 1
+        else:
+            self._feature_masks[game_id] = mask
+            self._norms[game_id] = self._compute_norm(game_id, mask)
+        norm = self._norms[game_id]
+
+        tiers = self._keys(mask, genre)
+        scored = []
+        for candidate in self._candidates(tiers):
+            score = self._dot(game_id, mask, genre, platforms, playtime, candidate) / (norm * self._norms[candidate])
+            if score > 0:
+                scored.append((score, candidate))
+                # Similarity is symmetric, so the new game may belong in the candidate's row too
+                self._offer(candidate, game_id, score)
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        for score, candidate in scored[:self.neighbours]:
+            self._offer(game_id, candidate, score)
+
+        for keys in tiers:
+            for key in keys:
+                self._postings.setdefault(key, array('I')).append(game_id)
+
+    def remove(self, game_id: int):
+        """
+        Drop a game from the table; call before its catalog row changes.
+        Removing the last indexed id also releases its row
+        """
+        self._check_mutable()
+        for keys in self._keys(self._feature_masks[game_id], self.catalog.genre_codes[game_id]):
+            for key in keys:
+                self._postings[key].remove(game_id)
+        ids, scores = self.neighbour_ids, self.neighbour_scores
+        position = 0
+        while True:
+            try:
+                position = ids.index(game_id, position)
+            except ValueError:
+                break
+            # Close the gap in that row
+            end = position - position % self.neighbours + self.neighbours
+            ids[position:end - 1] = ids[position + 1:end]
+            scores[position:end - 1] = scores[position + 1:end]
+            ids[end - 1] = EMPTY
+            scores[end - 1] = 0.0
+        start = game_id * self.neighbours
+        if game_id == self.indexed - 1:
+            del ids[start:], scores[start:], self._feature_masks[game_id], self._norms[game_id]
+            self.indexed -= 1
+        else:
+            ids[start:start + self.neighbours] = array('I', [EMPTY] * self.neighbours)
+            scores[start:start + self.neighbours] = array('f', [0.0] * self.neighbours)
+
+    def _check_mutable(self):
+        if self.read_only:
+            raise TypeError("Cannot change a similar-games table loaded from a snapshot")
+
+    def _keys(self, mask: int, genre: int) -> Tuple[List[Hashable], ...]:
+        features = [code for code in range(mask.bit_length()) if mask >> code & 1]
+        pairs = list(combinations(features, 2))
+        return ([('genre', genre) + pair for pair in pairs], pairs, [(code,) for code in features],
+                [('genre', genre)])
+
+    def _candidates(self, tiers) -> List[int]:
+        postings = self._postings
+        seen = set()
+        for keys in tiers:
+            # A wider tier is only used while there are too few candidates
+            if len(seen) >= self.neighbours:
+                break
+            for posting in sorted((postings[key] for key in keys if key in postings), key=len):
+                seen.update(posting[:self.max_candidates - len(seen)])
+                if len(seen) >= self.max_candidates:
+                    return sorted(seen)
+        return sorted(seen)
+
+    def _offer(self, game_id: int, neighbour: int, score: float):
+        """Insert neighbour into game_id's row if it beats the row's last entry"""
+        ids, scores = self.neighbour_ids, self.neighbour_scores
+        start = game_id * self.neighbours
+        end = start + self.neighbours
+        if ids[end - 1] != EMPTY and score <= scores[end - 1]:
+            return
+        position = start
+        while position < end and ids[position] != EMPTY and scores[position] >= score:
+            position += 1
+        ids[position + 1:end] = ids[position:end - 1]
+        scores[position + 1:end] = scores[position:end - 1]
+        ids[position] = neighbour
+        scores[position] = score
+
+    def _dot(self, game_id: int, mask: int, genre: int, platforms: int, playtime: int, other: int) -> float:
+        catalog = self.catalog
+        dot = (mask & self._feature_mask(other)).bit_count() * FEATURE_WEIGHT ** 2
+        dot += (catalog.platform_masks[other] & platforms).bit_count() * PLATFORM_WEIGHT ** 2
+        if catalog.genre_codes[other] == genre:
+            dot += GENRE_WEIGHT ** 2
+        if catalog.playtime_codes[other] == playtime:
+            dot += PLAYTIME_WEIGHT ** 2
+        return dot
+
+    def _feature_mask(self, game_id: int) -> int:
+        if game_id < len(self._feature_masks):
+            return self._feature_masks[game_id]
+        return self._compute_mask(game_id)
+
+    def _norm(self, game_id: int) -> float:
+        if game_id < len(self._norms):
+            return self._norms[game_id]
+        return self._compute_norm(game_id, self._compute_mask(game_id))
+
+    def _compute_mask(self, game_id: int) -> int:
+        catalog = self.catalog
+        mask = 0
+        for code in catalog.feature_ids[catalog.feature_offsets[game_id]:catalog.feature_offsets[game_id + 1]]:
+            mask |= 1 << code
+        return mask
+
+    def _compute_norm(self, game_id: int, mask: int) -> float:
+        squared = (mask.bit_count() * FEATURE_WEIGHT ** 2 + GENRE_WEIGHT ** 2
+                   + self.catalog.platform_masks[game_id].bit_count() * PLATFORM_WEIGHT ** 2 + PLAYTIME_WEIGHT ** 2)
+        return squared ** 0.5
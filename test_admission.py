@@ -0,0 +1,31 @@
+"""
+Tests for admission control of chat requests
+"""
+
+import pytest
+
+from admission import AdmissionControl, Overloaded, RateLimited, TokenBucket
+
+
+def test_token_bucket_refills_at_its_rate():
+    bucket = TokenBucket(rate=2, burst=3, now=0.0)
+    assert [bucket.take(1, 0.0) for _ in range(3)] == [0, 0, 0]
+    assert bucket.take(1, 0.0) == pytest.approx(0.5)
+    assert bucket.take(1, 0.5) == 0
+    assert bucket.take(2, 10.0) == 0 and bucket.tokens == 1  # refilled to the burst only
+
+
+def test_cap_and_rate_limit_are_checked_per_request():
+    admission = AdmissionControl(max_in_flight=2, rate=1, burst=2)
+    admission.acquire("alice")
+    admission.acquire("alice")
+    with pytest.raises(Overloaded):
+        admission.acquire("bob")
+    admission.release()
+    admission.release()
+    # bob was turned away for load, not charged; alice's bucket is empty
+    admission.acquire("bob", cost=5)
+    with pytest.raises(RateLimited) as raised:
+        admission.acquire("alice")
+    assert raised.value.retry_after == 1
+    assert admission.stats()['in_flight'] == 1 and admission.stats()['admitted'] == 3
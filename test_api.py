@@ -0,0 +1,248 @@
+"""
+Tests for the REST API
+"""
+
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient
+
+import api
+from admission import AdmissionControl
+from catalog_reload import CatalogManager
+from game_chatbot import DEFAULT_GAMES_DB, default_catalog
+from profile_store import ProfileStore, default_profile
+from request_profiler import RequestProfiler
+from shared_catalog import SharedCatalog
+
+HEADERS = {"X-API-Key": api.API_KEY}
+
+
+@pytest.fixture
+def client():
+    return TestClient(api.app)
+
+
+def test_sessions_keep_separate_history(client):
+    first = client.post("/chat", json={"message": "Hello!"}, headers={**HEADERS, "X-Session-ID": "alice"})
+    client.post("/chat", json={"message": "Review Portal 2"}, headers={**HEADERS, "X-Session-ID": "alice"})
+    client.post("/chat", json={"message": "Hello!"}, headers={**HEADERS, "X-Session-ID": "bob"})
+
+    assert first.headers["X-Session-ID"] == "alice"
+    assert len(api.sessions.peek("alice").conversation_history) == 4
+    assert len(api.sessions.peek("bob").conversation_history) == 2
+    assert api.sessions.peek("alice").shared_catalog is api.sessions.peek("bob").shared_catalog
+
+
+def test_new_clients_get_a_session_cookie(client):
+    response = client.post("/chat", json={"message": "Hello!"}, headers=HEADERS)
+    session_id = response.headers["X-Session-ID"]
+    assert response.cookies.get("session_id") == session_id
+
+    stats = client.get("/sessions/stats", headers=HEADERS).json()
+    assert stats["sessions"] >= 1 and stats["memory_bytes"] > 0
+
+
+def test_cache_stats_count_rendered_answers(client):
+    for _ in range(2):
+        client.post("/chat", json={"message": "Review Portal 2"}, headers=HEADERS)
+
+    stats = client.get("/cache/stats", headers=HEADERS).json()
+    assert stats["hits"] >= 1 and stats["entries"] >= 1
+    assert client.get("/matcher/stats", headers=HEADERS).json()["hits"] >= 1
+
+
+def test_batch_chat_answers_in_order(client):
+    messages = ["Hello!", "Review Portal 2", "Review Portal 2"]
+    response = client.post("/chat/batch", json={"messages": messages}, headers={**HEADERS, "X-Session-ID": "batch"})
+
+    responses = response.json()["responses"]
+    assert len(responses) == 3 and responses[1] == responses[2]
+    assert len(api.sessions.peek("batch").conversation_history) == 6
+
+
+def test_batch_chat_rejects_oversized_batches(client):
+    messages = ["Hello!"] * (api.BATCH_MAX + 1)
+    assert client.post("/chat/batch", json={"messages": messages}, headers=HEADERS).status_code == 422
+
+
+def test_stream_sends_one_event_per_game(client):
+    with client.stream("POST", "/chat/stream", json={"message": "Give me puzzle games"},
+                       headers={**HEADERS, "X-Session-ID": "stream"}) as response:
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = [block for block in response.read().decode().split("\n\n") if block]
+
+    assert events[-1] == "event: done\ndata: {}"
+    chunks = [json.loads(event[len("data: "):])["text"] for event in events[:-1]]
+    assert len(chunks) == 4  # header, two puzzle games, footer
+    assert api.sessions.peek("stream").conversation_history[-1] == ('bot', "".join(chunks))
+
+
+def test_chat_beyond_the_rate_limit_or_the_cap_is_turned_away(client, monkeypatch):
+    monkeypatch.setattr(api, "admission", AdmissionControl(max_in_flight=2, rate=0.5, burst=3))
+    answers = [client.post(path, json={"message": "Hello!"}, headers=HEADERS)
+               for path in ("/chat", "/chat/stream", "/chat", "/chat")]
+    assert [answer.status_code for answer in answers] == [200, 200, 200, 429]
+    assert int(answers[3].headers["Retry-After"]) >= 1
+
+    api.admission.acquire("another client")
+    api.admission.acquire("another client")
+    busy = client.post("/chat/batch", json={"messages": ["Hello!"]}, headers=HEADERS)
+    assert busy.status_code == 503 and busy.headers["Retry-After"] == "1"
+    stats = client.get("/admission/stats", headers=HEADERS).json()
+    # The stream gave its slot back once it was sent
+    assert stats["rate_limited"] == 1 and stats["overloaded"] == 1 and stats["in_flight"] == 2
+
+
+def test_profiles_outlive_sessions(client, tmp_path, monkeypatch):
+    store = ProfileStore(str(tmp_path / "profiles.db"))
+    monkeypatch.setattr(api, "profiles", store)
+    on_event_loop = []
+
+    def get(user_id):
+        try:
+            asyncio.get_running_loop()
+            on_event_loop.append(user_id)
+        except RuntimeError:
+            pass
+        return ProfileStore.get(store, user_id)
+
+    monkeypatch.setattr(store, "get", get)
+    headers = {**HEADERS, "X-Session-ID": "profiled"}
+    client.post("/chat", json={"message": "Any racing games for Xbox?"}, headers=headers)
+    api.sessions.discard("profiled")
+
+    profile = client.get("/profile", headers=headers).json()
+    assert profile["favorite_genres"] == ["racing"] and profile["preferred_platforms"] == ["Xbox"]
+    assert "profiled" not in api.sessions
+    assert client.get("/profile", headers={**HEADERS, "X-Session-ID": "stranger"}).json() == default_profile()
+    assert "stranger" not in api.sessions
+    # Profiles may come from disk, which must not block the event loop
+    assert on_event_loop == []
+    api.profiles.close()
+    assert api.profiles.stats()["rows_written"] == 1
+
+
+def test_catalog_delta_is_live_for_existing_sessions(client, monkeypatch):
+    monkeypatch.setattr(api, "catalog_manager", CatalogManager(default_catalog()))
+    monkeypatch.setattr(api, "ADMIN_TOKEN", "admin-only")
+    admin = {"X-Admin-Token": "admin-only"}
+    headers = {**HEADERS, "X-Session-ID": "catalog"}
+    client.post("/chat", json={"message": "Hello!"}, headers=headers)
+
+    delta = {"base_version": 0, "changes": [{"op": "remove", "name": "Portal 2"}]}
+    assert client.post("/admin/catalog/delta", json=delta, headers=HEADERS).status_code == 401
+    assert client.post("/admin/catalog/delta", json=delta, headers=admin).json()["version"] == 1
+    assert client.post("/admin/catalog/delta", json=delta, headers=admin).status_code == 409
+    assert "Portal 2" not in client.post("/chat", json={"message": "Give me puzzle games"}, headers=headers).text
+    assert client.post("/admin/catalog/reload", headers=admin).status_code == 409
+
+
+def test_catalog_admin_is_off_without_a_token(client, monkeypatch):
+    monkeypatch.setattr(api, "ADMIN_TOKEN", None)
+    assert client.get("/admin/catalog", headers={**HEADERS, "X-Admin-Token": ""}).status_code == 403
+
+
+def test_games_are_paged_and_revalidated(client, monkeypatch):
+    monkeypatch.setattr(api, "catalog_manager", CatalogManager(default_catalog()))
+    query = {"genre": "puzzle", "min_rating": 8, "limit": 1}
+    first = client.get("/games", params=query, headers=HEADERS)
+    names = [game["name"] for game in first.json()["games"]]
+    cursor = first.json()["next_cursor"]
+    while cursor:
+        page = client.get("/games", params={**query, "cursor": cursor}, headers=HEADERS).json()
+        names += [game["name"] for game in page["games"]]
+        cursor = page["next_cursor"]
+
+    catalog = api.catalog_manager.current.catalog
+    expected = api.catalog_manager.current.index.top_k({"genres": ["puzzle"]}, 100)
+    assert len(names) > 1 and names == [catalog.names[i] for i in expected if catalog.ratings[i] >= 8]
+    assert client.get("/games", params={"cursor": "not a cursor"}, headers=HEADERS).status_code == 400
+
+    # Unchanged pages revalidate with 304; a catalog update changes the tag
+    etag = first.headers["ETag"]
+    assert client.get("/games", params=query, headers={**HEADERS, "If-None-Match": etag}).status_code == 304
+    api.catalog_manager.apply([{"op": "remove", "name": "Portal 2"}])
+    changed = client.get("/games", params=query, headers={**HEADERS, "If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+    assert "Portal 2" not in changed.text
+    # Removing a game renumbers another, so older cursors are refused
+    assert client.get("/games", params={**query, "cursor": first.json()["next_cursor"]},
+                      headers=HEADERS).status_code == 409
+
+    # The same content gets the same tag in a fresh process, whose version is 0 again
+    monkeypatch.setattr(api, "catalog_manager", CatalogManager(SharedCatalog(default_catalog().catalog)))
+    assert client.get("/games", params=query, headers={**HEADERS, "If-None-Match": etag}).status_code == 304
+
+
+def test_metrics_are_exposed_in_prometheus_format(client):
+    client.post("/chat", json={"message": "Review Portal 2"}, headers=HEADERS)
+    client.get("/no-such-page")
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'http_request_duration_seconds_count{method="POST",route="/chat",status="200"}' in response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="unmatched",status="404"}' in response.text
+    assert 'chatbot_handler_duration_seconds_bucket{intent="review",handler="handle_review",le="+Inf"}' \
+        in response.text
+
+
+def test_requests_with_the_profile_token_are_profiled(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(api, "profiler", RequestProfiler(str(tmp_path)))
+    monkeypatch.setattr(api, "PROFILE_TOKEN", "let-me-see")
+
+    plain = client.post("/chat", json={"message": "Review Portal 2"}, headers={**HEADERS, "X-Profile-Token": "guess"})
+    profiled = client.post("/chat", json={"message": "Review Portal 2"},
+                           headers={**HEADERS, "X-Profile-Token": "let-me-see"})
+
+    assert "X-Profile-ID" not in plain.headers
+    report_id = profiled.headers["X-Profile-ID"]
+    assert profiled.json() == plain.json()
+    # Client API keys cannot read reports, and reports leave the message out
+    assert client.get("/admin/profiles", headers=HEADERS).status_code == 401
+    reader = {"X-Profile-Token": "let-me-see"}
+    listing = client.get("/admin/profiles", headers=reader).json()
+    assert listing["enabled"] and [report["id"] for report in listing["reports"]] == [report_id]
+    report = client.get(f"/admin/profiles/{report_id}", headers=reader)
+    assert report.json()["reason"] == "requested" and "Review Portal 2" not in report.text
+    assert client.get(f"/admin/profiles/{report_id}/pstats", headers=reader).content
+    assert client.get("/admin/profiles/nope", headers=reader).status_code == 404
+
+
+def test_readiness_waits_for_the_catalog(client, monkeypatch):
+    monkeypatch.setattr(api, "catalog_manager", None)
+    monkeypatch.setattr(api, "catalog_error", None)
+    assert client.get("/health").json() == {"status": "ok", "catalog": "warming"}
+    assert client.get("/ready").status_code == 503
+
+    # The first request that needs the catalog builds it rather than failing
+    assert client.post("/chat", json={"message": "Review Portal 2"}, headers=HEADERS).status_code == 200
+    ready = client.get("/ready")
+    assert ready.status_code == 200 and ready.json()["status"] == "ready"
+
+
+def test_warm_up_builds_the_similar_games_table(monkeypatch):
+    monkeypatch.setattr(api, "catalog_manager", None)
+    monkeypatch.setattr(api, "catalog_error", None)
+    # A catalog of its own, since the bundled one is shared by the whole process
+    shared = SharedCatalog.from_games_db(DEFAULT_GAMES_DB)
+    monkeypatch.setattr(api, "load_catalog_manager", lambda: CatalogManager(shared))
+    api.warm_up()
+    assert api.catalog_manager.current.similar_built
+
+
+def test_a_broken_catalog_file_fails_readiness(client, monkeypatch, tmp_path):
+    monkeypatch.setattr(api, "catalog_manager", None)
+    monkeypatch.setattr(api, "catalog_error", None)
+    monkeypatch.setattr(api, "CATALOG_FILE", str(tmp_path / "missing.json"))
+
+    assert client.post("/chat", json={"message": "Hello!"}, headers=HEADERS).status_code == 503
+    ready = client.get("/ready")
+    assert ready.status_code == 503 and ready.json()["status"] == "failed"
+    assert "missing.json" in ready.json()["error"]
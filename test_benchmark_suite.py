@@ -0,0 +1,35 @@
+"""
+Tests for the benchmark suite and its baseline check
+"""
+
+import copy
+
+from benchmarks.suite import compare, run_suite
+from benchmarks.synthetic import synthetic_messages
+
+
+def test_suite_times_every_hot_path():
+    results = run_suite([100], messages=40, repeats=1)
+
+    benchmarks = results['results']['100']['benchmarks']
+    assert set(benchmarks) == {'detect_intent', 'extract_game_preferences', 'get_game_recommendations',
+                               'handle_game_info', 'generate_response'}
+    assert benchmarks['detect_intent']['calls'] == 40
+    assert all(0 < timings['best_us'] <= timings['p99_us'] * 1.01 for timings in benchmarks.values())
+    assert synthetic_messages(['Portal 2'], 40) == synthetic_messages(['Portal 2'], 40)
+
+
+def test_compare_flags_slowdowns_beyond_the_tolerance():
+    baseline = {'results': {'1000': {'benchmarks': {
+        'detect_intent': {'best_us': 10.0}, 'handle_game_info': {'best_us': 0.5}}}}}
+    current = copy.deepcopy(baseline)
+    timings = current['results']['1000']['benchmarks']
+    timings['detect_intent']['best_us'] = 14.0
+    timings['handle_game_info']['best_us'] = 1.2
+    timings['generate_response'] = {'best_us': 100.0}
+
+    assert compare(current, baseline, tolerance=0.5) == []
+    # Only detect_intent: handle_game_info is within the timer's noise floor
+    # and generate_response has no baseline to compare with
+    regressions = compare(current, baseline, tolerance=0.25)
+    assert len(regressions) == 1 and regressions[0].startswith('detect_intent at 1,000 titles')
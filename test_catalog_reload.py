@@ -0,0 +1,95 @@
+"""
+Tests for hot catalog reloads and delta updates
+"""
+
+import random
+
+import pytest
+
+from benchmarks.synthetic import iter_synthetic_games, synthetic_games_db
+from catalog_reload import CatalogManager, VersionConflict, apply_changes, write_catalog_file
+from game_chatbot import DEFAULT_GAMES_DB, GameChatbot
+from game_index import CatalogIndex
+from shared_catalog import SharedCatalog
+from title_search import TitleIndex
+
+
+def random_changes(catalog, games, rng: random.Random, count: int):
+    changes, touched = [], set()
+    for step in range(count):
+        name = rng.choice(catalog.names)
+        op = rng.choice(('add', 'update', 'remove'))
+        genre, game = games[rng.randrange(len(games))]
+        if op == 'add':
+            changes.append({'op': 'add', 'genre': genre, 'game': dict(game, name=f"Added {step}")})
+        elif name not in touched:
+            touched.add(name)
+            if op == 'update':
+                game = dict(game, name=f"Updated {step}", rating=round(rng.uniform(5, 10), 1))
+                changes.append({'op': 'update', 'name': name, 'genre': genre, 'game': game})
+            else:
+                changes.append({'op': 'remove', 'name': name})
+    return changes
+
+
+def test_deltas_match_a_full_rebuild():
+    games = list(iter_synthetic_games(300, seed=4))
+    original = SharedCatalog.from_games_db(synthetic_games_db(300, seed=4))
+    original.similar
+    before = [game.to_dict() for game in original.catalog]
+    rng = random.Random(1)
+
+    shared = original
+    for _ in range(20):
+        shared = apply_changes(shared, random_changes(shared.catalog, games, rng, 4))
+
+    assert [game.to_dict() for game in original.catalog] == before
+    index, titles = CatalogIndex(shared.catalog), TitleIndex(shared.catalog.names)
+    for preferences in ({}, {'genres': ['racing']}, {'platforms': ['PC', 'Switch'], 'playtime': 'long'}):
+        assert shared.index.top_k(preferences, 25) == index.top_k(preferences, 25)
+    for name in shared.catalog.names[::5] + ['updated', 'added 3']:
+        assert shared.titles.search(name) == titles.search(name)
+    for game_id in range(len(shared.catalog)):
+        neighbours = shared.similar.similar(game_id)
+        assert game_id not in neighbours and all(other < len(shared.catalog) for other in neighbours)
+
+
+def test_snapshot_catalogs_accept_deltas(tmp_path):
+    path = str(tmp_path / 'catalog.snap')
+    SharedCatalog.from_games_db(DEFAULT_GAMES_DB).save(path)
+    shared = apply_changes(SharedCatalog.load(path), [{'op': 'remove', 'name': 'Portal 2'}])
+
+    assert 'Portal 2' not in shared.catalog.names
+    assert shared.titles.best_match('portal 2') is None
+    assert 'The Witness' in shared.renderer.genre('puzzle')
+
+
+def test_reload_swaps_in_newer_versions(tmp_path):
+    path = str(tmp_path / 'catalog.json')
+    write_catalog_file(path, DEFAULT_GAMES_DB, 1)
+    manager = CatalogManager.from_file(path)
+    bot = GameChatbot(manager)
+    assert "Portal 2" in bot.generate_response("Review Portal 2")
+
+    games_db = {genre: list(games) for genre, games in DEFAULT_GAMES_DB.items()}
+    games_db['puzzle'] = [dict(game, rating=6.5) if game['name'] == 'Portal 2' else game
+                          for game in games_db['puzzle']]
+    write_catalog_file(path, games_db, 1)
+    assert not manager.reload()
+    write_catalog_file(path, games_db, 2)
+    assert manager.reload()
+
+    assert manager.version == 2
+    assert "6.5/10" in bot.generate_response("Review Portal 2")
+
+
+def test_delta_versions_must_move_forward():
+    manager = CatalogManager(SharedCatalog.from_games_db(DEFAULT_GAMES_DB), version=3)
+    game = dict(DEFAULT_GAMES_DB['puzzle'][0], name='Portal 3')
+
+    assert manager.apply([{'op': 'add', 'genre': 'puzzle', 'game': game}], base_version=3) == 4
+    with pytest.raises(VersionConflict):
+        manager.apply([{'op': 'remove', 'name': 'Portal 3'}], base_version=3)
+    with pytest.raises(ValueError):
+        manager.apply([{'op': 'remove', 'name': 'Portal 4'}])
+    assert manager.version == 4 and 'Portal 3' in manager.current.catalog.names
@@ -0,0 +1,33 @@
+"""
+Tests for memory-mapped catalog snapshots
+"""
+
+import pytest
+
+from benchmarks.synthetic import synthetic_games_db
+from game_chatbot import GameChatbot
+from shared_catalog import SharedCatalog
+
+
+def test_snapshot_round_trip(tmp_path):
+    built = SharedCatalog.from_games_db(synthetic_games_db(500, seed=3))
+    path = str(tmp_path / 'catalog.snap')
+    built.save(path)
+    loaded = SharedCatalog.load(path)
+
+    assert len(loaded.catalog) == len(built.catalog)
+    assert [game.to_dict() for game in loaded.catalog] == [game.to_dict() for game in built.catalog]
+    for preferences in ({}, {'genres': ['racing']}, {'platforms': ['Switch', 'PC'], 'playtime': 'long'}):
+        assert loaded.index.top_k(preferences, 10) == built.index.top_k(preferences, 10)
+    name = built.catalog.names[123]
+    assert loaded.titles.search(name) == built.titles.search(name)
+
+
+def test_chatbot_accepts_injected_snapshot(tmp_path):
+    path = str(tmp_path / 'catalog.snap')
+    GameChatbot().shared_catalog.save(path)
+    bot = GameChatbot(SharedCatalog.load(path))
+
+    assert "Portal 2" in bot.generate_response("Review Portal 2")
+    with pytest.raises(TypeError):
+        bot.catalog.add_game('puzzle', {})
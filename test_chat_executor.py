@@ -0,0 +1,60 @@
+"""
+Tests for the bounded chat executor
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from chat_executor import ChatExecutor, QueueFull
+from game_chatbot import GameChatbot
+
+
+@pytest.mark.parametrize('kind', ['thread', 'process'])
+def test_generate_keeps_session_history(kind):
+    executor = ChatExecutor(kind, workers=1)
+    bot = GameChatbot()
+    try:
+        response = asyncio.run(bot.generate_response_async("Review Portal 2", executor))
+    finally:
+        executor.shutdown()
+
+    assert response.startswith("🎮 **Portal 2 Review:**")
+    assert list(bot.conversation_history) == [('user', "Review Portal 2"), ('bot', response)]
+    assert bot.current_context['name'] == 'Portal 2'
+
+
+def test_process_workers_keep_each_sessions_last_game():
+    executor = ChatExecutor('process', workers=1)
+    first, second = GameChatbot(), GameChatbot()
+
+    async def scenario():
+        await first.generate_response_async("Review Portal 2", executor)
+        await second.generate_response_async("Tell me about Hades", executor)
+        return await first.generate_response_async("show me similar games", executor)
+
+    try:
+        response = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+    assert 'Portal 2' in response.split('\n', 1)[0]
+
+
+def test_requests_beyond_max_pending_are_rejected():
+    executor = ChatExecutor('thread', workers=1, max_pending=2)
+    release = threading.Event()
+
+    async def scenario():
+        blocked = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(QueueFull):
+            await executor.run(release.wait)
+        release.set()
+        await asyncio.gather(*blocked)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+    assert executor.stats()['rejected'] == 1 and executor.stats()['completed'] == 2
@@ -70,5 +70,19 @@ def test_chatbot():
     print("=" * 50)
     print("Run 'python demo.py' to start the interactive chat!")
 
+def test_batch_matches_single_responses():
+    """A batch is answered exactly like the same messages sent one at a time"""
+    import random
+
+    messages = ["Hello!", "Review Portal 2", "I want PC games", "Review Portal 2",
+                "Recommend me action games", "Share a gaming tip", "I want PC games", "recommend sports games"]
+    single, batch = GameChatbot(), GameChatbot()
+
+    random.seed(7)
+    expected = [single.generate_response(message) for message in messages]
+    random.seed(7)
+    assert batch.generate_responses(messages) == expected
+    assert list(batch.conversation_history) == list(single.conversation_history)
+
 if __name__ == "__main__":
     test_chatbot()
\ No newline at end of file
@@ -0,0 +1,32 @@
+"""
+Tests for the bounded conversation history
+"""
+
+import json
+
+from conversation_log import ConversationHistory
+
+
+def test_history_keeps_only_recent_messages_but_counts_all():
+    history = ConversationHistory(max_messages=4)
+    for turn in range(5):
+        history.append(('user', f'question {turn}'))
+        history.append(('bot', f'answer {turn}'))
+
+    assert len(history) == 4
+    assert list(history)[0] == ('user', 'question 3')
+    assert history.total == 10
+    assert history.count('user') == 5 and history.count('bot') == 5
+
+
+def test_evicted_messages_are_spilled_in_order(tmp_path):
+    spill = tmp_path / 'history.jsonl'
+    history = ConversationHistory(max_messages=2, spill_path=str(spill))
+    for number in range(5):
+        history.append(('user', str(number)))
+    history.flush()
+
+    records = [json.loads(line) for line in spill.read_text().splitlines()]
+    assert [record['message'] for record in records] == ['0', '1', '2']
+    assert [record['sequence'] for record in records] == [0, 1, 2]
+    assert len({record['conversation'] for record in records}) == 1
@@ -0,0 +1,38 @@
+"""
+Tests for the columnar game catalog
+"""
+
+from game_catalog import GameCatalog
+from game_chatbot import GameChatbot
+
+
+def test_catalog_round_trips_games_db():
+    """Rows expose the same fields as the original game dictionaries"""
+    games_db = {
+        'puzzle': [{
+            'name': 'Portal 2', 'platform': ['PC', 'PlayStation', 'Xbox'], 'rating': 9.5,
+            'year': 2011, 'playtime': 'short', 'description': 'Mind-bending puzzle game',
+            'features': ['puzzle-solving', 'co-op'],
+        }],
+        'indie': [{
+            'name': 'Celeste', 'platform': ['PC', 'Switch'], 'rating': 9.4,
+            'year': 2018, 'playtime': 'short', 'description': 'Challenging platformer',
+            'features': ['platformer'],
+        }],
+    }
+    catalog = GameCatalog.from_games_db(games_db)
+
+    assert len(catalog) == 2
+    assert list(catalog.genres) == ['puzzle', 'indie']
+    celeste = catalog[1]
+    assert celeste['platform'] == ['PC', 'Switch']
+    assert celeste['genre'] == 'indie'
+    assert celeste.to_dict() == dict(games_db['indie'][0], genre='indie')
+    assert [game['name'] for game in catalog.games_in_genre('puzzle')] == ['Portal 2']
+
+
+def test_chatbot_games_db_view():
+    """The legacy games_db view is still available on the chatbot"""
+    bot = GameChatbot()
+    assert sum(len(games) for games in bot.games_db.values()) == len(bot.catalog)
+    assert bot.find_game_by_name('portal')['genre'] == 'puzzle'
@@ -0,0 +1,56 @@
+"""
+Tests for the facet index behind get_game_recommendations
+"""
+
+import itertools
+
+from benchmarks.synthetic import iter_synthetic_games
+from game_catalog import GameCatalog
+from game_index import CatalogIndex
+
+
+def naive_recommendations(catalog, preferences, count):
+    """The filter-then-sort implementation the index replaced"""
+    games = list(catalog)
+    if 'genres' in preferences:
+        games = [game for game in games if game['genre'] in preferences['genres']]
+    if 'platforms' in preferences:
+        games = [game for game in games if any(p in game['platform'] for p in preferences['platforms'])]
+    if 'playtime' in preferences:
+        games = [game for game in games if game['playtime'] == preferences['playtime']]
+    games.sort(key=lambda game: game['rating'], reverse=True)
+    return [game.id for game in games[:count]]
+
+
+def test_top_k_matches_filter_and_sort():
+    catalog = GameCatalog()
+    for genre, game in iter_synthetic_games(2000, seed=7):
+        catalog.add_game(genre, game)
+    index = CatalogIndex(catalog)
+
+    genre_choices = [None, ['puzzle'], ['action', 'racing'], ['unknown']]
+    platform_choices = [None, ['PC'], ['Switch', 'Xbox'], ['Wii U', 'Mobile', 'PC']]
+    playtime_choices = [None, 'short', 'long']
+    for genres, platforms, playtime in itertools.product(genre_choices, platform_choices, playtime_choices):
+        preferences = {}
+        if genres is not None:
+            preferences['genres'] = genres
+        if platforms is not None:
+            preferences['platforms'] = platforms
+        if playtime is not None:
+            preferences['playtime'] = playtime
+        for count in (1, 5, 50):
+            assert index.top_k(preferences, count) == naive_recommendations(catalog, preferences, count)
+
+
+def test_search_resumes_after_a_position():
+    catalog = GameCatalog()
+    for genre, game in iter_synthetic_games(2000, seed=3):
+        catalog.add_game(genre, game)
+    index = CatalogIndex(catalog)
+
+    for facets in [(None, None, None), (['puzzle'], None, None), (None, ['PC', 'Switch'], 'short')]:
+        everything = list(index.search(*facets))
+        for cut in (0, 1, 17, len(everything) - 1):
+            last = everything[cut]
+            assert list(index.search(*facets, after=(catalog.ratings[last], last))) == everything[cut + 1:]
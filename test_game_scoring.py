@@ -0,0 +1,60 @@
+"""
+Tests for graded recommendation scoring
+"""
+
+import pytest
+
+from benchmarks.synthetic import synthetic_games_db
+from game_catalog import GameCatalog
+from game_chatbot import DEFAULT_GAMES_DB, GameChatbot
+from game_scoring import ScoringEngine
+from shared_catalog import SharedCatalog
+
+PREFERENCES = [
+    {},
+    {'genres': ['puzzle'], 'platforms': ['Switch', 'PC'], 'playtime': 'short'},
+    {'platforms': ['Mobile'], 'playtime': 'long', 'features': ['open-world', 'multiplayer']},
+]
+
+
+def test_closest_games_rank_first_without_an_exact_match():
+    catalog = GameCatalog.from_games_db(DEFAULT_GAMES_DB)
+    engine = ScoringEngine(catalog)
+    names = [catalog.names[game_id] for game_id in engine.top_k({'genres': ['puzzle'], 'platforms': ['Switch']}, 3)]
+
+    # No puzzle game runs on Switch: both puzzle games come first, then the best Switch game
+    assert names == ['Portal 2', 'The Witness', 'The Legend of Zelda: Breath of the Wild']
+    assert engine.top_k({}, 2, exclude=[1]) == [3, 7]
+
+
+def test_numpy_and_python_scoring_agree():
+    pytest.importorskip('numpy')
+    catalog = GameCatalog.from_games_db(synthetic_games_db(2000, seed=5))
+    vectorized, looped = ScoringEngine(catalog, use_numpy=True), ScoringEngine(catalog, use_numpy=False)
+
+    for preferences in PREFERENCES:
+        assert vectorized.top_k(preferences, 25) == looped.top_k(preferences, 25)
+        assert list(vectorized.scores(preferences)) == pytest.approx(looped.scores(preferences))
+
+
+def test_scoring_reads_snapshot_columns(tmp_path):
+    built = SharedCatalog.from_games_db(synthetic_games_db(500, seed=3))
+    path = str(tmp_path / 'catalog.snap')
+    built.save(path)
+    loaded = SharedCatalog.load(path)
+
+    for preferences in PREFERENCES:
+        assert loaded.scorer.top_k(preferences, 10) == built.scorer.top_k(preferences, 10)
+
+
+def test_recommendations_are_padded_with_close_matches():
+    bot = GameChatbot()
+    games = bot.get_game_recommendations({'genres': ['indie'], 'platforms': ['Mobile']}, count=3)
+    assert len(games) == 3 and all(game['genre'] == 'indie' for game in games[:2])
+
+
+def test_features_named_in_a_message_steer_recommendations():
+    bot = GameChatbot()
+    assert bot.extract_game_preferences("Recommend roguelike games") == {'features': ['roguelike']}
+    assert bot.get_game_recommendations(bot.extract_game_preferences("Recommend roguelike games"))[0]['name'] == 'Hades'
+    assert bot.scorer.top_k(bot.extract_game_preferences("a roguelike for Switch"), 1) == [bot.titles.best_match('Hades')]
@@ -0,0 +1,39 @@
+"""
+Tests for the container health probe
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import healthcheck
+from healthcheck import main, probe
+
+
+class ReadinessHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200 if self.path == '/ready' else 503)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def test_probe_passes_only_on_200(monkeypatch):
+    server = HTTPServer(('127.0.0.1', 0), ReadinessHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}'
+    try:
+        assert probe(f'{url}/ready') == ''
+        assert '503' in probe(f'{url}/warming')
+        assert main(['healthcheck.py', f'{url}/warming']) == 1
+
+        # Without a setting the probe asks the default URL
+        monkeypatch.delenv('GAME_HEALTH_URL', raising=False)
+        monkeypatch.setattr(healthcheck, 'DEFAULT_URL', f'{url}/warming')
+        assert main(['healthcheck.py']) == 1
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert probe(f'{url}/ready') != ''
+    assert main(['healthcheck.py', '']) == 0
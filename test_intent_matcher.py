@@ -0,0 +1,46 @@
+"""
+Tests for the compiled intent and preference matcher
+"""
+
+from intent_matcher import IntentMatcher
+
+GENRES = ['action', 'adventure', 'strategy', 'puzzle', 'racing', 'indie']
+
+
+def test_keywords_respect_word_boundaries():
+    matcher = IntentMatcher(GENRES)
+    assert matcher.detect_intent("this is cool") == 'general_chat'
+    assert matcher.detect_intent("hi there") == 'greeting'
+    assert matcher.detect_intent("Any recommendations?") == 'recommendation'
+    assert matcher.extract_preferences("epic sagas") == {}
+
+
+def test_analyze_returns_intent_and_preferences():
+    matcher = IntentMatcher(GENRES)
+    intent, preferences = matcher.analyze("Recommend me some SHORT puzzle  games for PC or a ps5")
+    assert intent == 'recommendation'
+    assert preferences == {'genres': ['puzzle'], 'platforms': ['PC', 'PlayStation'], 'playtime': 'short'}
+
+    # Intents keep their priority order regardless of word order
+    assert matcher.detect_intent("hello, tell me about Hades") == 'game_info'
+    assert matcher.detect_intent("what is a good racing game on switch") == 'game_info'
+
+
+def test_analyses_are_cached_by_normalized_message():
+    matcher = IntentMatcher(GENRES)
+    first = matcher.analyze("Recommend me action games")
+    first.preferences['genres'].append('racing')
+
+    assert matcher.normalize("  recommend me, ACTION games!!") == "recommend me action games"
+    assert matcher.analyze("  recommend me, ACTION games!!") == ('recommendation', {'genres': ['action']})
+    assert matcher.analyze("Recommend me action games").preferences == {'genres': ['action']}
+    assert matcher.detect_intent("games, like Hades") == 'similar'
+    stats = matcher.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (2, 2, 0.5)
+
+
+def test_catalog_features_are_extracted():
+    matcher = IntentMatcher(GENRES, ['open-world', 'co-op', 'roguelike', 'racing'])
+    preferences = matcher.extract_preferences("Any open world roguelikes with co-op? Racing too")
+    # racing is a genre, so it is not also counted as a feature
+    assert preferences == {'genres': ['racing'], 'features': ['open-world', 'co-op', 'roguelike']}
@@ -0,0 +1,37 @@
+"""
+Tests for the API load generator
+"""
+
+import asyncio
+from collections import Counter
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from benchmarks.load_test import MessageMix, load_test, parse_mix
+
+
+def test_mix_draws_intents_by_weight():
+    mix = MessageMix(parse_mix("recommendation=3,review=1,tips=0"), ["Portal 2"], seed=1)
+    intents = Counter(mix.next()[0] for _ in range(4000))
+
+    assert set(intents) == {'recommendation', 'review'}
+    assert 2.5 < intents['recommendation'] / intents['review'] < 3.5
+    with pytest.raises(ValueError):
+        parse_mix("recommendation=1,dancing=2")
+
+
+def test_in_process_run_reports_latency_and_errors():
+    report = asyncio.run(load_test(concurrency=4, duration=0.3, warmup=0, sessions=3, label="smoke"))
+    summary = report['summary']
+    assert summary['requests'] > 0 and summary['error_rate'] == 0.0
+    assert 0 < summary['p50_ms'] <= summary['p95_ms'] <= summary['p99_ms'] <= summary['max_ms']
+    assert set(report['intents']) <= {'recommendation', 'game_info', 'review', 'chit_chat'}
+    assert report['server']['executor'] == 'thread'
+
+    rejected = asyncio.run(load_test(rate=50, duration=0.2, warmup=0, api_key="wrong"))
+    assert rejected['summary']['error_rate'] == 1.0
+    assert set(rejected['summary']['statuses']) == {'401'}
+    assert rejected['admitted']['requests'] == 0
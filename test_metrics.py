@@ -0,0 +1,51 @@
+"""
+Tests for the in-process metrics registry
+"""
+
+import pytest
+
+from game_chatbot import FALLBACKS, HANDLER_SECONDS, GameChatbot
+from metrics import Registry
+
+
+def test_histograms_render_cumulative_buckets():
+    registry = Registry()
+    latency = registry.histogram('latency_seconds', "Latency", ('intent',), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, 'review')
+    latency.observe(0.2, 'say "hi"\n')
+
+    lines = registry.render().splitlines()
+    assert lines[:2] == ['# HELP latency_seconds Latency', '# TYPE latency_seconds histogram']
+    assert 'latency_seconds_bucket{intent="review",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{intent="review",le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{intent="review",le="+Inf"} 4' in lines
+    assert 'latency_seconds_sum{intent="review"} 3.65' in lines
+    assert 'latency_seconds_count{intent="review"} 4' in lines
+    assert 'latency_seconds_count{intent="say \\"hi\\"\\n"} 1' in lines
+
+
+def test_counters_and_registration():
+    registry = Registry()
+    misses = registry.counter('misses', "Misses", ('handler',))
+    misses.inc('handle_review')
+    misses.inc('handle_review', amount=2)
+
+    assert 'misses_total{handler="handle_review"} 3' in registry.render()
+    assert registry.counter('misses', "Misses", ('handler',)) is misses
+    with pytest.raises(ValueError):
+        registry.histogram('misses', "Misses", ('handler',))
+    with pytest.raises(ValueError):
+        misses.inc()
+
+
+def test_chatbot_records_handlers_and_fallbacks():
+    bot = GameChatbot()
+    reviews = HANDLER_SECONDS.count('review', 'handle_review')
+    misses = FALLBACKS.value('handle_review', 'title_miss')
+
+    bot.generate_response("Review Portal 2")
+    bot.generate_response("Review that one game I forgot the name of")
+
+    assert HANDLER_SECONDS.count('review', 'handle_review') == reviews + 2
+    assert FALLBACKS.value('handle_review', 'title_miss') == misses + 1
@@ -0,0 +1,97 @@
+"""
+Tests for the SQLite profile store
+"""
+
+from game_chatbot import GameChatbot
+from profile_store import (MAX_REMEMBERED, RESCALE, ProfileStore, default_profile, learn_preferences,
+                           learned_preferences, merge_preferences)
+
+
+def test_profiles_survive_reopening(tmp_path):
+    path = str(tmp_path / 'profiles.db')
+    store = ProfileStore(path, flush_interval=60)
+    profile = default_profile()
+    profile['favorite_genres'].append('puzzle')
+    store.put('alice', profile)
+
+    # Readable before the write-behind flush, and isolated from later changes
+    profile['favorite_genres'].append('racing')
+    assert store.get('alice')['favorite_genres'] == ['puzzle']
+    assert store.stats()['rows_written'] == 0
+    store.close()
+
+    reopened = ProfileStore(path)
+    assert reopened.get('alice')['favorite_genres'] == ['puzzle']
+    assert reopened.get('bob') == default_profile()
+    reopened.close()
+
+
+def test_updates_between_flushes_are_coalesced(tmp_path):
+    store = ProfileStore(str(tmp_path / 'profiles.db'), flush_interval=60)
+    profile = default_profile()
+    for playtime in ('short', 'long', 'medium', 'short'):
+        profile['playtime_preference'] = playtime
+        store.put('alice', profile)
+    store.put('bob', profile)
+    store.flush()
+
+    stats = store.stats()
+    assert (stats['puts'], stats['rows_written'], stats['flushes'], stats['pending']) == (5, 2, 1, 0)
+    store.close()
+
+
+def test_merge_keeps_recent_preferences_last():
+    profile = default_profile()
+    assert merge_preferences(profile, {'genres': ['puzzle', 'racing'], 'playtime': 'short'})
+    assert merge_preferences(profile, {'genres': ['puzzle']})
+    assert not merge_preferences(profile, {'genres': ['puzzle'], 'playtime': 'short'})
+    assert profile['favorite_genres'] == ['racing', 'puzzle']
+
+    for number in range(MAX_REMEMBERED + 5):
+        merge_preferences(profile, {'platforms': [f'platform {number}']})
+    assert len(profile['preferred_platforms']) == MAX_REMEMBERED
+
+
+def test_chatbot_reports_learned_preferences():
+    changes = []
+    bot = GameChatbot()
+    bot.on_preferences_changed = lambda profile: changes.append(dict(profile))
+
+    bot.generate_response("Recommend a short puzzle game for PC")
+    bot.generate_response("Hello!")
+    assert len(changes) == 1
+    assert bot.user_preferences['favorite_genres'] == ['puzzle']
+    assert bot.user_preferences['preferred_platforms'] == ['PC']
+    assert bot.user_preferences['playtime_preference'] == 'short'
+
+
+def test_learned_weights_favour_frequent_and_recent_mentions():
+    profile = default_profile()
+    for genre in ('racing', 'racing', 'racing', 'puzzle'):
+        assert learn_preferences(profile, {'genres': [genre], 'playtime': 'short'})
+    assert not learn_preferences(profile, {})
+    assert learned_preferences(profile) == {'genres': ['racing', 'puzzle'], 'playtime': 'short'}
+
+    learn_preferences(profile, {'genres': ['puzzle']})
+    assert learned_preferences(profile)['genres'] == ['puzzle', 'racing']
+
+    # Old mentions fade out and the weights are rescaled instead of growing without bound
+    for _ in range(100):
+        learn_preferences(profile, {'platforms': ['PC'], 'genres': ['puzzle']})
+    assert profile['weight_scale'] < RESCALE
+    assert set(profile['genre_weights']) == {'puzzle'} and not profile['playtime_weights']
+    assert learned_preferences(profile) == {'genres': ['puzzle'], 'platforms': ['PC']}
+
+
+def test_recommendations_follow_learned_preferences():
+    bot = GameChatbot()
+    assert 'Red Dead Redemption 2' in bot.generate_response("Recommend me a game")
+
+    bot.generate_response("I love puzzle games")
+    response = bot.generate_response("Recommend me a game")
+    assert response.index('Portal 2') < response.index('The Witness') < response.index('Red Dead Redemption 2')
+
+    # What the message asks for wins over what was learned
+    assert 'Forza Horizon 5' in bot.generate_response("Recommend racing games")
+    games = bot.get_game_recommendations({'genres': ['racing']}, count=2, learned=learned_preferences(bot.user_preferences))
+    assert [game['genre'] for game in games] == ['racing', 'racing']
@@ -0,0 +1,49 @@
+"""
+Tests for opt-in request profiling
+"""
+
+import json
+import os
+import pstats
+
+import pytest
+
+from game_chatbot import GameChatbot
+from request_profiler import RequestProfiler
+
+
+def test_profile_reports_functions_and_allocations(tmp_path):
+    profiler = RequestProfiler(str(tmp_path))
+    bot = GameChatbot()
+    response, report_id = profiler.profile(bot.generate_response, "Review Portal 2", message_chars=15)
+
+    assert "Portal 2" in response
+    report = profiler.report(report_id)
+    assert report['message_chars'] == 15 and report['error'] is None
+    assert "Review Portal 2" not in json.dumps(report)
+    assert any('generate_response' in entry['function'] for entry in report['functions'])
+    assert report['allocations'] and report['memory_peak_bytes'] > 0
+    assert pstats.Stats(profiler.path(report_id, '.prof')).total_calls > 0
+    assert [summary['id'] for summary in profiler.reports()] == [report_id]
+
+
+def test_only_the_newest_reports_are_kept(tmp_path):
+    profiler = RequestProfiler(str(tmp_path), max_reports=2)
+    ids = [profiler.profile(sum, [1, 2])[1] for _ in range(4)]
+
+    assert [summary['id'] for summary in profiler.reports()] == ids[:1:-1]
+    assert len(os.listdir(tmp_path)) == 4
+    assert profiler.report(ids[0]) is None
+    assert profiler.report('../secrets') is None
+
+
+def test_overlapping_and_failing_calls(tmp_path):
+    profiler = RequestProfiler(str(tmp_path))
+    # A call arriving while another is profiled runs unprofiled
+    (inner, inner_id), outer_id = profiler.profile(profiler.profile, sum, [1, 2])
+    assert (inner, inner_id) == (3, None) and outer_id is not None
+    assert (profiler.profiled, profiler.skipped) == (1, 1)
+
+    with pytest.raises(ZeroDivisionError):
+        profiler.profile(divmod, 1, 0)
+    assert profiler.reports()[0]['error'].startswith('ZeroDivisionError')
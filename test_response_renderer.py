@@ -0,0 +1,70 @@
+"""
+Tests for the cached response renderer
+"""
+
+from bounded_cache import LRUCache
+from game_chatbot import DEFAULT_GAMES_DB
+from response_renderer import ResponseRenderer
+from shared_catalog import SharedCatalog
+
+
+def test_repeated_blocks_are_served_from_cache():
+    shared = SharedCatalog.from_games_db(DEFAULT_GAMES_DB)
+    renderer = shared.renderer
+    game_id = shared.titles.best_match('Portal 2')
+
+    first = renderer.game_info(game_id)
+    assert renderer.game_info(game_id) is first
+    assert renderer.review(game_id).startswith("🎮 **Portal 2 Review:**")
+    assert renderer.stats()['hits'] == 1
+    assert renderer.stats()['misses'] == 2
+
+
+def test_cache_is_dropped_when_the_catalog_changes():
+    shared = SharedCatalog.from_games_db(DEFAULT_GAMES_DB)
+    before = shared.renderer.genre('puzzle')
+    shared.catalog.add_game('puzzle', {
+        'name': 'Baba Is You', 'platform': ['PC', 'Switch'], 'rating': 8.9, 'year': 2019,
+        'playtime': 'medium', 'description': 'Puzzle game about rewriting the rules', 'features': ['puzzle-solving'],
+    })
+
+    after = shared.renderer.genre('puzzle')
+    assert 'Baba Is You' not in before
+    assert 'Baba Is You' in after
+    assert shared.renderer.stats()['entries'] == 1
+
+
+def test_unknown_genre_is_not_rendered():
+    shared = SharedCatalog.from_games_db(DEFAULT_GAMES_DB)
+    assert shared.renderer.genre('sports') is None
+
+
+def test_streamed_genre_is_cached_once_fully_consumed():
+    shared = SharedCatalog.from_games_db(DEFAULT_GAMES_DB)
+    chunks = shared.renderer.stream_genre('puzzle')
+    first = next(chunks)
+    assert shared.renderer.stats()['entries'] == 0
+
+    full = first + "".join(chunks)
+    assert full == shared.renderer.genre('puzzle')
+    assert list(shared.renderer.stream_genre('puzzle')) == [full]
+
+
+def test_cache_is_bounded_by_characters():
+    cache = LRUCache(100, max_size=10, sizer=len)
+    cache.put('a', 'xxxx')
+    cache.put('b', 'yyyy')
+    cache.put('c', 'zzzz')
+    assert 'a' not in cache and cache.size == 8
+    cache.put('b', 'y' * 11)
+    assert 'b' not in cache and cache.size == 4 and cache.stats()['oversized'] == 1
+
+
+def test_long_listings_are_not_cached():
+    shared = SharedCatalog.from_games_db(DEFAULT_GAMES_DB)
+    puzzle = shared.renderer.genre('puzzle')
+    renderer = ResponseRenderer(shared.catalog, shared.index, max_chars=len(puzzle) * 8)
+
+    assert renderer.genre('puzzle') == puzzle
+    assert renderer.stats()['entries'] == 0
+    assert renderer.game_info(0) and renderer.stats()['size'] == len(renderer.game_info(0))
@@ -0,0 +1,138 @@
+"""
+Tests for the session-affinity router
+"""
+
+import asyncio
+import http.client
+import json
+import textwrap
+
+import pytest
+
+pytest.importorskip("uvicorn")
+
+from session_router import HashRing, SessionRouter
+
+# Stands in for api:app: reports which worker answered and what it was sent
+WORKER_APP = '''
+import asyncio, json, os
+
+deltas = []
+# The first worker sent a "flaky" delta refuses it once
+REFUSED = os.path.join(os.path.dirname(__file__), "refused")
+
+async def app(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    request = (await receive()).get("body", b"")
+    status = 200
+    if scope["path"] == "/admin/catalog/delta":
+        if b"flaky" in request and not os.path.exists(REFUSED):
+            open(REFUSED, "w").close()
+            status = 500
+        else:
+            deltas.append(request.decode())
+            if b"slow" in request:
+                await asyncio.sleep(0.3)
+    headers = dict(scope["headers"])
+    body = json.dumps({"pid": os.getpid(), "session": headers.get(b"x-session-id", b"").decode(),
+                       "updates": len(deltas), "deltas": deltas}).encode()
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]})
+    await send({"type": "http.response.body", "body": body})
+'''
+
+
+def test_ring_moves_only_the_keys_of_a_changed_node():
+    keys = [f"session-{number}" for number in range(5000)]
+    ring = HashRing(["0", "1", "2", "3"])
+    before = {key: ring.node(key) for key in keys}
+    assert set(before.values()) == {"0", "1", "2", "3"}
+
+    ring.remove("2")
+    assert all(ring.node(key) == node for key, node in before.items() if node != "2")
+    ring.add("2")
+    assert {key: ring.node(key) for key in keys} == before
+
+    ring.add("4")
+    moved = [key for key in keys if ring.node(key) != before[key]]
+    assert all(ring.node(key) == "4" for key in moved)
+    assert 0.1 < len(moved) / len(keys) < 0.3
+
+
+def test_sessions_stay_on_one_worker(tmp_path):
+    (tmp_path / "fake_api.py").write_text(textwrap.dedent(WORKER_APP))
+
+    def post(port, path, headers=None, body=b"{}"):
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+        connection.request("POST", path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+
+    async def scenario():
+        router = SessionRouter(2, "fake_api:app", socket_dir=str(tmp_path))
+        router.env["PYTHONPATH"] = str(tmp_path)
+        server = await router.start("127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        call = lambda *args: asyncio.get_running_loop().run_in_executor(None, post, port, *args)
+        try:
+            pids = {}
+            for number in range(20):
+                session = {"X-Session-ID": f"user-{number}"}
+                answers = [await call("/chat", session) for _ in range(3)]
+                assert len({answer["pid"] for _, answer in answers}) == 1
+                pids[f"user-{number}"] = answers[0][1]["pid"]
+            assert len(set(pids.values())) == 2
+
+            # A new session is named by the router, on the worker its name hashes to
+            _, first = await call("/chat")
+            _, again = await call("/chat", {"X-Session-ID": first["session"]})
+            assert first["session"] and again["pid"] == first["pid"]
+
+            # Catalog updates reach every worker
+            assert (await call("/admin/catalog/delta"))[0] == 200
+            assert {answer["updates"] for _, answer in [await call("/profile", {"X-Session-ID": session})
+                                                        for session in pids]} == {1}
+
+            # A worker that dies hands its sessions to the other until it is restarted
+            victim = next(worker for worker in router.workers.values() if worker.process.pid == pids["user-0"])
+            victim.process.kill()
+            victim.process.wait()
+            status, answer = await call("/chat", {"X-Session-ID": "user-0"})
+            assert status == 200 and answer["pid"] != pids["user-0"]
+
+            # ... and gets the catalog updates it missed before it takes them back
+            for _ in range(200):
+                if all(worker["up"] for worker in router.stats()["workers"]):
+                    break
+                await asyncio.sleep(0.05)
+            status, answer = await call("/chat", {"X-Session-ID": "user-0"})
+            assert answer["pid"] == victim.process.pid and answer["updates"] == 1
+            assert router.stats()["requests"] > 60
+
+            # Bodies too large to buffer are refused before they are read
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"POST /chat HTTP/1.1\r\nHost: x\r\nContent-Length: 1000000000\r\n\r\n")
+            assert (await reader.readline()).startswith(b"HTTP/1.1 413")
+            writer.close()
+
+            # Concurrent updates reach every worker in the same order, even when
+            # the first is slower, and a worker that refuses one is sent it again
+            slow = asyncio.ensure_future(call("/admin/catalog/delta", None, b'"slow"'))
+            await asyncio.sleep(0.05)
+            assert (await call("/admin/catalog/delta", None, b'"fast"'))[0] == 200
+            assert (await slow)[0] == 200
+            assert (await call("/admin/catalog/delta", None, b'"flaky"'))[0] == 200
+            for _ in range(200):
+                if all(worker["up"] for worker in router.stats()["workers"]):
+                    break
+                await asyncio.sleep(0.05)
+            answers = [answer for _, answer in [await call("/profile", {"X-Session-ID": session})
+                                                for session in pids]]
+            assert len({answer["pid"] for answer in answers}) == 2
+            assert all(answer["deltas"] == ["{}", '"slow"', '"fast"', '"flaky"'] for answer in answers)
+            assert router.stats()["catalog_updates"] == 4
+        finally:
+            await router.stop()
+
+    asyncio.run(scenario())
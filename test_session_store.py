@@ -0,0 +1,48 @@
+"""
+Tests for the LRU/TTL session store
+"""
+
+from session_store import SessionStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_least_recently_used_session_is_evicted():
+    store = SessionStore(dict, max_sessions=2)
+    first = store.get('a')
+    store.get('b')
+    assert store.get('a') is first  # refreshes 'a'
+    store.get('c')
+
+    assert 'b' not in store
+    assert 'a' in store and 'c' in store
+    assert store.stats()['evicted'] == 1
+
+
+def test_idle_sessions_expire():
+    clock = FakeClock()
+    store = SessionStore(dict, max_sessions=10, ttl_seconds=60, clock=clock)
+    store.get('idle')
+    clock.now = 30
+    store.get('active')
+    clock.now = 70
+
+    assert store.peek('idle') is None
+    assert store.peek('active') is not None
+    assert store.stats()['expired'] == 1
+
+
+def test_dropped_sessions_are_passed_to_on_evict():
+    dropped = []
+    store = SessionStore(dict, max_sessions=1, on_evict=dropped.append)
+    first = store.get('a')
+    second = store.get('b')
+    store.clear()
+
+    assert dropped == [first, second] and len(store) == 0
@@ -0,0 +1,84 @@
+"""
+Tests for the precomputed similar-games table
+"""
+
+import threading
+import time
+
+import pytest
+
+from benchmarks.synthetic import iter_synthetic_games, synthetic_games_db
+from game_catalog import GameCatalog
+from game_chatbot import DEFAULT_GAMES_DB, GameChatbot
+from shared_catalog import SharedCatalog
+from similar_games import SimilarGamesIndex
+
+
+def test_neighbours_share_content_and_are_ranked():
+    catalog = GameCatalog.from_games_db(DEFAULT_GAMES_DB)
+    similar = SimilarGamesIndex(catalog)
+    witcher = catalog.names.index('The Witcher 3: Wild Hunt')
+    neighbours = similar.similar(witcher)
+
+    assert witcher not in neighbours
+    assert catalog.names[neighbours[0]] == 'Cyberpunk 2077'
+    scores = [similar.similarity(witcher, other) for other in neighbours]
+    assert scores == sorted(scores, reverse=True)
+    assert len(similar.similar(witcher, 2)) == 2
+
+
+def test_added_games_match_a_full_rebuild():
+    games = list(iter_synthetic_games(400, seed=11))
+    catalog = GameCatalog()
+    for genre, game in games[:300]:
+        catalog.add_game(genre, game)
+    similar = SimilarGamesIndex(catalog)
+    for genre, game in games[300:]:
+        catalog.add_game(genre, game)
+
+    rebuilt = SimilarGamesIndex(catalog)
+    assert [similar.similar(game_id) for game_id in range(400)] == [rebuilt.similar(game_id) for game_id in range(400)]
+
+
+def test_snapshot_keeps_the_table(tmp_path):
+    built = SharedCatalog.from_games_db(synthetic_games_db(500, seed=3))
+    path = str(tmp_path / 'catalog.snap')
+    built.save(path)
+    loaded = SharedCatalog.load(path)
+
+    assert [loaded.similar.similar(game_id) for game_id in range(500)] == \
+        [built.similar.similar(game_id) for game_id in range(500)]
+    with pytest.raises(TypeError):
+        loaded.similar.update()
+
+
+def test_concurrent_first_uses_build_one_table(monkeypatch):
+    import shared_catalog
+
+    builds = []
+
+    def slow_index(catalog):
+        builds.append(catalog)
+        time.sleep(0.1)
+        return SimilarGamesIndex(catalog)
+
+    monkeypatch.setattr(shared_catalog, "SimilarGamesIndex", slow_index)
+    shared = SharedCatalog.from_games_db(DEFAULT_GAMES_DB)
+    tables = []
+    threads = [threading.Thread(target=lambda: tables.append(shared.similar)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1 and all(table is tables[0] for table in tables)
+
+
+def test_chatbot_answers_similar_games():
+    bot = GameChatbot()
+
+    response = bot.generate_response("Any games similar to Portal 2?")
+    assert "Games Similar to Portal 2" in response
+    assert "The Witness" in response
+    bot.generate_response("Tell me about The Witcher 3")
+    assert "Games Similar to The Witcher 3: Wild Hunt" in bot.generate_response("Yes, more like that please")
@@ -0,0 +1,37 @@
+"""
+Tests for the fuzzy title index
+"""
+
+from title_search import TitleIndex, tokenize
+
+NAMES = [
+    'The Witcher 3: Wild Hunt',
+    'The Legend of Zelda: Breath of the Wild',
+    "Uncharted 4: A Thief's End",
+    'Total War: Warhammer III',
+    'Portal 2',
+    'Hades',
+]
+
+
+def test_tokenize_normalises_titles():
+    assert tokenize("Uncharted 4: A Thief's End") == ['uncharted', '4', 'a', 'thiefs', 'end']
+    assert tokenize('Total War: Warhammer III') == ['total', 'war', 'warhammer', '3']
+
+
+def test_best_match_tolerates_typos_and_ignores_stopwords():
+    index = TitleIndex(NAMES)
+    assert NAMES[index.best_match("tell me about the witchr")] == 'The Witcher 3: Wild Hunt'
+    assert NAMES[index.best_match("what is zleda")] == 'The Legend of Zelda: Breath of the Wild'
+    assert NAMES[index.best_match("warhamer 3 review")] == 'Total War: Warhammer III'
+    assert index.best_match("tell me about the best game of the year") is None
+
+
+def test_search_ranks_candidates_and_supports_incremental_adds():
+    index = TitleIndex(NAMES)
+    results = index.search("breath of the wild hunt")
+    assert [NAMES[match.game_id] for match in results][:2] == [
+        'The Legend of Zelda: Breath of the Wild', 'The Witcher 3: Wild Hunt']
+
+    game_id = index.add('Hades II')
+    assert index.best_match("review hades 2") == game_id
@@ -0,0 +1,287 @@
+"""
+Typo-tolerant title search.
+
+Titles are split into normalised tokens. Every token has a posting list of
+the titles that contain it and a set of character trigrams, so a misspelt
+query word ("witchr") is mapped to the title tokens it most resembles
+without scanning the vocabulary.
+
+A title's score is the weighted sum of its tokens found in the query, where
+rare tokens weigh close to 1 and stopwords weigh nothing, scaled by how much
+of the title was covered. Candidates are gathered from the posting lists of
+the rare tokens only, so the cost of a query depends on the matches rather
+than on the size of the catalog.
+"""
+
+import math
+import re
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Set
+
+STOPWORDS = frozenset(['the', 'of', 'a', 'an', 'and', 'in', 'on', 'to', 'for', 'at', 'by', 'vs'])
+ROMAN_NUMERALS = {
+    'ii': '2', 'iii': '3', 'iv': '4', 'v': '5', 'vi': '6', 'vii': '7', 'viii': '8', 'ix': '9', 'x': '10',
+    'xi': '11', 'xii': '12', 'xiii': '13', 'xiv': '14', 'xv': '15', 'xvi': '16',
+}
+# Sequel numbers identify a title poorly on their own
+NUMBER_WEIGHT = 0.5
+# Tokens shorter than this weigh proportionally less; "end" says less than "witcher"
+FULL_WEIGHT_LENGTH = 6
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase text, drop apostrophes and split it into alphanumeric tokens"""
+    tokens = _TOKEN_RE.findall(text.lower().replace("'", '').replace('’', ''))
+    return [ROMAN_NUMERALS.get(token, token) for token in tokens]
+
+
+def trigrams(token: str) -> Set[str]:
+    padded = f' {token} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleMatch(NamedTuple):
+    """A ranked search result"""
+    game_id: int
+    score: float
+
+
+class TitleIndex:
+    """
+    Token and trigram posting lists over game titles.
+
+    Titles are identified by their position, which matches the game id in the
+    GameCatalog the names come from.
+    """
+
+    # Defaults tuned with python -m benchmarks.title_search_eval: the strictest
+    # pair with the best F1 (precision 0.97, recall 1.00 on its queries)
+    MIN_SCORE = 0.35
+    MIN_SIMILARITY = 0.7
+    # Tokens shared by more titles than this only rescore existing candidates
+    MAX_POSTINGS = 500
+    # Tokens shorter than this, and numbers, only match exactly
+    MIN_FUZZY_LENGTH = 4
+
+    def __init__(self, names: Iterable[str] = (), min_score: float = MIN_SCORE,
+                 min_similarity: float = MIN_SIMILARITY, max_postings: int = MAX_POSTINGS):
+        self.min_score = min_score
+        self.min_similarity = min_similarity
+        self.max_postings = max_postings
+
+        self.tokens: Dict[str, int] = {}
+        self.token_names: List[str] = []
+        self.postings: List[array] = []
+        self.trigram_postings: Dict[str, array] = {}
+        # Title token ids, CSR-style like GameCatalog features
+        self.title_offsets = array('I', [0])
+        self.title_tokens = array('I')
+        # Lists still shared with the index this one was copied from
+        self._shared_postings: Set[int] = set()
+        self._shared_trigrams: Set[str] = set()
+        for name in names:
+            self.add(name)
+
+    def __len__(self) -> int:
+        return len(self.title_offsets) - 1
+
+    def add(self, name: str) -> int:
+        """Index one more title and return its id"""
+        if not isinstance(self.title_tokens, array):
+            raise TypeError("Cannot add titles to a read-only index snapshot")
+        title_id = len(self)
+        for token in dict.fromkeys(tokenize(name)):
+            token_id = self._token_id(token)
+            self._posting(token_id).append(title_id)
+            self.title_tokens.append(token_id)
+        self.title_offsets.append(len(self.title_tokens))
+        return title_id
+
+    def copy(self) -> 'TitleIndex':
+        """
+        Copy that can be changed without affecting this index. Posting lists
+        are shared until the copy first changes them
+        """
+        if not isinstance(self.title_tokens, array):
+            raise TypeError("Cannot copy a read-only index snapshot; build a new index instead")
+        index = TitleIndex(min_score=self.min_score, min_similarity=self.min_similarity,
+                           max_postings=self.max_postings)
+        index.tokens = dict(self.tokens)
+        index.token_names = list(self.token_names)
+        index.postings = list(self.postings)
+        index.trigram_postings = dict(self.trigram_postings)
+        index.title_offsets = array('I', self.title_offsets)
+        index.title_tokens = array('I', self.title_tokens)
+        index._shared_postings = set(range(len(self.postings)))
+        index._shared_trigrams = set(self.trigram_postings)
+        return index
+
+    def candidates(self, name: str) -> Sequence[int]:
+        """Ids of the titles sharing the rarest token of name, a superset of those equal to it"""
+        postings = []
+        for token in tokenize(name):
+            token_id = self.tokens.get(token)
+            if token_id is None:
+                return ()
+            postings.append(self.postings[token_id])
+        return min(postings, key=len, default=())
+
+    def insert(self, title_id: int, name: str):
+        """Index name under title_id, either the next id or one freed by remove()"""
+        if title_id == len(self):
+            self.add(name)
+            return
+        start, end = self.title_offsets[title_id], self.title_offsets[title_id + 1]
+        if start != end:
+            raise ValueError(f"Title {title_id} is still indexed")
+        token_ids = array('I')
+        for token in dict.fromkeys(tokenize(name)):
+            token_id = self._token_id(token)
+            self._posting(token_id).append(title_id)
+            token_ids.append(token_id)
+        self._set_title_tokens(title_id, token_ids)
+
+    def remove(self, title_id: int):
+        """Unindex a title; removing the last id also releases it"""
+        start, end = self.title_offsets[title_id], self.title_offsets[title_id + 1]
+        for token_id in self.title_tokens[start:end]:
+            self._posting(token_id).remove(title_id)
+        if title_id == len(self) - 1:
+            del self.title_tokens[start:]
+            del self.title_offsets[title_id + 1]
+        else:
+            self._set_title_tokens(title_id, ())
+
+    def _set_title_tokens(self, title_id: int, token_ids):
+        start, end = self.title_offsets[title_id], self.title_offsets[title_id + 1]
+        self.title_tokens[start:end] = array('I', token_ids)
+        shift = len(token_ids) - (end - start)
+        for later in range(title_id + 1, len(self.title_offsets)):
+            self.title_offsets[later] += shift
+
+    def _token_id(self, token: str) -> int:
+        token_id = self.tokens.get(token)
+        if token_id is None:
+            token_id = len(self.token_names)
+            self.tokens[token] = token_id
+            self.token_names.append(token)
+            self.postings.append(array('I'))
+            if self._fuzzy(token):
+                for trigram in trigrams(token):
+                    if trigram in self._shared_trigrams:
+                        self._shared_trigrams.discard(trigram)
+                        self.trigram_postings[trigram] = array('I', self.trigram_postings[trigram])
+                    self.trigram_postings.setdefault(trigram, array('I')).append(token_id)
+        return token_id
+
+    def _posting(self, token_id: int) -> array:
+        """Posting list of token_id, copied first if it is still shared"""
+        if token_id in self._shared_postings:
+            self._shared_postings.discard(token_id)
+            self.postings[token_id] = array('I', self.postings[token_id])
+        return self.postings[token_id]
+
+    def weight(self, token_id: int) -> float:
+        """Inverse document frequency of a token, scaled to 0..1"""
+        token = self.token_names[token_id]
+        # Tokens of removed titles stay in the vocabulary without postings
+        if token in STOPWORDS or not self.postings[token_id]:
+            return 0.0
+        count = len(self)
+        weight = math.log(1 + count / len(self.postings[token_id])) / math.log(1 + count)
+        if token.isdigit():
+            return weight * NUMBER_WEIGHT
+        return weight * min(1.0, len(token) / FULL_WEIGHT_LENGTH)
+
+    def match_tokens(self, query: str) -> Dict[int, float]:
+        """Map title token ids to their best similarity with any query word"""
+        matches: Dict[int, float] = {}
+        for word in set(tokenize(query)):
+            token_id = self.tokens.get(word)
+            if token_id is not None:
+                matches[token_id] = 1.0
+            if not self._fuzzy(word):
+                continue
+            word_trigrams = trigrams(word)
+            shared: Dict[int, int] = {}
+            for trigram in word_trigrams:
+                for candidate in self.trigram_postings.get(trigram, ()):
+                    shared[candidate] = shared.get(candidate, 0) + 1
+            for candidate, count in shared.items():
+                token = self.token_names[candidate]
+                # Dice coefficient; a padded token of n characters has n trigrams
+                similarity = 2 * count / (len(word_trigrams) + len(token))
+                if similarity < self.min_similarity and abs(len(token) - len(word)) <= 1:
+                    # Trigrams punish swapped letters ("zleda") hard; one edit is still close
+                    if _within_one_edit(word, token):
+                        similarity = 1 - 1 / max(len(word), len(token))
+                if similarity >= self.min_similarity and similarity > matches.get(candidate, 0.0):
+                    matches[candidate] = similarity
+        return matches
+
+    def _fuzzy(self, token: str) -> bool:
+        # Short words and numbers only match exactly: "4711" is not a typo of "4511"
+        return len(token) >= self.MIN_FUZZY_LENGTH and not token.isdigit()
+
+    def search(self, query: str, limit: int = 5) -> List[TitleMatch]:
+        """Return up to limit titles that the query refers to, best first"""
+        matches = self.match_tokens(query)
+        weights = {token_id: self.weight(token_id) for token_id in matches}
+        candidates: Set[int] = set()
+        common = []
+        for token_id in matches:
+            if not weights[token_id]:
+                continue
+            if len(self.postings[token_id]) <= self.max_postings:
+                candidates.update(self.postings[token_id])
+            else:
+                common.append(self.postings[token_id])
+        if not candidates and common:
+            # Only widespread tokens matched: require titles to contain all of them
+            common.sort(key=len)
+            candidates = set(common[0])
+            for posting in common[1:]:
+                candidates.intersection_update(posting)
+
+        results = []
+        for title_id in candidates:
+            score = self._score(title_id, matches, weights)
+            if score >= self.min_score:
+                results.append(TitleMatch(title_id, score))
+        results.sort(key=lambda match: (-match.score, match.game_id))
+        return results[:limit]
+
+    def best_match(self, query: str) -> Optional[int]:
+        """Return the id of the best matching title, or None"""
+        results = self.search(query, limit=1)
+        return results[0].game_id if results else None
+
+    def _score(self, title_id: int, matches: Dict[int, float], weights: Dict[int, float]) -> float:
+        matched = total = 0.0
+        for token_id in self.title_tokens[self.title_offsets[title_id]:self.title_offsets[title_id + 1]]:
+            weight = weights[token_id] if token_id in weights else self.weight(token_id)
+            total += weight
+            matched += weight * matches.get(token_id, 0.0)
+        if not total:
+            return 0.0
+        # Evidence from the matched tokens, boosted when most of the title is present
+        return matched * (0.5 + 0.5 * matched / total)
+
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """True if a and b differ by one insertion, deletion, substitution or adjacent swap"""
+    if a == b:
+        return True
+    if len(a) > len(b):
+        a, b = b, a
+    prefix = 0
+    while prefix < len(a) and a[prefix] == b[prefix]:
+        prefix += 1
+    if len(a) < len(b):
+        return a[prefix:] == b[prefix + 1:]
+    if a[prefix + 1:] == b[prefix + 1:]:
+        return True
+    return (prefix + 1 < len(a) and a[prefix] == b[prefix + 1] and a[prefix + 1] == b[prefix]
+            and a[prefix + 2:] == b[prefix + 2:])